@@ -0,0 +1,102 @@
+import heapq
+import os
+from datetime import datetime, timedelta
+
+# Daily per-feed quotas; 0 (the default) disables a quota
+QUOTA_BYTES_PER_DAY = int(os.environ.get("QUOTA_BYTES_PER_DAY", 0))
+QUOTA_PARSE_CPU_PER_DAY = float(os.environ.get("QUOTA_PARSE_CPU_PER_DAY", 0))
+QUOTA_MESSAGES_PER_DAY = int(os.environ.get("QUOTA_MESSAGES_PER_DAY", 0))
+
+# Feeds over their byte or CPU quota are checked at most this often
+DEMOTED_INTERVAL = int(os.environ.get("DEMOTED_INTERVAL", 6 * 3600))
+
+# Days of usage kept on each feed record
+USAGE_HISTORY_DAYS = 7
+
+METRICS = ("bytes", "parse_cpu", "entries", "messages")
+
+
+class FeedUsage:
+    """Resources one check of one feed consumed"""
+
+    __slots__ = METRICS
+
+    def __init__(self):
+        self.bytes = 0
+        self.parse_cpu = 0.0
+        self.entries = 0
+        self.messages = 0
+
+    def as_dict(self):
+        return {metric: getattr(self, metric) for metric in METRICS}
+
+    def __bool__(self):
+        return any(getattr(self, metric) for metric in METRICS)
+
+
+def day_key(now=None):
+    return (now or datetime.now()).strftime("%Y-%m-%d")
+
+
+def expired_days(usage, now=None):
+    """Day keys in a feed's usage that are older than USAGE_HISTORY_DAYS"""
+    cutoff = day_key((now or datetime.now()) - timedelta(days=USAGE_HISTORY_DAYS))
+    return [day for day in usage if day < cutoff]
+
+
+def usage_today(feed, now=None):
+    return (feed.get("usage") or {}).get(day_key(now), {})
+
+
+def over_quota(feed, now=None):
+    """Names of the daily quotas the feed has used up"""
+    today = usage_today(feed, now)
+    exceeded = []
+    if QUOTA_BYTES_PER_DAY and today.get("bytes", 0) >= QUOTA_BYTES_PER_DAY:
+        exceeded.append("bytes")
+    if QUOTA_PARSE_CPU_PER_DAY and today.get("parse_cpu", 0) >= QUOTA_PARSE_CPU_PER_DAY:
+        exceeded.append("parse_cpu")
+    if QUOTA_MESSAGES_PER_DAY and today.get("messages", 0) >= QUOTA_MESSAGES_PER_DAY:
+        exceeded.append("messages")
+    return exceeded
+
+
+def is_demoted(feed, now=None):
+    """True if a byte/CPU-hungry feed was checked too recently to run again"""
+    if not {"bytes", "parse_cpu"} & set(over_quota(feed, now)):
+        return False
+    last_check = feed.get("last_check")
+    if not last_check:
+        return False
+    now = now or datetime.now()
+    return datetime.fromisoformat(last_check) + timedelta(seconds=DEMOTED_INTERVAL) > now
+
+
+def messages_left(feed, now=None):
+    """How many more messages the feed may send today (None = unlimited)"""
+    if not QUOTA_MESSAGES_PER_DAY:
+        return None
+    return max(0, QUOTA_MESSAGES_PER_DAY - usage_today(feed, now).get("messages", 0))
+
+
+def usage_totals(feed):
+    """Sum a feed's usage over the stored history"""
+    totals = dict.fromkeys(METRICS, 0)
+    for day in (feed.get("usage") or {}).values():
+        for metric in METRICS:
+            totals[metric] += day.get(metric, 0)
+    return totals
+
+
+def cost(totals):
+    """Single comparable cost: 1 MB, 1 CPU second and 10 messages weigh the same"""
+    return totals["bytes"] / (1024 * 1024) + totals["parse_cpu"] + totals["messages"] / 10
+
+
+def top_costly(feeds, limit=10):
+    """Return (feed, totals) for the most expensive feeds, costliest first
+
+    `feeds` may be any iterable; only the top `limit` are kept in memory.
+    """
+    ranked = ((feed, usage_totals(feed)) for feed in feeds)
+    return heapq.nlargest(limit, ranked, key=lambda item: cost(item[1]))
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+# Seconds before the admin list is reloaded, so admins added by another
+# process are picked up
+ADMIN_CACHE_TTL = float(os.environ.get("ADMIN_CACHE_TTL", 60))
+
+
+class AdminCache:
+    """In-process set of admin user IDs, reloaded at most every `ttl` seconds
+
+    `loader` returns the current admin IDs from the database. As before,
+    everyone counts as an admin while no admin exists, so the first user
+    can claim the bot.
+    """
+
+    def __init__(self, loader, ttl=ADMIN_CACHE_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self._ids = frozenset()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return self._ids
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._ids = frozenset(self.loader())
+                self._loaded_at = time.monotonic()
+            return self._ids
+
+    def is_admin(self, user_id):
+        ids = self._current()
+        return user_id in ids or not ids
+
+    def is_known(self, user_id):
+        """True if the user is already stored as an admin"""
+        return user_id in self._current()
+
+    def add(self, user_id):
+        """Record an admin just written to the database"""
+        with self._lock:
+            self._ids = self._ids | {user_id}
+
+    def invalidate(self):
+        """Force a reload on the next check"""
+        with self._lock:
+            self._loaded_at = None
@@ -1,26 +1,61 @@
+from __future__ import annotations
+
 # Add this at the very top of your app.py file
 try:
     import fix_feedparser
 except ImportError:
     pass
-    
+
+from startup import startup_timer, lazy_import
+from feed_cache import feed_cache, body_digest
+from entries import EntryRecord
+from html_text import html_to_text, escape_markdown
+from executors import interactive_pool, polling_pool, run_in, pool_stats
+import feed_loader
+import accounting
+import webhook
+import websub
+import fast_parse
+from bot_pool import BotPool
+from persistence import LocalStore, STATE_DIR
+from admin_cache import AdminCache
+from profiler import cycle_profiler, PROFILE_CYCLES
+from feed_filters import filter_cache, compile_rules, parse_rules, FilterError
+from freshness import freshness, format_lag
+from parse_pool import parse_pool
+from memory_watchdog import memory_watchdog
+import opml
+import entry_keys
+from entry_keys import entry_key, is_compact
+
 import os
 import logging
 import json
 import pytz
-import asyncio
-import feedparser
-import html
+import io
 import re
+import tempfile
 from datetime import datetime, timedelta
 import time
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
-from telegram.ext import (
-    Updater, CommandHandler, CallbackContext, ConversationHandler, 
-    MessageHandler, Filters, CallbackQueryHandler
-)
 import threading
-from pymongo import MongoClient
+from functools import wraps
+from typing import TYPE_CHECKING
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Heavy dependencies are loaded on first use so the process can start
+# polling without paying for them up front
+pymongo = lazy_import("pymongo")
+telegram = lazy_import("telegram")
+telegram_ext = lazy_import("telegram.ext")
+fetcher = lazy_import("fetcher")
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import CallbackContext
 
 # Set up logging
 logging.basicConfig(
@@ -29,52 +64,279 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+startup_timer.record("imports", startup_timer.elapsed())
+
 # MongoDB setup - uses MongoDB Atlas free tier
 MONGODB_URI = os.environ.get("MONGODB_URI", "")
-if not MONGODB_URI:
-    logger.warning("MONGODB_URI not set! Using in-memory storage (data will be lost on restart).")
-    # Use in-memory storage if MongoDB URL not provided
-    feeds_collection = {}
-    entries_collection = {}
-    admins_collection = {}
-    status_collection = {"system": {"last_check": datetime.now().isoformat(), 
-                                   "entries_posted": 0, 
-                                   "feeds_processed": 0,
-                                   "errors": 0,
-                                   "started_at": datetime.now().isoformat()}}
-else:
+
+# How long storage helpers wait for the background connect before giving up
+STORAGE_READY_TIMEOUT = float(os.environ.get("STORAGE_READY_TIMEOUT", 30))
+
+# Feeds per /listfeeds page, and per batch when the polling cycle walks them
+FEEDS_PAGE_SIZE = int(os.environ.get("FEEDS_PAGE_SIZE", 10))
+POLL_BATCH_SIZE = int(os.environ.get("POLL_BATCH_SIZE", 200))
+
+# Fields each use of the feed list needs (MongoDB projections)
+POLL_FIELDS = [
+    "url", "channel", "format_template", "custom_format", "max_bytes", "active", "added_by",
+    "last_check", "last_error", "consecutive_failures", "next_retry_at", "suspended", "usage", "websub",
+    "filters", "created_at"
+]
+LIST_FIELDS = ["url", "channel", "suspended", "websub"]
+COST_FIELDS = ["url", "usage"]
+EXPORT_FIELDS = ["url", "channel", "schedule", "timezone", "format_template"]
+
+# Feeds listed under "Slowest feeds" in /status
+SLOWEST_FEEDS = int(os.environ.get("SLOWEST_FEEDS", 5))
+
+# Interval between polling cycles when running app.py directly
+CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", 7200))
+
+# Failing feeds are retried with exponential backoff and suspended after
+# FAILURE_SUSPEND_THRESHOLD consecutive failures
+FAILURE_BACKOFF_BASE = int(os.environ.get("FAILURE_BACKOFF_BASE", 300))
+FAILURE_BACKOFF_MAX = int(os.environ.get("FAILURE_BACKOFF_MAX", 24 * 3600))
+FAILURE_SUSPEND_THRESHOLD = int(os.environ.get("FAILURE_SUSPEND_THRESHOLD", 10))
+
+
+# Collections are bound by connect_storage(), which runs in the background
+feeds_collection = None
+entries_collection = None
+admins_collection = None
+status_collection = None
+
+storage_ready = threading.Event()
+_storage_lock = threading.Lock()
+_storage_thread = None
+
+# Snapshot + journal backing the in-memory collections (None when disabled)
+local_store = None
+
+# Set by start_websub() when WEBSUB_CALLBACK_URL is configured
+websub_manager = None
+
+# Bots channel posts are spread over (TELEGRAM_BOT_TOKEN + TELEGRAM_BOT_TOKENS)
+bot_pool = None
+
+def _in_memory_storage():
+    """Return empty in-memory collections (feeds, entries, admins, status)"""
+    status = {"system": {"last_check": datetime.now().isoformat(),
+                         "entries_posted": 0,
+                         "feeds_processed": 0,
+                         "errors": 0,
+                         "started_at": datetime.now().isoformat()}}
+    return {}, {}, {}, status
+
+def _local_storage():
+    """Return in-memory collections restored from the local snapshot and journal"""
+    global local_store
+    feeds, entries, admins, status = _in_memory_storage()
+    if not STATE_DIR:
+        return feeds, entries, admins, status
+    
     try:
-        client = MongoClient(MONGODB_URI)
-        db = client.get_database("rss_bot")
-        feeds_collection = db.feeds
-        entries_collection = db.entries
-        admins_collection = db.admins
-        status_collection = db.status
-        
-        # Create index on entries collection
-        entries_collection.create_index([("feed_id", 1), ("entry_id", 1)], unique=True)
-        
-        # Create system status document if it doesn't exist
-        if not status_collection.find_one({"_id": "system"}):
-            status_collection.insert_one({
-                "_id": "system",
-                "last_check": datetime.now().isoformat(),
-                "entries_posted": 0,
-                "feeds_processed": 0,
-                "errors": 0,
-                "started_at": datetime.now().isoformat()
-            })
+        store = LocalStore(STATE_DIR)
+        with startup_timer.phase("restore"):
+            saved = store.load()
+    except Exception as e:
+        logger.error(f"Failed to restore local state from {STATE_DIR}: {e}")
+        return feeds, entries, admins, status
+    
+    feeds.update(saved.get("feeds", {}))
+    entries.update(saved.get("entries", {}))
+    admins.update(saved.get("admins", {}))
+    status["system"].update(saved.get("status", {}).get("system", {}))
+    local_store = store
+    return feeds, entries, admins, status
+
+def _persist(op, collection, key, value=None):
+    """Journal a mutation of the in-memory collections"""
+    if local_store is not None:
+        local_store.record(op, collection, key, value)
+
+def snapshot_local_state(force=False):
+    """Write a snapshot of the in-memory collections when one is due"""
+    if local_store is None:
+        return
+    collections = {
+        "feeds": feeds_collection,
+        "entries": entries_collection,
+        "admins": admins_collection,
+        "status": status_collection
+    }
+    if force:
+        local_store.snapshot(collections)
+    else:
+        local_store.maybe_snapshot(collections)
+
+def connect_storage():
+    """Connect to MongoDB (or fall back to memory) and mark storage ready"""
+    global feeds_collection, entries_collection, admins_collection, status_collection, _raw_entry_keys
+
+    if not MONGODB_URI:
+        if STATE_DIR:
+            logger.warning(f"MONGODB_URI not set! Using in-memory storage persisted to {STATE_DIR}/.")
+        else:
+            logger.warning("MONGODB_URI not set! Using in-memory storage (data will be lost on restart).")
+        # Use in-memory storage if MongoDB URL not provided
+        feeds_collection, entries_collection, admins_collection, status_collection = _local_storage()
+        try:
+            with startup_timer.phase("migrate"):
+                migrate_entry_keys()
+        except Exception as e:
+            logger.error(f"Entry key migration failed: {e}; matching raw and hashed keys")
+        finally:
+            storage_ready.set()
+        return
+
+    try:
+        with startup_timer.phase("connect"):
+            client = pymongo.MongoClient(MONGODB_URI)
+            db = client.get_database("rss_bot")
+            feeds, entries, admins, status = db.feeds, db.entries, db.admins, db.status
+
+        with startup_timer.phase("indexes"):
+            # Create index on entries collection
+            entries.create_index([("feed_id", 1), ("entry_id", 1)], unique=True)
+            # Active feeds are always listed and paged in _id order
+            feeds.create_index([("active", 1), ("_id", 1)])
+            admins.create_index([("user_id", 1)])
+
+            # Create system status document if it doesn't exist (one round-trip)
+            status.update_one(
+                {"_id": "system"},
+                {"$setOnInsert": {
+                    "last_check": datetime.now().isoformat(),
+                    "entries_posted": 0,
+                    "feeds_processed": 0,
+                    "errors": 0,
+                    "started_at": datetime.now().isoformat()
+                }},
+                upsert=True
+            )
+
+        feeds_collection, entries_collection, admins_collection, status_collection = feeds, entries, admins, status
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
         # Fallback to in-memory storage
-        feeds_collection = {}
-        entries_collection = {}
-        admins_collection = {}
-        status_collection = {"system": {"last_check": datetime.now().isoformat(), 
-                                       "entries_posted": 0, 
-                                       "feeds_processed": 0,
-                                       "errors": 0,
-                                       "started_at": datetime.now().isoformat()}}
+        feeds_collection, entries_collection, admins_collection, status_collection = _in_memory_storage()
+        storage_ready.set()
+        return
+
+    # Converting a large entries collection takes a while; the bot runs
+    # meanwhile, matching both key forms until it is done
+    try:
+        _raw_entry_keys = _entry_keys_pending()
+    except Exception as e:
+        logger.error(f"Could not read the stored entry key mode: {e}; matching raw and hashed keys")
+        _raw_entry_keys = entry_keys.is_compact()
+        storage_ready.set()
+        return
+    storage_ready.set()
+    if _raw_entry_keys:
+        threading.Thread(target=_convert_entry_keys, name="entry-key-migration", daemon=True).start()
+
+# True while posted entries may still be stored under their raw IDs: a key
+# migration is running or failed part-way, so lookups try both forms
+_raw_entry_keys = False
+
+def _entry_keys_pending():
+    """Settle the entry key mode against the stored one; True when raw IDs need converting"""
+    mode = entry_keys.ENTRY_KEY_MODE
+    if isinstance(status_collection, dict):
+        stored_mode = status_collection["system"].get("entry_key_mode", "raw")
+    else:
+        stored_mode = (status_collection.find_one({"_id": "system"}, {"entry_key_mode": 1}) or {}).get(
+            "entry_key_mode", "raw")
+    if stored_mode == mode:
+        return False
+    if stored_mode != "raw":
+        # Digests can't be turned back into IDs; keep matching what is stored
+        logger.error(f"Posted entries use {stored_mode} keys and can't be converted to {mode}; "
+                     f"keeping {stored_mode} (set ENTRY_KEY_MODE={stored_mode})")
+        entry_keys.use_mode(stored_mode)
+        return False
+    return True
+
+def migrate_entry_keys():
+    """Convert posted entries stored with raw IDs to ENTRY_KEY_MODE keys (runs once)"""
+    global _raw_entry_keys
+    if not _entry_keys_pending():
+        return
+    _raw_entry_keys = True
+    _convert_entry_keys()
+
+def _convert_entry_keys():
+    """Rewrite raw entry IDs as keys, then record the mode and stop matching raw IDs"""
+    global _raw_entry_keys
+    mode = entry_keys.ENTRY_KEY_MODE
+    migrated = 0
+    if isinstance(entries_collection, dict):
+        for key, entry_data in list(entries_collection.items()):
+            if isinstance(key, str) and isinstance(entry_data, dict):
+                new_key = (entry_data["feed_id"], entry_key(entry_data["entry_id"]))
+                del entries_collection[key]
+                entries_collection[new_key] = entry_data.get("posted_at")
+                migrated += 1
+        status_collection["system"]["entry_key_mode"] = mode
+        snapshot_local_state(force=True)
+    else:
+        # Rewrite entry_id in batches; a raw ID whose key is already stored is a duplicate
+        try:
+            doc_ids, keys = [], []
+            for doc in entries_collection.find({"entry_id": {"$type": "string"}}, {"entry_id": 1}):
+                doc_ids.append(doc["_id"])
+                keys.append(entry_key(doc["entry_id"]))
+                if len(doc_ids) >= 1000:
+                    migrated += _apply_key_migration(doc_ids, keys)
+                    doc_ids, keys = [], []
+            if doc_ids:
+                migrated += _apply_key_migration(doc_ids, keys)
+            status_collection.update_one({"_id": "system"}, {"$set": {"entry_key_mode": mode}})
+        except Exception as e:
+            # The mode isn't recorded, so the next start picks up where this stopped
+            logger.error(f"Entry key migration stopped after {migrated} entries: {e}; "
+                         f"matching raw and {mode} keys until it completes")
+            return
+    
+    _raw_entry_keys = False
+    logger.info(f"Migrated {migrated} posted entries to {mode} keys")
+
+def _apply_key_migration(doc_ids, keys):
+    """Set entry_id to its key on each document; drop raw duplicates of stored keys"""
+    batch = [pymongo.UpdateOne({"_id": doc_id}, {"$set": {"entry_id": key}}) for doc_id, key in zip(doc_ids, keys)]
+    try:
+        return entries_collection.bulk_write(batch, ordered=False).modified_count
+    except pymongo.errors.BulkWriteError as e:
+        duplicates = [doc_ids[error["index"]] for error in e.details["writeErrors"] if error["code"] == 11000]
+        if duplicates:
+            entries_collection.delete_many({"_id": {"$in": duplicates}})
+        return e.details.get("nModified", 0)
+
+def start_storage_connect():
+    """Start connect_storage() on a background thread (only once)"""
+    global _storage_thread
+    with _storage_lock:
+        if _storage_thread is None:
+            _storage_thread = threading.Thread(target=connect_storage, name="storage-connect", daemon=True)
+            _storage_thread.start()
+    return _storage_thread
+
+def wait_for_storage(timeout=None):
+    """Block until storage is ready; returns False if the timeout expires"""
+    if storage_ready.is_set():
+        return True
+    start_storage_connect()
+    return storage_ready.wait(STORAGE_READY_TIMEOUT if timeout is None else timeout)
+
+def requires_storage(func):
+    """Gate a storage helper on the background connect having finished"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not wait_for_storage():
+            raise RuntimeError("Storage is not ready yet")
+        return func(*args, **kwargs)
+    return wrapper
 
 # Define conversation states
 (
@@ -92,22 +354,29 @@ FEED_FORMATS = {
 }
 
 # Database helper functions
-def is_admin(user_id):
-    """Check if user is admin"""
+def _load_admin_ids():
+    """Read every admin user ID from storage"""
     if isinstance(admins_collection, dict):
-        return user_id in admins_collection or len(admins_collection) == 0
+        return list(admins_collection)
     else:
-        # MongoDB check
-        admin = admins_collection.find_one({"user_id": user_id})
-        if admin:
-            return True
-        # If no admins exist, first user becomes admin
-        if admins_collection.count_documents({}) == 0:
-            return True
-    return False
+        # MongoDB query, IDs only
+        return [admin["user_id"] for admin in admins_collection.find({}, {"user_id": 1, "_id": 0})]
+
+# Authorization runs on every command; answer it from memory
+admin_cache = AdminCache(_load_admin_ids)
+
+@requires_storage
+def is_admin(user_id):
+    """Check if user is admin (if no admins exist, first user becomes admin)"""
+    return admin_cache.is_admin(user_id)
 
+@requires_storage
 def add_admin(user_id, username):
     """Add a new admin"""
+    # Called on every /start; nothing to write for a known admin
+    if admin_cache.is_known(user_id):
+        return
+    
     if isinstance(admins_collection, dict):
         if user_id not in admins_collection:
             admins_collection[user_id] = {
@@ -115,6 +384,7 @@ def add_admin(user_id, username):
                 "username": username,
                 "added_at": datetime.now().isoformat()
             }
+            _persist("put", "admins", user_id, admins_collection[user_id])
     else:
         # MongoDB insert
         if not admins_collection.find_one({"user_id": user_id}):
@@ -123,15 +393,65 @@ def add_admin(user_id, username):
                 "username": username,
                 "added_at": datetime.now().isoformat()
             })
+    admin_cache.add(user_id)
 
-def get_feeds():
-    """Get all active feeds"""
+def _projection(fields):
+    return {field: 1 for field in fields} if fields else None
+
+@requires_storage
+def get_feeds(fields=None):
+    """Get all active feeds (only `fields` plus _id, for MongoDB)"""
     if isinstance(feeds_collection, dict):
-        return [f for f in feeds_collection.values() if f.get("active", True)]
+        return [f for f in list(feeds_collection.values()) if f.get("active", True)]
     else:
         # MongoDB query
-        return list(feeds_collection.find({"active": True}))
+        return list(feeds_collection.find({"active": True}, _projection(fields)))
+
+@requires_storage
+def get_feeds_page(after=None, before=None, limit=FEEDS_PAGE_SIZE, fields=None):
+    """Get up to `limit` active feeds in ID order, after or before a feed ID"""
+    if isinstance(feeds_collection, dict):
+        ids = sorted(
+            feed_id for feed_id, feed in list(feeds_collection.items())
+            if feed.get("active", True)
+            and (after is None or feed_id > after)
+            and (before is None or feed_id < before)
+        )
+        ids = ids[-limit:] if before is not None else ids[:limit]
+        return [feeds_collection[feed_id] for feed_id in ids]
+    else:
+        # MongoDB query on the (active, _id) index
+        query = {"active": True}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        elif before is not None:
+            query["_id"] = {"$lt": before}
+        order = -1 if before is not None else 1
+        feeds = list(feeds_collection.find(query, _projection(fields)).sort("_id", order).limit(limit))
+        if before is not None:
+            feeds.reverse()
+        return feeds
+
+def iter_feeds(fields=None, batch_size=POLL_BATCH_SIZE):
+    """Yield active feeds a page at a time instead of loading them all"""
+    after = None
+    while True:
+        page = get_feeds_page(after=after, limit=batch_size, fields=fields)
+        yield from page
+        if len(page) < batch_size:
+            return
+        after = page[-1]["_id"]
 
+@requires_storage
+def count_feeds():
+    """Count active feeds"""
+    if isinstance(feeds_collection, dict):
+        return sum(1 for f in list(feeds_collection.values()) if f.get("active", True))
+    else:
+        # MongoDB count, answered from the index
+        return feeds_collection.count_documents({"active": True})
+
+@requires_storage
 def get_feed(feed_id):
     """Get feed by ID"""
     if isinstance(feeds_collection, dict):
@@ -140,10 +460,19 @@ def get_feed(feed_id):
         # MongoDB query
         return feeds_collection.find_one({"_id": feed_id})
 
-def add_feed(url, channel, timezone, schedule, format_template, custom_format, user_id):
-    """Add new feed"""
-    feed_id = f"feed_{int(datetime.now().timestamp())}"
-    feed_data = {
+_last_feed_number = 0
+_feed_number_lock = threading.Lock()
+
+def new_feed_id():
+    """Unique feed ID; millisecond-based, bumped when feeds are added in the same millisecond"""
+    global _last_feed_number
+    with _feed_number_lock:
+        _last_feed_number = max(int(datetime.now().timestamp() * 1000), _last_feed_number + 1)
+        return f"feed_{_last_feed_number}"
+
+def _new_feed_doc(url, channel, timezone, schedule, format_template, custom_format, user_id):
+    return {
+        "_id": new_feed_id(),
         "url": url,
         "channel": channel,
         "timezone": timezone,
@@ -155,22 +484,103 @@ def add_feed(url, channel, timezone, schedule, format_template, custom_format, u
         "active": True,
         "created_at": datetime.now().isoformat()
     }
+
+@requires_storage
+def add_feed(url, channel, timezone, schedule, format_template, custom_format, user_id):
+    """Add new feed"""
+    feed_data = _new_feed_doc(url, channel, timezone, schedule, format_template, custom_format, user_id)
+    feed_id = feed_data["_id"]
     
     if isinstance(feeds_collection, dict):
         feeds_collection[feed_id] = feed_data
-        feeds_collection[feed_id]["_id"] = feed_id
+        _persist("put", "feeds", feed_id, feed_data)
     else:
         # MongoDB insert
-        feed_data["_id"] = feed_id
         feeds_collection.insert_one(feed_data)
     
     return feed_id
 
+@requires_storage
+def add_feeds(feed_docs):
+    """Insert several new feed documents (from _new_feed_doc) in one write"""
+    if not feed_docs:
+        return []
+    if isinstance(feeds_collection, dict):
+        for feed_data in feed_docs:
+            feeds_collection[feed_data["_id"]] = feed_data
+            _persist("put", "feeds", feed_data["_id"], feed_data)
+    else:
+        # MongoDB bulk insert
+        feeds_collection.insert_many(feed_docs, ordered=False)
+    return [feed_data["_id"] for feed_data in feed_docs]
+
+def import_opml(data, channel=None, schedule="2h", format_template="detailed", user_id=0):
+    """Validate the feeds of an OPML document concurrently and add the valid ones
+
+    Returns a report entry per outline: {"url", "status", "detail", "feed_id"}
+    with status added, exists, duplicate or invalid. Raises opml.OPMLError.
+    """
+    outlines = opml.parse_opml(data)
+    subscribed = {(feed.get("url"), feed.get("channel")) for feed in iter_feeds(["url", "channel"])}
+    
+    report = []
+    pending = []
+    seen = set()
+    for outline in outlines:
+        target = outline.settings.get("channel") or channel
+        item = {"url": outline.url, "status": None, "detail": None, "feed_id": None}
+        report.append(item)
+        if not target:
+            item["status"], item["detail"] = "invalid", "no channel given"
+        elif (outline.url, target) in seen:
+            item["status"] = "duplicate"
+        elif (outline.url, target) in subscribed:
+            item["status"] = "exists"
+        else:
+            pending.append((item, outline, target))
+        seen.add((outline.url, target))
+    
+    # One bounded pool for the whole document; each result is reported per URL
+    results = feed_loader.validate_feeds([outline.url for _, outline, _ in pending])
+    
+    docs = []
+    hubs = []
+    for item, outline, target in pending:
+        result = results[outline.url]
+        if result.error:
+            item["status"], item["detail"] = "invalid", result.error
+            continue
+        settings = outline.settings
+        format_name = settings.get("format") if settings.get("format") in FEED_FORMATS else format_template
+        if format_name == "custom":
+            format_name = "detailed"
+        feed_data = _new_feed_doc(
+            outline.url, target, settings["timezone"] if settings.get("timezone") in pytz.all_timezones_set else "UTC",
+            settings.get("schedule") if re.fullmatch(r"\d+[mhd]", settings.get("schedule", "")) else schedule,
+            format_name, None, user_id
+        )
+        docs.append(feed_data)
+        item["status"], item["feed_id"] = "added", feed_data["_id"]
+        if result.hub:
+            hubs.append((feed_data["_id"], result.hub, result.topic))
+    
+    add_feeds(docs)
+    logger.info(f"OPML import: {opml.summarize(report)}")
+    
+    if websub_manager:
+        for feed_id, hub, topic in hubs:
+            polling_pool.submit(websub_manager.subscribe, feed_id, hub, topic)
+    return report
+
+@requires_storage
 def update_feed(feed_id, field, value):
     """Update feed field"""
+    if field == "filters":
+        filter_cache.invalidate(feed_id)
     if isinstance(feeds_collection, dict):
         if feed_id in feeds_collection:
             feeds_collection[feed_id][field] = value
+            _persist("merge", "feeds", feed_id, {field: value})
             return True
     else:
         # MongoDB update
@@ -178,31 +588,63 @@ def update_feed(feed_id, field, value):
         return result.modified_count > 0
     return False
 
+@requires_storage
+def update_feed_fields(feed_id, fields):
+    """Update several feed fields in one write"""
+    if "filters" in fields:
+        filter_cache.invalidate(feed_id)
+    if isinstance(feeds_collection, dict):
+        if feed_id in feeds_collection:
+            feeds_collection[feed_id].update(fields)
+            _persist("merge", "feeds", feed_id, dict(fields))
+            return True
+    else:
+        # MongoDB update
+        result = feeds_collection.update_one({"_id": feed_id}, {"$set": fields})
+        return result.modified_count > 0
+    return False
+
 def delete_feed(feed_id):
     """Delete feed (mark inactive)"""
+    if websub_manager:
+        websub_manager.unsubscribe(feed_id)
     return update_feed(feed_id, "active", False)
 
+def _entry_dict_key(feed_id, entry_id):
+    """Key of a posted entry in the in-memory entries collection"""
+    if is_compact():
+        return (feed_id, entry_key(entry_id))
+    return f"{feed_id}_{entry_id}"
+
+@requires_storage
 def is_entry_posted(feed_id, entry_id):
     """Check if entry already posted"""
-    entry_key = f"{feed_id}_{entry_id}"
-    
     if isinstance(entries_collection, dict):
-        return entry_key in entries_collection
+        if _entry_dict_key(feed_id, entry_id) in entries_collection:
+            return True
+        return _raw_entry_keys and f"{feed_id}_{entry_id}" in entries_collection
     else:
-        # MongoDB query
-        return entries_collection.find_one({"feed_id": feed_id, "entry_id": entry_id}) is not None
+        # MongoDB query, answered from the (feed_id, entry_id) index
+        key = entry_key(entry_id)
+        if _raw_entry_keys and key != entry_id:
+            key = {"$in": [key, entry_id]}
+        return entries_collection.find_one({"feed_id": feed_id, "entry_id": key}, {"_id": 1}) is not None
 
+@requires_storage
 def mark_entry_posted(feed_id, entry_id):
     """Mark entry as posted"""
-    entry_key = f"{feed_id}_{entry_id}"
     entry_data = {
         "feed_id": feed_id,
-        "entry_id": entry_id,
+        "entry_id": entry_key(entry_id),
         "posted_at": datetime.now().isoformat()
     }
     
     if isinstance(entries_collection, dict):
-        entries_collection[entry_key] = entry_data
+        key = _entry_dict_key(feed_id, entry_id)
+        # Compact keys carry the IDs already; keep only the time
+        value = entry_data["posted_at"] if is_compact() else entry_data
+        entries_collection[key] = value
+        _persist("put", "entries", key, value)
     else:
         # MongoDB insert
         try:
@@ -211,10 +653,109 @@ def mark_entry_posted(feed_id, entry_id):
             # Entry might already exist, ignore
             pass
 
+@requires_storage
+def add_feed_usage(feed, usage, now=None):
+    """Add one check's resource usage to the feed's daily totals"""
+    feed_id = feed.get("_id")
+    day = accounting.day_key(now)
+    expired = accounting.expired_days(feed.get("usage") or {}, now)
+    
+    if isinstance(feeds_collection, dict):
+        stored = feeds_collection.get(feed_id)
+        if stored is None:
+            return
+        days = stored.setdefault("usage", {})
+        totals = days.setdefault(day, dict.fromkeys(accounting.METRICS, 0))
+        for metric, value in usage.as_dict().items():
+            totals[metric] = totals.get(metric, 0) + value
+        for old_day in expired:
+            days.pop(old_day, None)
+        _persist("merge", "feeds", feed_id, {"usage": days})
+    else:
+        # MongoDB update: one $inc per metric, old days dropped in the same write
+        update = {"$inc": {f"usage.{day}.{metric}": value for metric, value in usage.as_dict().items()}}
+        if expired:
+            update["$unset"] = {f"usage.{old_day}": "" for old_day in expired}
+        feeds_collection.update_one({"_id": feed_id}, update)
+
 def update_last_check(feed_id):
     """Update last check time"""
     update_feed(feed_id, "last_check", datetime.now().isoformat())
 
+def is_feed_due(feed, now=None):
+    """False while a feed is suspended, backing off after failures, or pushed to us"""
+    if feed.get("suspended"):
+        return False
+    now = now or datetime.now()
+    next_retry_at = feed.get("next_retry_at")
+    if next_retry_at and next_retry_at > now.isoformat():
+        return False
+    # Feeds with a live WebSub lease are only polled as a fallback
+    if websub_manager and websub.is_push_active(feed.get("websub"), now):
+        last_check = feed.get("last_check")
+        fallback_after = now - timedelta(seconds=websub.WEBSUB_FALLBACK_INTERVAL)
+        return not last_check or last_check <= fallback_after.isoformat()
+    return True
+
+def record_feed_failure(context: CallbackContext, feed, error):
+    """Store the error, back off exponentially and suspend persistent failures"""
+    feed_id = feed.get("_id")
+    failures = feed.get("consecutive_failures", 0) + 1
+    delay = min(FAILURE_BACKOFF_BASE * 2 ** (failures - 1), FAILURE_BACKOFF_MAX)
+    fields = {
+        "last_error": error,
+        "last_error_at": datetime.now().isoformat(),
+        "consecutive_failures": failures,
+        "next_retry_at": (datetime.now() + timedelta(seconds=delay)).isoformat()
+    }
+    
+    if failures >= FAILURE_SUSPEND_THRESHOLD:
+        fields["suspended"] = True
+        logger.warning(f"Suspending feed {feed_id} after {failures} consecutive failures")
+        notify_feed_suspended(context, feed, failures, error)
+    else:
+        logger.info(f"Feed {feed_id} failed {failures} time(s), retrying in {delay}s")
+    
+    update_feed_fields(feed_id, fields)
+    update_status("errors")
+
+def record_feed_success(feed):
+    """Clear failure state after a successful check (no write if healthy)"""
+    if feed.get("consecutive_failures") or feed.get("last_error"):
+        update_feed_fields(feed.get("_id"), {
+            "consecutive_failures": 0,
+            "next_retry_at": None,
+            "last_error": None
+        })
+
+def notify_feed_suspended(context: CallbackContext, feed, failures, error):
+    """Tell the admin who added the feed that it has been suspended"""
+    added_by = feed.get("added_by")
+    if not added_by:
+        return
+    try:
+        context.bot.send_message(
+            chat_id=added_by,
+            text=(
+                f"⚠️ Feed {feed.get('_id')} has been suspended after {failures} consecutive failures.\n\n"
+                f"URL: {feed.get('url')}\n"
+                f"Last error: {error}\n\n"
+                f"Use /resumefeed {feed.get('_id')} once it is fixed."
+            ),
+            disable_web_page_preview=True
+        )
+    except Exception as e:
+        logger.error(f"Could not notify {added_by} about suspended feed {feed.get('_id')}: {str(e)}")
+
+def resume_feed(feed_id):
+    """Lift a suspension and retry the feed on the next cycle"""
+    return update_feed_fields(feed_id, {
+        "suspended": False,
+        "consecutive_failures": 0,
+        "next_retry_at": None
+    })
+
+@requires_storage
 def update_status(field, increment=1):
     """Update status counters"""
     if isinstance(status_collection, dict):
@@ -222,6 +763,7 @@ def update_status(field, increment=1):
             status_collection["system"][field] += increment
         else:
             status_collection["system"][field] = increment
+        _persist("merge", "status", "system", {field: status_collection["system"][field]})
     else:
         # MongoDB update
         status_collection.update_one(
@@ -229,6 +771,7 @@ def update_status(field, increment=1):
             {"$inc": {field: increment}}
         )
 
+@requires_storage
 def get_status():
     """Get system status"""
     if isinstance(status_collection, dict):
@@ -238,29 +781,17 @@ def get_status():
         return status_collection.find_one({"_id": "system"}) or {}
 
 def clean_html(html_text):
-    """Remove HTML tags from text"""
-    if not html_text:
-        return ""
-    # Remove HTML tags
-    clean = re.sub(r'<.*?>', '', html_text)
-    # Fix common HTML entities
-    clean = html.unescape(clean)
-    # Limit length
-    if len(clean) > 300:
-        clean = clean[:297] + "..."
-    return clean
-
-def format_entry(entry, template):
-    """Format entry with template"""
-    title = entry.get('title', 'No Title')
-    link = entry.get('link', '')
+    """Convert HTML to Markdown-safe text, limited to 300 characters"""
+    # Stops scanning as soon as enough text has been produced
+    return html_to_text(html_text, limit=300)
+
+def format_entry(entry: EntryRecord, template):
+    """Format entry record with template"""
+    title = entry.title
+    link = entry.link
     
     # Get description/summary, clean HTML
-    description = ''
-    if 'description' in entry:
-        description = clean_html(entry.description)
-    elif 'summary' in entry:
-        description = clean_html(entry.summary)
+    description = clean_html(entry.description)
     
     try:
         message = template.format(
@@ -296,89 +827,280 @@ def parse_schedule(schedule):
     
     return minutes
 
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (0 if unknown)"""
+    if resource is None:
+        return 0.0
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+_feeds_in_progress = set()
+_feeds_in_progress_lock = threading.Lock()
+
+def _claim_feed(feed_id):
+    with _feeds_in_progress_lock:
+        if feed_id in _feeds_in_progress:
+            return False
+        _feeds_in_progress.add(feed_id)
+        return True
+
+def _release_feed(feed_id):
+    with _feeds_in_progress_lock:
+        _feeds_in_progress.discard(feed_id)
+
+def _watched_since(feed):
+    """When the feed was added, in epoch seconds (None if unknown)"""
+    try:
+        return datetime.fromisoformat(feed["created_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def post_new_entries(context: CallbackContext, feed, entries, usage):
+    """Format and send the entries not posted yet; True if none was left over"""
+    feed_id = feed.get("_id")
+    channel = feed.get("channel")
+    format_template = feed.get("format_template", "detailed")
+    custom_format = feed.get("custom_format")
+    
+    # Get the template
+    if format_template == "custom" and custom_format:
+        template = custom_format
+    else:
+        template = FEED_FORMATS.get(format_template, FEED_FORMATS["detailed"])
+    
+    posted_count = 0
+    filtered_count = 0
+    send_failed = False
+    throttled = False
+    messages_left = accounting.messages_left(feed)
+    
+    # The feed's include/exclude rules, compiled once and cached
+    entry_filter = filter_cache.get(feed)
+    since = _watched_since(feed)
+    
+    # Posts go out through the bot pool when there is one
+    sender = bot_pool or context.bot
+    
+    for entry in entries:
+        usage.entries += 1
+        if is_entry_posted(feed_id, entry.entry_id):
+            continue
+        
+        # First sighting starts the delivery lag clock
+        freshness.seen(feed_id, entry.entry_id, entry.published, since)
+        
+        # Filtered out: remember it as seen so it isn't evaluated again
+        if entry_filter and not entry_filter.accepts(entry):
+            mark_entry_posted(feed_id, entry.entry_id)
+            freshness.discard(feed_id, entry.entry_id)
+            filtered_count += 1
+            continue
+        
+        # Daily message quota used up; the rest waits for tomorrow
+        if messages_left is not None and posted_count >= messages_left:
+            logger.warning(f"Feed {feed_id} reached its daily message quota")
+            throttled = True
+            break
+        
+        # Format and post the message
+        message = format_entry(entry, template)
+        
+        try:
+            sender.send_message(
+                chat_id=channel,
+                text=message,
+                parse_mode=telegram.ParseMode.MARKDOWN,
+                disable_web_page_preview=False
+            )
+            
+            mark_entry_posted(feed_id, entry.entry_id)
+            freshness.delivered(feed_id, entry.entry_id)
+            posted_count += 1
+            usage.messages += 1
+            
+            # The bot pool paces sends per channel and per bot itself
+            if bot_pool is None:
+                # Add a delay to avoid rate limiting
+                time.sleep(1)
+            
+        except Exception as e:
+            logger.error(f"Error posting to channel {channel}: {str(e)}")
+            update_status("errors")
+            send_failed = True
+    
+    # Update status
+    if posted_count > 0:
+        logger.info(f"Posted {posted_count} new entries for feed {feed_id}")
+        update_status("entries_posted", posted_count)
+    if filtered_count > 0:
+        logger.info(f"Filtered out {filtered_count} entries for feed {feed_id}")
+        update_status("entries_filtered", filtered_count)
+    
+    return not send_failed and not throttled
+
+def check_feed(context: CallbackContext, feed):
+    """Fetch one feed and post its new entries"""
+    feed_id = feed.get("_id")
+    url = feed.get("url")
+    
+    logger.info(f"Checking feed {feed_id}: {url}")
+    
+    usage = accounting.FeedUsage()
+    try:
+        # Stream the raw body (conditionally, capped in size and stopping
+        # after the entries we need) so unchanged responses are recognised
+        try:
+            digest, result = feed_loader.fetch_feed_digest(url, max_bytes=feed.get("max_bytes"), usage=usage)
+        except fetcher.FeedTooLarge as e:
+            logger.error(f"Skipping feed {feed_id}: {e}")
+            record_feed_failure(context, feed, str(e))
+            return
+        
+        # Every entry of this exact body was already handled
+        if feed_cache.is_settled(feed_id, digest):
+            logger.info(f"Feed {feed_id} unchanged since last check")
+            record_feed_success(feed)
+            update_last_check(feed_id)
+            update_status("feeds_processed")
+            return
+        
+        # Get the 10 most recent entries, parsing only unseen bodies; only
+        # compact records are kept and the parse tree is dropped right away
+        try:
+            digest, entries = feed_loader.load_feed_entries(url, digest, result, max_bytes=feed.get("max_bytes"),
+                                                            usage=usage)
+        except feed_loader.FeedParseError as e:
+            logger.error(f"Feed parsing error for {url}: {e}")
+            record_feed_failure(context, feed, f"Parsing error: {e}")
+            return
+        
+        # Nor is the raw body needed once entries are extracted
+        result = None
+        
+        # Unposted entries must be retried even if the body doesn't change
+        if post_new_entries(context, feed, entries, usage):
+            feed_cache.mark_settled(feed_id, digest)
+        
+        # Update last check time
+        record_feed_success(feed)
+        update_last_check(feed_id)
+        update_status("feeds_processed")
+        
+    except Exception as e:
+        # Usually the host is down or unreachable
+        logger.error(f"Error checking feed {feed_id}: {str(e)}")
+        record_feed_failure(context, feed, str(e))
+    
+    finally:
+        if usage:
+            add_feed_usage(feed, usage)
+
+def handle_pushed_content(context: CallbackContext, feed_id, body, headers):
+    """Post new entries from content a WebSub hub pushed for a feed"""
+    feed = get_feed(feed_id)
+    if not feed or not feed.get("active", True) or feed.get("suspended"):
+        return
+    if not _claim_feed(feed_id):
+        # A check of this feed is running and will see the same entries
+        logger.info(f"Feed {feed_id} is being checked; dropping pushed content")
+        return
+    
+    usage = accounting.FeedUsage()
+    usage.bytes += len(body)
+    try:
+        digest = body_digest(body)
+        entries = feed_cache.get(digest)
+        if entries is None:
+            entries = feed_loader.parse_entries(fetcher.FetchResult(feed.get("url"), body, headers), usage)
+            feed_cache.put(digest, entries)
+        logger.info(f"WebSub push for feed {feed_id}: {len(entries)} entries")
+        post_new_entries(context, feed, entries, usage)
+        update_last_check(feed_id)
+    except Exception as e:
+        logger.error(f"Error handling pushed content for feed {feed_id}: {e}")
+    finally:
+        _release_feed(feed_id)
+        add_feed_usage(feed, usage)
+
+def _websub_lookup(feed_id):
+    feed = get_feed(feed_id)
+    return feed.get("websub") if feed else None
+
+def _websub_save(feed_id, subscription):
+    update_feed_fields(feed_id, {"websub": subscription})
+
+def start_websub(dispatcher):
+    """Create the WebSub manager and serve hub callbacks (if WEBSUB_CALLBACK_URL is set)"""
+    global websub_manager
+    context = telegram_ext.CallbackContext(dispatcher)
+    websub_manager = websub.WebSub(
+        _websub_lookup,
+        _websub_save,
+        lambda feed_id, body, headers: polling_pool.submit(handle_pushed_content, context, feed_id, body, headers),
+        websub.WEBSUB_SECRET or webhook.default_secret(dispatcher.bot.token)
+    )
+    if webhook.UPDATE_MODE == "webhook":
+        webhook.add_route(websub_manager.path, websub_manager.handle)
+    else:
+        websub.WebSubServer(websub_manager).start()
+
 # RSS feed checking function
 def check_feed_for_updates(context: CallbackContext, feed_id=None):
     """Check feed for updates and post new entries"""
+    # A no-op unless /profile (or PROFILE_CYCLES) asked for this cycle
+    with cycle_profiler.cycle():
+        _check_feeds(context, feed_id)
+
+def _check_feeds(context: CallbackContext, feed_id=None):
+    if not wait_for_storage():
+        logger.warning("Storage not ready yet, skipping this check")
+        return
+    
     if feed_id:
         feeds = [get_feed(feed_id)]
         if not feeds[0]:
             logger.error(f"Feed {feed_id} not found")
             return
     else:
-        feeds = get_feeds()
+        # Stream feeds in batches, fetching only what the cycle uses
+        feeds = iter_feeds(fields=POLL_FIELDS)
     
+    now = datetime.now()
     for feed in feeds:
-        feed_id = feed.get("_id")
-        url = feed.get("url")
-        channel = feed.get("channel")
-        format_template = feed.get("format_template", "detailed")
-        custom_format = feed.get("custom_format")
-        
         if not feed.get("active", True):
             continue
-            
-        logger.info(f"Checking feed {feed_id}: {url}")
         
+        # Subscribe, renew leases and retry failed subscriptions off the cycle
+        if websub_manager and websub.needs_subscribe(feed.get("websub"), now):
+            subscription = feed["websub"]
+            polling_pool.submit(websub_manager.subscribe, feed.get("_id"), subscription["hub"], subscription["topic"])
+        
+        # Broken feeds wait out their backoff instead of costing every cycle
+        if not is_feed_due(feed, now):
+            continue
+        
+        # Feeds over their byte/CPU quota are checked less often
+        if accounting.is_demoted(feed, now):
+            continue
+        
+        # A feed can be due in two jobs at once (e.g. right after /addfeed)
+        feed_id = feed.get("_id")
+        if not _claim_feed(feed_id):
+            logger.info(f"Feed {feed_id} is already being checked")
+            continue
         try:
-            # Parse the feed
-            parsed_feed = feedparser.parse(url)
-            
-            if hasattr(parsed_feed, 'bozo_exception') and parsed_feed.bozo_exception:
-                logger.error(f"Feed parsing error for {url}: {parsed_feed.bozo_exception}")
-                update_status("errors")
-                continue
-            
-            # Get the template
-            if format_template == "custom" and custom_format:
-                template = custom_format
-            else:
-                template = FEED_FORMATS.get(format_template, FEED_FORMATS["detailed"])
-            
-            # Get the 10 most recent entries
-            entries = parsed_feed.entries[:10]
-            posted_count = 0
-            
-            for entry in entries:
-                entry_id = entry.get('id', entry.get('link', ''))
-                if not entry_id:
-                    continue
-                    
-                if is_entry_posted(feed_id, entry_id):
-                    continue
-                
-                # Format and post the message
-                message = format_entry(entry, template)
-                
-                try:
-                    context.bot.send_message(
-                        chat_id=channel,
-                        text=message,
-                        parse_mode=ParseMode.MARKDOWN,
-                        disable_web_page_preview=False
-                    )
-                    
-                    mark_entry_posted(feed_id, entry_id)
-                    posted_count += 1
-                    
-                    # Add a delay to avoid rate limiting
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    logger.error(f"Error posting to channel {channel}: {str(e)}")
-                    update_status("errors")
-            
-            # Update status
-            if posted_count > 0:
-                logger.info(f"Posted {posted_count} new entries for feed {feed_id}")
-                update_status("entries_posted", posted_count)
-            
-            # Update last check time
-            update_last_check(feed_id)
-            update_status("feeds_processed")
-            
-        except Exception as e:
-            logger.error(f"Error checking feed {feed_id}: {str(e)}")
-            update_status("errors")
+            check_feed(context, feed)
+        finally:
+            _release_feed(feed_id)
+    
+    logger.info(f"Feed cache: {feed_cache.stats()}")
+    logger.info(f"Check finished, peak RSS {peak_rss_mb():.1f} MB")
+    snapshot_local_state()
+    startup_timer.first_cycle_done()
+
+def enqueue_check(context: CallbackContext, feed_id=None):
+    """Job callback: run check_feed_for_updates on the polling pool"""
+    polling_pool.submit(check_feed_for_updates, context, feed_id)
 
 # Command handlers
 def start(update: Update, context: CallbackContext) -> None:
@@ -395,11 +1117,11 @@ def start(update: Update, context: CallbackContext) -> None:
     add_admin(user.id, user.username)  # Ensure user is in admins table
     
     keyboard = [
-        [InlineKeyboardButton("➕ Add Feed", callback_data="add_feed")],
-        [InlineKeyboardButton("📋 List Feeds", callback_data="list_feeds")],
-        [InlineKeyboardButton("📊 Status", callback_data="status")]
+        [telegram.InlineKeyboardButton("➕ Add Feed", callback_data="add_feed")],
+        [telegram.InlineKeyboardButton("📋 List Feeds", callback_data="list_feeds")],
+        [telegram.InlineKeyboardButton("📊 Status", callback_data="status")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = telegram.InlineKeyboardMarkup(keyboard)
     
     welcome_message = (
         f"Welcome, {user.first_name}! 📢\n\n"
@@ -428,9 +1150,12 @@ def help_command(update: Update, context: CallbackContext) -> None:
         
         "*Feed Management:*\n"
         "/addfeed - Add a new RSS feed to monitor\n"
-        "/listfeeds - List all active feeds\n"
+        "/listfeeds - List all active feeds (/listfeeds costly for the most expensive)\n"
         "/removefeed - Remove a feed\n"
-        "/editfeed - Edit a feed's settings\n\n"
+        "/editfeed - Edit a feed's channel or include/exclude filters\n"
+        "/resumefeed - Resume a suspended feed\n"
+        "/importopml - Import feeds from an OPML file: /importopml @channel [schedule]\n"
+        "/exportopml - Export all feeds as an OPML file\n\n"
         
         "*Testing & Monitoring:*\n"
         "/testfeed - Test a feed without posting\n"
@@ -438,15 +1163,700 @@ def help_command(update: Update, context: CallbackContext) -> None:
         "/status - Check bot status and next scheduled runs\n\n"
         
         "*Admin Commands:*\n"
-        "/addadmin - Add a new admin user\n\n"
+        "/addadmin - Add a new admin user\n"
+        "/profile - Profile the next polling cycle(s): /profile <seconds>\n\n"
         
         "For more help, contact the bot developer."
     )
     
     keyboard = [
-        [InlineKeyboardButton("Add Feed", callback_data="add_feed")],
-        [InlineKeyboardButton("List Feeds", callback_data="list_feeds")]
+        [telegram.InlineKeyboardButton("Add Feed", callback_data="add_feed")],
+        [telegram.InlineKeyboardButton("List Feeds", callback_data="list_feeds")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = telegram.InlineKeyboardMarkup(keyboard)
+    
+    update.message.reply_text(help_text, reply_markup=reply_markup, parse_mode=telegram.ParseMode.MARKDOWN)
+
+def status_command(update: Update, context: CallbackContext) -> None:
+    if update.callback_query:
+        update.callback_query.answer()
+    
+    if not is_admin(update.effective_user.id):
+        update.effective_message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    status = get_status()
+    status_text = (
+        "🤖 *Bot Status*\n\n"
+        f"Active feeds: {count_feeds()}\n"
+        f"Entries posted: {status.get('entries_posted', 0)}\n"
+        f"Entries filtered out: {status.get('entries_filtered', 0)}\n"
+        f"Feeds processed: {status.get('feeds_processed', 0)}\n"
+        f"Errors: {status.get('errors', 0)}\n"
+        f"Running since: {status.get('started_at', 'unknown')}\n\n"
+        "*Worker pools*\n"
+    )
+    for name, stats in pool_stats().items():
+        status_text += (
+            f"{name}: {stats['queued']} queued, {stats['running']}/{stats['workers']} busy, "
+            f"wait avg {stats['avg_wait']:.2f}s max {stats['max_wait']:.2f}s\n"
+        )
+    if fast_parse.counters["fast"] or fast_parse.counters["fallback"]:
+        status_text += (
+            f"fast parser: {fast_parse.counters['fast']} feeds, "
+            f"{fast_parse.counters['fallback']} left to feedparser\n"
+        )
+    if parse_pool.enabled():
+        stats = parse_pool.stats()
+        status_text += (
+            f"parse processes: {stats['processes']}, {stats['offloaded']} feeds parsed, "
+            f"{stats['fallbacks']} in-process fallbacks\n"
+        )
+    if bot_pool and len(bot_pool) > 1:
+        status_text += "\n*Bots*\n"
+        for stats in bot_pool.stats():
+            status_text += (
+                f"{stats['name']}: {stats['sent']} sent, {stats['failures']} failures, "
+                f"{stats['flood_waits']} flood-waits"
+                + (f", resting {stats['cooling_down']}s" if stats['cooling_down'] else "")
+                + "\n"
+            )
+    overall = freshness.overall()
+    if overall["delivery"]["p50"] is not None:
+        status_text += (
+            "\n*Freshness* (p50 / p90)\n"
+            f"Detection: {format_lag(overall['detection']['p50'])} / {format_lag(overall['detection']['p90'])}\n"
+            f"Delivery: {format_lag(overall['delivery']['p50'])} / {format_lag(overall['delivery']['p90'])}\n"
+            "Slowest feeds (p90 published → sent):\n"
+        )
+        for feed_id, stats in freshness.slowest(SLOWEST_FEEDS):
+            total = stats["total"]["p90"]
+            status_text += (
+                f"{escape_markdown(str(feed_id))}: {format_lag(total)} "
+                f"(detect {format_lag(stats['detection']['p90'])}, "
+                f"deliver {format_lag(stats['delivery']['p90'])}, {stats['delivered']} sent)\n"
+            )
+    memory = memory_watchdog.stats()
+    if memory["rss_mb"] is not None:
+        status_text += (
+            f"\n*Memory*\nRSS {memory['rss_mb']:.0f} MB (peak {memory['peak_mb']:.0f} MB), "
+            f"soft limit {memory['soft_limit_mb']:.0f} MB"
+            + (" ⚠️ exceeded" if memory["over_limit"] else "") + "\n"
+        )
+        event = memory["last_event"]
+        if event:
+            status_text += (
+                f"Caches evicted {memory['limit_crossings']}x, last at {event['at']}: "
+                f"{event['rss_before']:.0f} → {event['rss_after']:.0f} MB\n"
+            )
+            if event["report"]:
+                status_text += f"Report: {escape_markdown(event['report'])}\n"
+        for line in memory["growth"][:3]:
+            status_text += f"+ {escape_markdown(line)}\n"
+    if websub_manager:
+        counters = websub_manager.counters
+        status_text += (
+            f"\n*WebSub*\n{counters['pushed']} pushes, {counters['rejected']} rejected, "
+            f"{counters['verified']} verifications, {counters['denied']} denied\n"
+        )
+    
+    update.effective_message.reply_text(status_text, parse_mode=telegram.ParseMode.MARKDOWN)
+
+def resume_feed_command(update: Update, context: CallbackContext) -> None:
+    if not is_admin(update.effective_user.id):
+        update.message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    if not context.args:
+        update.message.reply_text("Usage: /resumefeed <feed_id>")
+        return
+    
+    feed_id = context.args[0]
+    if not get_feed(feed_id):
+        update.message.reply_text(f"Feed {feed_id} not found.")
+        return
+    
+    resume_feed(feed_id)
+    update.message.reply_text(f"▶️ Feed {feed_id} resumed; it will be checked on the next cycle.")
+
+EDIT_FEED_USAGE = (
+    "Usage: /editfeed <feed_id> [field value]\n\n"
+    "Fields:\n"
+    "channel @channel\n"
+    "include rule, rule, ...\n"
+    "exclude rule, rule, ...\n\n"
+    "A rule is a keyword or phrase, a /regex/ or category:Name. "
+    "Entries must match an include rule (if any) and no exclude rule. "
+    "Use - to clear a rule list."
+)
+
+def edit_feed_command(update: Update, context: CallbackContext) -> None:
+    """Show or change a feed's settings, including its filters"""
+    if not is_admin(update.effective_user.id):
+        update.message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    if not context.args:
+        update.message.reply_text(EDIT_FEED_USAGE)
+        return
+    
+    feed_id = context.args[0]
+    feed = get_feed(feed_id)
+    if not feed:
+        update.message.reply_text(f"Feed {feed_id} not found.")
+        return
+    
+    if len(context.args) == 1:
+        filters = feed.get("filters") or {}
+        update.message.reply_text(
+            f"Feed {feed_id}: {feed.get('url')}\n"
+            f"channel: {feed.get('channel')}\n"
+            f"include: {', '.join(filters.get('include') or []) or '-'}\n"
+            f"exclude: {', '.join(filters.get('exclude') or []) or '-'}"
+        )
+        return
+    
+    field = context.args[1].lower()
+    value = " ".join(context.args[2:]).strip()
+    
+    if field in ("include", "exclude"):
+        filters = dict(feed.get("filters") or {})
+        filters[field] = parse_rules(value)
+        try:
+            compile_rules(filters)
+        except FilterError as e:
+            update.message.reply_text(f"❌ {e}")
+            return
+        update_feed(feed_id, "filters", filters)
+        rules = ", ".join(filters[field]) or "none"
+        update.message.reply_text(f"✅ {field.capitalize()} rules of {feed_id}: {rules}")
+    elif field == "channel" and value:
+        update_feed(feed_id, "channel", value)
+        update.message.reply_text(f"✅ Feed {feed_id} now posts to {value}")
+    else:
+        update.message.reply_text(EDIT_FEED_USAGE)
+
+IMPORT_OPML_USAGE = (
+    "Usage: /importopml [@channel] [schedule]\n\n"
+    "Then send the .opml file, or send it with the command as its caption. "
+    "Feeds go to the outline's channel attribute if it has one, otherwise to @channel."
+)
+
+def _opml_import_args(args):
+    """(channel, schedule) from /importopml arguments, or None if they don't parse"""
+    channel, schedule = None, "2h"
+    for arg in args:
+        if re.fullmatch(r"\d+[mhd]", arg.lower()):
+            schedule = arg.lower()
+        elif channel is None:
+            channel = arg
+        else:
+            return None
+    return channel, schedule
+
+def import_opml_command(update: Update, context: CallbackContext) -> None:
+    """Remember the target channel and schedule for the next OPML file"""
+    if not is_admin(update.effective_user.id):
+        update.message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    options = _opml_import_args(context.args or [])
+    if options is None:
+        update.message.reply_text(IMPORT_OPML_USAGE)
+        return
+    
+    context.user_data["opml_import"] = options
+    channel, schedule = options
+    update.message.reply_text(
+        f"📥 Send the OPML file now. Feeds without their own channel go to {channel or '(none given)'}, "
+        f"checked every {schedule}."
+    )
+
+def opml_document(update: Update, context: CallbackContext) -> None:
+    """Import an OPML file sent after /importopml or with it as the caption"""
+    message = update.message
+    if not is_admin(update.effective_user.id):
+        return
+    
+    caption = (message.caption or "").split()
+    if caption and caption[0].split("@")[0] == "/importopml":
+        options = _opml_import_args(caption[1:])
+        if options is None:
+            message.reply_text(IMPORT_OPML_USAGE)
+            return
+    else:
+        options = context.user_data.pop("opml_import", None)
+        if options is None:
+            # Not meant for us
+            return
+    channel, schedule = options
+    
+    document = message.document
+    if document.file_size and document.file_size > opml.MAX_OPML_BYTES:
+        message.reply_text(f"❌ The file is larger than {opml.MAX_OPML_BYTES // 1024} KB.")
+        return
+    
+    message.reply_text("⏳ Validating the feeds, this may take a while...")
+    data = bytes(context.bot.get_file(document.file_id).download_as_bytearray())
+    try:
+        report = import_opml(data, channel, schedule, "detailed", update.effective_user.id)
+    except opml.OPMLError as e:
+        message.reply_text(f"❌ {e}")
+        return
+    
+    summary = f"📥 OPML import: {opml.summarize(report)}"
+    details = opml.format_report(report)
+    if len(summary) + len(details) < 4000:
+        message.reply_text(f"{summary}\n\n{details}", disable_web_page_preview=True)
+    else:
+        message.reply_document(document=io.BytesIO(details.encode("utf-8")), filename="opml_import.txt",
+                               caption=summary)
+    
+    if any(item["status"] == "added" for item in report):
+        # New feeds are due right away; validation left their entries in the cache
+        context.job_queue.run_once(enqueue_check, 0)
+
+def export_opml_command(update: Update, context: CallbackContext) -> None:
+    """Send all active feeds as an OPML file"""
+    if not is_admin(update.effective_user.id):
+        update.message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    # Streamed to a temporary file, a page of feeds at a time
+    with tempfile.TemporaryFile() as f:
+        out = io.TextIOWrapper(f, encoding="utf-8")
+        count = opml.write_opml(iter_feeds(EXPORT_FIELDS), out)
+        out.flush()
+        f.seek(0)
+        update.message.reply_document(document=f, filename="feeds.opml", caption=f"📤 {count} feeds")
+        out.detach()
+
+def profile_command(update: Update, context: CallbackContext) -> None:
+    """Profile polling cycles and send the report as a document"""
+    if not is_admin(update.effective_user.id):
+        update.message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    seconds = 0
+    if context.args:
+        try:
+            seconds = max(0, int(context.args[0]))
+        except ValueError:
+            update.message.reply_text("Usage: /profile [seconds]")
+            return
+    
+    chat_id = update.effective_chat.id
+    
+    def send_report(path, summary):
+        with open(path, "rb") as f:
+            context.bot.send_document(chat_id=chat_id, document=f, filename=os.path.basename(path),
+                                      caption=f"🔬 {summary}"[:1024])
+    
+    if not cycle_profiler.start(seconds=seconds, on_report=send_report):
+        update.message.reply_text("A profile is already being collected.")
+        return
     
-    update.message.reply_text(help_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+    if seconds:
+        update.message.reply_text(f"🔬 Profiling polling cycles for the next {seconds}s; starting one now.")
+    else:
+        update.message.reply_text("🔬 Profiling the next polling cycle; starting it now.")
+    context.job_queue.run_once(enqueue_check, 0)
+
+def _feeds_page_message(after=None, before=None):
+    """Render one /listfeeds page; returns (text, reply_markup) or None if empty"""
+    # One extra row tells whether there is a further page
+    feeds = get_feeds_page(after=after, before=before, limit=FEEDS_PAGE_SIZE + 1, fields=LIST_FIELDS)
+    if before is not None:
+        has_prev, feeds = len(feeds) > FEEDS_PAGE_SIZE, feeds[-FEEDS_PAGE_SIZE:]
+        has_next = True
+    else:
+        has_next, feeds = len(feeds) > FEEDS_PAGE_SIZE, feeds[:FEEDS_PAGE_SIZE]
+        has_prev = False
+        if after is not None and feeds:
+            has_prev = bool(get_feeds_page(before=feeds[0]["_id"], limit=1, fields=["_id"]))
+    if not feeds:
+        return None
+    
+    lines = ["📋 *Active Feeds*\n"]
+    for feed in feeds:
+        lines.append(
+            f"*{escape_markdown(str(feed['_id']))}*\n"
+            f"{escape_markdown(feed.get('url', ''))}\n"
+            f"→ {escape_markdown(str(feed.get('channel', '')))}\n"
+            + ("⏸ suspended\n" if feed.get("suspended") else "")
+            + ("⚡ pushed via WebSub\n" if websub.is_push_active(feed.get("websub")) else "")
+        )
+    
+    nav = []
+    if has_prev:
+        nav.append(telegram.InlineKeyboardButton("◀️ Prev", callback_data=f"feeds_prev:{feeds[0]['_id']}"))
+    if has_next:
+        nav.append(telegram.InlineKeyboardButton("Next ▶️", callback_data=f"feeds_next:{feeds[-1]['_id']}"))
+    keyboard = [nav] if nav else []
+    keyboard.append([telegram.InlineKeyboardButton("💸 Top costly feeds", callback_data="costly_feeds")])
+    return "\n".join(lines), telegram.InlineKeyboardMarkup(keyboard)
+
+def list_feeds_command(update: Update, context: CallbackContext) -> None:
+    if update.callback_query:
+        update.callback_query.answer()
+    
+    if not is_admin(update.effective_user.id):
+        update.effective_message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    if context.args and context.args[0] == "costly":
+        return costly_feeds_command(update, context)
+    
+    page = _feeds_page_message()
+    if page is None:
+        update.effective_message.reply_text("No active feeds. Use /addfeed to add one.")
+        return
+    
+    text, reply_markup = page
+    update.effective_message.reply_text(
+        text,
+        parse_mode=telegram.ParseMode.MARKDOWN,
+        disable_web_page_preview=True,
+        reply_markup=reply_markup
+    )
+
+def list_feeds_page_callback(update: Update, context: CallbackContext) -> None:
+    """Handle the /listfeeds next/prev buttons"""
+    query = update.callback_query
+    query.answer()
+    
+    if not is_admin(update.effective_user.id):
+        return
+    
+    direction, feed_id = query.data.split(":", 1)
+    if direction == "feeds_next":
+        page = _feeds_page_message(after=feed_id)
+    else:
+        page = _feeds_page_message(before=feed_id)
+    if page is None:
+        return
+    
+    text, reply_markup = page
+    query.edit_message_text(
+        text,
+        parse_mode=telegram.ParseMode.MARKDOWN,
+        disable_web_page_preview=True,
+        reply_markup=reply_markup
+    )
+
+def costly_feeds_command(update: Update, context: CallbackContext) -> None:
+    """Show the feeds that used the most bytes, parse CPU and messages"""
+    if update.callback_query:
+        update.callback_query.answer()
+    
+    if not is_admin(update.effective_user.id):
+        update.effective_message.reply_text("Sorry, you're not authorized to use this bot.")
+        return
+    
+    ranked = accounting.top_costly(iter_feeds(fields=COST_FIELDS))
+    lines = [f"💸 *Top costly feeds* (last {accounting.USAGE_HISTORY_DAYS} days)\n"]
+    for feed, totals in ranked:
+        throttled = accounting.over_quota(feed)
+        lines.append(
+            f"*{escape_markdown(str(feed['_id']))}* {escape_markdown(feed.get('url', ''))}\n"
+            f"{totals['bytes'] / (1024 * 1024):.1f} MB, {totals['parse_cpu']:.1f}s CPU, "
+            f"{totals['entries']} entries, {totals['messages']} messages"
+            + (f" — over quota: {escape_markdown(', '.join(throttled))}" if throttled else "")
+            + "\n"
+        )
+    
+    update.effective_message.reply_text(
+        "\n".join(lines),
+        parse_mode=telegram.ParseMode.MARKDOWN,
+        disable_web_page_preview=True
+    )
+
+def _schedule_keyboard():
+    keyboard = [
+        [telegram.InlineKeyboardButton("1 hour", callback_data="schedule_1h")],
+        [telegram.InlineKeyboardButton("2 hours", callback_data="schedule_2h")],
+        [telegram.InlineKeyboardButton("6 hours", callback_data="schedule_6h")],
+        [telegram.InlineKeyboardButton("12 hours", callback_data="schedule_12h")],
+        [telegram.InlineKeyboardButton("24 hours", callback_data="schedule_24h")],
+        [telegram.InlineKeyboardButton("Custom", callback_data="schedule_custom")]
+    ]
+    return telegram.InlineKeyboardMarkup(keyboard)
+
+def _format_keyboard():
+    keyboard = [
+        [telegram.InlineKeyboardButton(name.capitalize(), callback_data=f"format_{name}")]
+        for name in FEED_FORMATS
+    ]
+    return telegram.InlineKeyboardMarkup(keyboard)
+
+def add_feed_command(update: Update, context: CallbackContext) -> int:
+    if update.callback_query:
+        update.callback_query.answer()
+    
+    if not is_admin(update.effective_user.id):
+        update.effective_message.reply_text("Sorry, you're not authorized to use this bot.")
+        return telegram_ext.ConversationHandler.END
+        
+    update.effective_message.reply_text(
+        "Let's add a new RSS feed! 📰\n\n"
+        "Please send me the URL of the RSS feed."
+    )
+    return ADDING_FEED_URL
+
+def add_feed_url(update: Update, context: CallbackContext) -> int:
+    """Validate the feed URL (runs async, off the dispatcher thread)"""
+    url = update.message.text.strip()
+    context.user_data["feed_url"] = url
+    
+    progress = update.message.reply_text("⏳ Checking feed…")
+    
+    # Download and parse on the validation executor; the parsed entries and
+    # validators stay cached so the first poll of this feed starts warm
+    result = feed_loader.validate_feed_with_timeout(url)
+    if result.error:
+        progress.edit_text(
+            f"{result.error}\n"
+            "Please check the URL and try again."
+        )
+        return ADDING_FEED_URL
+    
+    context.user_data["feed_hub"] = result.hub
+    context.user_data["feed_topic"] = result.topic
+    push_note = "*Updates:* pushed by the feed's hub\n" if result.hub and websub_manager else ""
+    
+    progress.edit_text(
+        f"✅ Feed validated successfully!\n\n"
+        f"*Title:* {result.title}\n"
+        f"*Entries:* {len(result.entries)}\n"
+        f"{push_note}\n"
+        "Now, please specify the Telegram channel where you want to post updates.\n"
+        "Format: @channelname or -100123456789",
+        parse_mode=telegram.ParseMode.MARKDOWN
+    )
+    return ADDING_FEED_CHANNEL
+
+def add_feed_channel(update: Update, context: CallbackContext) -> int:
+    channel = update.message.text.strip()
+    context.user_data["feed_channel"] = channel
+    
+    # Offer time zone options
+    keyboard = []
+    for tz in ["UTC", "US/Eastern", "US/Pacific", "Europe/London", "Asia/Tokyo", "Asia/Kolkata"]:
+        keyboard.append([telegram.InlineKeyboardButton(tz, callback_data=f"tz_{tz}")])
+    keyboard.append([telegram.InlineKeyboardButton("Other (specify)", callback_data="tz_other")])
+    reply_markup = telegram.InlineKeyboardMarkup(keyboard)
+    
+    update.message.reply_text(
+        "Great! Now select the time zone for this feed:",
+        reply_markup=reply_markup
+    )
+    return ADDING_FEED_TIMEZONE
+
+def add_feed_timezone_callback(update: Update, context: CallbackContext) -> int:
+    query = update.callback_query
+    query.answer()
+    
+    if query.data == "tz_other":
+        query.edit_message_text(
+            "Please enter your preferred time zone (e.g., 'Europe/Berlin', 'Asia/Singapore').\n"
+            "You can find all time zones at https://en.wikipedia.org/wiki/List_of_tz_database_time_zones"
+        )
+        return ADDING_FEED_TIMEZONE
+    
+    timezone = query.data[3:]  # Remove 'tz_' prefix
+    context.user_data["feed_timezone"] = timezone
+    query.edit_message_text(
+        f"Time zone set to {timezone}.\n"
+        f"Now select how often you want to check for updates:",
+        reply_markup=_schedule_keyboard()
+    )
+    return ADDING_FEED_SCHEDULE
+
+def add_feed_timezone_text(update: Update, context: CallbackContext) -> int:
+    timezone = update.message.text.strip()
+    try:
+        pytz.timezone(timezone)
+    except Exception as e:
+        update.message.reply_text(
+            f"Invalid time zone: {str(e)}.\n"
+            "Please enter a valid time zone (e.g., 'Europe/Berlin', 'Asia/Singapore')."
+        )
+        return ADDING_FEED_TIMEZONE
+    
+    context.user_data["feed_timezone"] = timezone
+    update.message.reply_text(
+        f"Time zone set to {timezone}.\n"
+        f"Now select how often you want to check for updates:",
+        reply_markup=_schedule_keyboard()
+    )
+    return ADDING_FEED_SCHEDULE
+
+def add_feed_schedule_callback(update: Update, context: CallbackContext) -> int:
+    query = update.callback_query
+    query.answer()
+    
+    if query.data == "schedule_custom":
+        query.edit_message_text("Please enter the check interval (e.g., '30m', '3h', '1d'):")
+        return ADDING_FEED_SCHEDULE
+    
+    schedule = query.data[9:]  # Remove 'schedule_' prefix
+    context.user_data["feed_schedule"] = schedule
+    query.edit_message_text(
+        f"Schedule set to every {schedule}.\n"
+        "Finally, choose the message format:",
+        reply_markup=_format_keyboard()
+    )
+    return ADDING_FEED_FORMAT
+
+def add_feed_schedule_text(update: Update, context: CallbackContext) -> int:
+    schedule = update.message.text.strip().lower()
+    if not re.fullmatch(r"\d+[mhd]", schedule):
+        update.message.reply_text("Invalid interval. Please use a number followed by m, h or d (e.g., '30m', '3h').")
+        return ADDING_FEED_SCHEDULE
+    
+    context.user_data["feed_schedule"] = schedule
+    update.message.reply_text(
+        f"Schedule set to every {schedule}.\n"
+        "Finally, choose the message format:",
+        reply_markup=_format_keyboard()
+    )
+    return ADDING_FEED_FORMAT
+
+def add_feed_format_callback(update: Update, context: CallbackContext) -> int:
+    query = update.callback_query
+    query.answer()
+    
+    format_template = query.data[7:]  # Remove 'format_' prefix
+    context.user_data["feed_format"] = format_template
+    
+    if format_template == "custom":
+        query.edit_message_text(
+            "Send me your custom template. You can use {title}, {link} and {description}."
+        )
+        return ADDING_FEED_FORMAT
+    
+    return _save_new_feed(query.message, update.effective_user, context)
+
+def add_feed_custom_format(update: Update, context: CallbackContext) -> int:
+    context.user_data["feed_custom_format"] = update.message.text
+    return _save_new_feed(update.message, update.effective_user, context)
+
+def _save_new_feed(message, user, context: CallbackContext) -> int:
+    data = context.user_data
+    feed_id = add_feed(
+        data["feed_url"],
+        data["feed_channel"],
+        data.get("feed_timezone", "UTC"),
+        data.get("feed_schedule", "2h"),
+        data.get("feed_format", "detailed"),
+        data.get("feed_custom_format"),
+        user.id
+    )
+    
+    # First poll runs right away, reusing the parse from validation
+    context.job_queue.run_once(lambda ctx: enqueue_check(ctx, feed_id), 0)
+    
+    # Feeds with a hub are pushed to us once the hub verifies the subscription
+    if websub_manager and data.get("feed_hub"):
+        polling_pool.submit(websub_manager.subscribe, feed_id, data["feed_hub"], data["feed_topic"])
+    
+    message.reply_text(
+        f"✅ Feed added! (ID: {feed_id})\n\n"
+        f"URL: {data['feed_url']}\n"
+        f"Channel: {data['feed_channel']}"
+    )
+    data.clear()
+    return telegram_ext.ConversationHandler.END
+
+def cancel(update: Update, context: CallbackContext) -> int:
+    context.user_data.clear()
+    update.effective_message.reply_text("Cancelled.")
+    return telegram_ext.ConversationHandler.END
+
+def add_feed_conversation():
+    """Build the /addfeed conversation handler"""
+    ext = telegram_ext
+    text = ext.Filters.text & ~ext.Filters.command
+    return ext.ConversationHandler(
+        entry_points=[
+            ext.CommandHandler("addfeed", add_feed_command),
+            ext.CallbackQueryHandler(add_feed_command, pattern="^add_feed$")
+        ],
+        states={
+            # Validation may take a while; run it without blocking the dispatcher
+            ADDING_FEED_URL: [ext.MessageHandler(text, add_feed_url, run_async=True)],
+            ADDING_FEED_CHANNEL: [ext.MessageHandler(text, add_feed_channel)],
+            ADDING_FEED_TIMEZONE: [
+                ext.CallbackQueryHandler(add_feed_timezone_callback, pattern="^tz_"),
+                ext.MessageHandler(text, add_feed_timezone_text)
+            ],
+            ADDING_FEED_SCHEDULE: [
+                ext.CallbackQueryHandler(add_feed_schedule_callback, pattern="^schedule_"),
+                ext.MessageHandler(text, add_feed_schedule_text)
+            ],
+            ADDING_FEED_FORMAT: [
+                ext.CallbackQueryHandler(add_feed_format_callback, pattern="^format_"),
+                ext.MessageHandler(text, add_feed_custom_format)
+            ]
+        },
+        fallbacks=[ext.CommandHandler("cancel", cancel)]
+    )
+
+def main() -> None:
+    """Start the bot: connect storage in the background and begin polling"""
+    token = os.environ.get("TELEGRAM_BOT_TOKEN")
+    if not token:
+        logger.error("No TELEGRAM_BOT_TOKEN found in environment variables!")
+        return
+    
+    # Connect while telegram is being imported and the updater is built
+    start_storage_connect()
+    
+    updater = telegram_ext.Updater(token)
+    dispatcher = updater.dispatcher
+    
+    global bot_pool
+    bot_pool = BotPool.from_env(updater.bot)
+    
+    # Interactive commands run on their own pool so they never wait behind
+    # a polling cycle; the dispatcher thread only hands them off
+    interactive = run_in(interactive_pool)
+    dispatcher.add_handler(telegram_ext.CommandHandler("start", interactive(start)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("help", interactive(help_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("status", interactive(status_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("listfeeds", interactive(list_feeds_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("resumefeed", interactive(resume_feed_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("editfeed", interactive(edit_feed_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("profile", interactive(profile_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("importopml", interactive(import_opml_command)))
+    dispatcher.add_handler(telegram_ext.CommandHandler("exportopml", interactive(export_opml_command)))
+    dispatcher.add_handler(telegram_ext.MessageHandler(telegram_ext.Filters.document, interactive(opml_document)))
+    dispatcher.add_handler(add_feed_conversation())
+    dispatcher.add_handler(telegram_ext.CallbackQueryHandler(interactive(status_command), pattern="^status$"))
+    dispatcher.add_handler(telegram_ext.CallbackQueryHandler(interactive(list_feeds_command), pattern="^list_feeds$"))
+    dispatcher.add_handler(telegram_ext.CallbackQueryHandler(interactive(costly_feeds_command), pattern="^costly_feeds$"))
+    dispatcher.add_handler(telegram_ext.CallbackQueryHandler(interactive(list_feeds_page_callback), pattern="^feeds_(next|prev):"))
+    
+    if websub.enabled():
+        start_websub(dispatcher)
+    
+    if PROFILE_CYCLES:
+        cycle_profiler.start(cycles=PROFILE_CYCLES)
+    
+    # Caches that refill on their own; the posted-entry records are state, not cache
+    memory_watchdog.add_evictor("parsed feeds", feed_cache.clear)
+    memory_watchdog.add_evictor("filters", filter_cache.clear)
+    memory_watchdog.add_evictor("pending lags", freshness.clear_pending)
+    memory_watchdog.start()
+    
+    # First cycle runs immediately; it waits for storage readiness itself.
+    # Cycles run on the bounded polling pool, not the job queue's threads
+    updater.job_queue.run_repeating(enqueue_check, interval=CHECK_INTERVAL, first=0)
+    
+    logger.info(f"Bot started in {startup_timer.elapsed():.3f}s")
+    
+    # Long polling or webhook, depending on UPDATE_MODE
+    webhook.run(updater)
+
+if __name__ == '__main__':
+    main()
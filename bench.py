@@ -0,0 +1,465 @@
+"""Microbenchmarks for the per-entry hot path
+
+    python bench.py run [--quick] [--filter TEXT] [--save FILE [--merge]]
+    python bench.py compare BASELINE [--current FILE] [--quick] [--filter TEXT] [--threshold 1.3]
+
+`run` times every benchmark and optionally saves the results as a JSON
+baseline, or with --merge updates the benchmarks it ran in an existing
+one. `compare` times them again (or reads --current) and exits with
+status 1 if any benchmark got slower than `threshold` times its baseline.
+--quick skips the largest sizes (1M history entries, 10 MB feed).
+
+The MongoDB dedup benchmarks run only when BENCH_MONGODB_URI is set; they
+use a throwaway "rss_bot_bench" database. Benchmarks that can't run here
+are listed as skipped, with the reason.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Keep the benchmarks away from the real state directory
+os.environ.setdefault("STATE_DIR", "")
+
+import feedparser
+
+import app
+import fast_parse
+import feed_filters
+import rss_to_telegram
+from entries import EntryRecord
+
+BENCH_MONGODB_URI = os.environ.get("BENCH_MONGODB_URI", "")
+
+# Each round runs the function in a loop for at least this long
+MIN_ROUND_TIME = 0.05
+ROUNDS = 5
+
+DEFAULT_THRESHOLD = 1.3
+
+# name -> (factory, rounds, quick); a factory does the setup and returns
+# the function to time
+BENCHMARKS = {}
+
+# name -> why it can't run here; reported instead of timed
+SKIPPED = {}
+
+_workdir = None
+
+
+def benchmark(name, rounds=ROUNDS, quick=True):
+    def decorator(factory):
+        BENCHMARKS[name] = (factory, rounds, quick)
+        return factory
+    return decorator
+
+
+def workdir():
+    """Temporary directory shared by the benchmarks of one run"""
+    global _workdir
+    if _workdir is None:
+        _workdir = tempfile.mkdtemp(prefix="rss-bench-")
+    return _workdir
+
+
+# Fixtures
+
+SAMPLE_HTML = (
+    "<div class='post'><p>Breaking: <b>prices</b> &amp; <i>markets</i> moved today after "
+    "<a href='https://example.com/x?a=1&amp;b=2'>the report</a> was published.</p>"
+    "<script>var tracking = 1;</script><ul><li>First point</li><li>Second_point *bold*</li></ul>"
+    "<p>" + "More text about the story. " * 40 + "</p></div>"
+)
+
+
+def make_feed(size):
+    """A deterministic RSS 2.0 document of about `size` bytes"""
+    items = []
+    total = 0
+    for i in itertools.count():
+        item = (
+            f"<item><title>Entry {i} about something</title>"
+            f"<link>https://example.com/posts/{i}</link><guid>https://example.com/posts/{i}</guid>"
+            f"<pubDate>Mon, 06 Jan 2025 10:{i % 60:02d}:00 GMT</pubDate>"
+            f"<description>{SAMPLE_HTML.replace('&', '&amp;').replace('<', '&lt;')}</description></item>"
+        )
+        items.append(item)
+        total += len(item)
+        if total >= size:
+            break
+    return (
+        "<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel>"
+        "<title>Bench feed</title><link>https://example.com/</link><description>Bench</description>"
+        + "".join(items) + "</channel></rss>"
+    ).encode()
+
+
+# Formatting helpers
+
+@benchmark("clean_html")
+def bench_clean_html():
+    return lambda: app.clean_html(SAMPLE_HTML)
+
+
+@benchmark("format_entry")
+def bench_format_entry():
+    entry = EntryRecord("id-1", "A *title* with_markdown", "https://example.com/1", SAMPLE_HTML)
+    return lambda: app.format_entry(entry, app.FEED_FORMATS["detailed"])
+
+
+@benchmark("parse_schedule")
+def bench_parse_schedule():
+    schedules = ["30m", "2h", "1d", "bogus"]
+    return lambda: [app.parse_schedule(schedule) for schedule in schedules]
+
+
+# Entry filters: one pass over a cycle-sized batch of entries
+
+FILTER_ENTRIES = 1000
+
+
+def _filter_entries():
+    words = ["markets", "python", "release", "election", "weather", "football", "startup", "climate"]
+    return [
+        EntryRecord(f"id-{i}", f"Entry {i} about {words[i % len(words)]}", f"https://example.com/{i}",
+                    SAMPLE_HTML, (words[(i * 3) % len(words)],))
+        for i in range(FILTER_ENTRIES)
+    ]
+
+
+def _keywords(count, seed):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(count)]
+
+
+def _filter_rules(count):
+    """`count` rules per kind: mostly keywords, some regexes and categories"""
+    include = _keywords(count - 2, 1) + [r"/\brelease[sd]?\b/", "category:climate"]
+    exclude = _keywords(count - 2, 2) + [r"/sponsor(ed)?/", "category:football"]
+    return {"include": include, "exclude": exclude}
+
+
+def _filter_benchmarks(count):
+    @benchmark(f"filter_entries[{count} rules]")
+    def factory():
+        compiled = feed_filters.compile_rules(_filter_rules(count))
+        entries = _filter_entries()
+        return lambda: [entry for entry in entries if compiled.accepts(entry)]
+
+
+for _count in (10, 100, 1000):
+    _filter_benchmarks(_count)
+
+
+@benchmark("compile_filters[100 rules]")
+def bench_compile_filters():
+    rules = _filter_rules(100)
+    return lambda: feed_filters.compile_rules(rules)
+
+
+# Dedup helpers, per backend
+
+def _dedup_names(backend):
+    return (f"is_entry_posted[{backend},hit]", f"is_entry_posted[{backend},miss]", f"mark_entry_posted[{backend}]")
+
+
+def _dedup_benchmarks(backend, use_backend, preload=100_000):
+    def lookup_factory(hit):
+        def factory():
+            use_backend()
+            for i in range(preload):
+                app.mark_entry_posted("feed_bench", f"entry-{i}")
+            entry_id = "entry-500" if hit else "missing"
+            return lambda: app.is_entry_posted("feed_bench", entry_id)
+        return factory
+
+    def mark_factory():
+        use_backend()
+        ids = itertools.count()
+        return lambda: app.mark_entry_posted("feed_bench", f"new-{next(ids)}")
+
+    hit, miss, mark = _dedup_names(backend)
+    benchmark(hit)(lookup_factory(True))
+    benchmark(miss)(lookup_factory(False))
+    benchmark(mark)(mark_factory)
+
+
+def _use_memory():
+    (app.feeds_collection, app.entries_collection,
+     app.admins_collection, app.status_collection) = app._in_memory_storage()
+    app.storage_ready.set()
+
+
+def _use_mongo():
+    import pymongo
+    db = pymongo.MongoClient(BENCH_MONGODB_URI).get_database("rss_bot_bench")
+    db.entries.drop()
+    db.entries.create_index([("feed_id", 1), ("entry_id", 1)], unique=True)
+    app.entries_collection = db.entries
+    app.storage_ready.set()
+
+
+_dedup_benchmarks("memory", _use_memory)
+if BENCH_MONGODB_URI:
+    _dedup_benchmarks("mongo", _use_mongo, preload=10_000)
+else:
+    SKIPPED.update(dict.fromkeys(_dedup_names("mongo"), "BENCH_MONGODB_URI is not set"))
+
+
+def _sqlite_benchmarks():
+    """bot.py keeps posted entries in SQLite; benchmark it when it imports"""
+    try:
+        import bot
+    except Exception as e:
+        SKIPPED.update(dict.fromkeys(_dedup_names("sqlite"), f"bot.py does not import: {type(e).__name__}: {e}"))
+        return
+
+    def use_sqlite():
+        path = os.path.join(workdir(), "sqlite")
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        os.chdir(path)
+        bot.setup_database()
+
+    def lookup_factory(hit):
+        def factory():
+            use_sqlite()
+            for i in range(10_000):
+                bot.mark_entry_posted(1, f"entry-{i}")
+            entry_id = "entry-500" if hit else "missing"
+            return lambda: bot.is_entry_posted(1, entry_id)
+        return factory
+
+    def mark_factory():
+        use_sqlite()
+        ids = itertools.count()
+        return lambda: bot.mark_entry_posted(1, f"new-{next(ids)}")
+
+    hit, miss, mark = _dedup_names("sqlite")
+    benchmark(hit)(lookup_factory(True))
+    benchmark(miss)(lookup_factory(False))
+    benchmark(mark)(mark_factory)
+
+
+_sqlite_benchmarks()
+
+
+# posted_entries.json history
+
+def _history(size):
+    posted_at = datetime(2025, 1, 6).isoformat()
+    return {"https://example.com/feed": {f"https://example.com/posts/{i}": posted_at for i in range(size)}}
+
+
+def _history_benchmarks(label, size):
+    quick = size < 1_000_000
+    rounds = ROUNDS if quick else 3
+
+    def use_history_file():
+        rss_to_telegram.HISTORY_FILE = os.path.join(workdir(), f"history-{label}.json")
+
+    @benchmark(f"save_history[{label}]", rounds, quick)
+    def save_factory():
+        use_history_file()
+        history = _history(size)
+        return lambda: rss_to_telegram.save_history(history)
+
+    @benchmark(f"load_history[{label}]", rounds, quick)
+    def load_factory():
+        use_history_file()
+        rss_to_telegram.save_history(_history(size))
+        return rss_to_telegram.load_history
+
+
+for _label, _size in (("10k", 10_000), ("100k", 100_000), ("1M", 1_000_000)):
+    _history_benchmarks(_label, _size)
+
+
+# Feed parsing
+
+def _parse_benchmarks(label, size):
+    quick = size < 10 * 1024 * 1024
+
+    @benchmark(f"feedparser[{label}]", ROUNDS if quick else 3, quick)
+    def factory():
+        body = make_feed(size)
+        return lambda: feedparser.parse(body)
+
+    @benchmark(f"fast_parse[{label}]", ROUNDS if quick else 3, quick)
+    def fast_factory():
+        body = make_feed(size)
+        return lambda: fast_parse.parse_fast(body, {"content-type": "application/rss+xml"})
+
+
+for _label, _size in (("10KB", 10 * 1024), ("1MB", 1024 * 1024), ("10MB", 10 * 1024 * 1024)):
+    _parse_benchmarks(_label, _size)
+
+
+# Runner
+
+def measure(fn, rounds=ROUNDS):
+    """Return per-call timings: best and median of `rounds` rounds"""
+    fn()  # warm-up, and tells how many calls fill a round
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_ROUND_TIME:
+            break
+        loops *= 10 if elapsed < MIN_ROUND_TIME / 10 else 2
+
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+    return {"min": min(timings), "median": statistics.median(timings), "rounds": rounds, "loops": loops}
+
+
+def selected(quick=False, name_filter=None, names=None):
+    return [
+        name for name, (factory, rounds, is_quick) in BENCHMARKS.items()
+        if (is_quick or not quick)
+        and (not name_filter or name_filter in name)
+        and (names is None or name in names)
+    ]
+
+
+def skipped(name_filter=None, names=None):
+    """{name: reason} of the benchmarks that can't run here"""
+    return {
+        name: reason for name, reason in SKIPPED.items()
+        if (not name_filter or name_filter in name) and (names is None or name in names)
+    }
+
+
+def run(names, skipped_names=None):
+    """Run the named benchmarks and return the results document
+
+    `skipped_names` ({name: reason}) are reported and recorded, not run.
+    """
+    skipped_names = skipped_names or {}
+    for name, reason in skipped_names.items():
+        print(f"{name:<36}{'skipped':>12}  ({reason})", flush=True)
+    results = {}
+    cwd = os.getcwd()
+    try:
+        for name in names:
+            factory, rounds, quick = BENCHMARKS[name]
+            results[name] = measure(factory(), rounds)
+            print(f"{name:<36}{format_time(results[name]['min']):>12}"
+                  f"  (median {format_time(results[name]['median'])}, {results[name]['loops']} loops)",
+                  flush=True)
+    finally:
+        os.chdir(cwd)
+        if _workdir:
+            shutil.rmtree(_workdir, ignore_errors=True)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "skipped": skipped_names,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Return (name, baseline_s, current_s, ratio) for each shared benchmark, and the regressions"""
+    rows = []
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        ratio = result["min"] / base["min"] if base["min"] else float("inf")
+        row = (name, base["min"], result["min"], ratio)
+        rows.append(row)
+        if ratio > threshold:
+            regressions.append(row)
+    return rows, regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hot path microbenchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--save", help="write the results to this JSON file")
+    run_parser.add_argument("--merge", action="store_true",
+                            help="keep the other benchmarks of an existing --save file")
+
+    compare_parser = commands.add_parser("compare", help="compare against a baseline")
+    compare_parser.add_argument("baseline", help="baseline JSON file")
+    compare_parser.add_argument("--current", help="compare this results file instead of running")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="fail if a benchmark takes more than this times its baseline")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--quick", action="store_true", help="skip the largest sizes")
+        sub.add_argument("--filter", help="only benchmarks whose name contains this text")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = run(selected(args.quick, args.filter), skipped(args.filter))
+        if args.save and args.merge and os.path.exists(args.save):
+            with open(args.save) as f:
+                previous = json.load(f)
+            # The metadata is this run's: the merged baseline was last written now, here
+            document["results"] = {**previous["results"], **document["results"]}
+            document["skipped"] = {
+                name: reason for name, reason in {**previous.get("skipped", {}), **document["skipped"]}.items()
+                if name not in document["results"]
+            }
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+            print(f"Saved {len(document['results'])} results to {args.save}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run(selected(args.quick, args.filter, set(baseline["results"])),
+                      skipped(args.filter, set(baseline["results"])))
+
+    rows, regressions = compare_results(baseline, current, args.threshold)
+    print(f"\n{'benchmark':<36}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, base, now, ratio in rows:
+        flag = "  SLOWER" if ratio > args.threshold else ""
+        print(f"{name:<36}{format_time(base):>12}{format_time(now):>12}{ratio:>8.2f}{flag}")
+    for name, reason in current.get("skipped", {}).items():
+        if name in baseline["results"]:
+            print(f"{name:<36}{format_time(baseline['results'][name]['min']):>12}{'skipped':>12}  ({reason})")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold}x their baseline")
+        return 1
+    print(f"\nNo benchmark slower than {args.threshold}x its baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from startup import lazy_import
+
+telegram = lazy_import("telegram")
+telegram_error = lazy_import("telegram.error")
+telegram_utils_request = lazy_import("telegram.utils.request")
+
+logger = logging.getLogger(__name__)
+
+# Extra bot tokens (comma-separated) that share the channel posts with
+# TELEGRAM_BOT_TOKEN; each must be an admin in the channels it serves
+TELEGRAM_BOT_TOKENS = os.environ.get("TELEGRAM_BOT_TOKENS", "")
+
+# Messages per second (and burst) each bot may send; Telegram allows ~30/s per bot
+BOT_RATE_PER_SECOND = float(os.environ.get("BOT_RATE_PER_SECOND", 25))
+BOT_RATE_BURST = int(os.environ.get("BOT_RATE_BURST", 25))
+
+# Seconds between two messages to the same channel, whichever bot sends
+# them; Telegram allows about one message per second in a chat
+BOT_CHANNEL_INTERVAL = float(os.environ.get("BOT_CHANNEL_INTERVAL", 1))
+
+# How long an admin check of a bot in a channel is trusted
+ADMIN_CHECK_TTL = int(os.environ.get("BOT_ADMIN_CHECK_TTL", 6 * 3600))
+
+# A bot failing this many sends in a row rests for UNHEALTHY_COOLDOWN seconds
+UNHEALTHY_AFTER = 3
+UNHEALTHY_COOLDOWN = 60
+
+
+class NoBotAvailable(Exception):
+    """Every bot that could post to the channel is cooling down or not allowed"""
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, up to `burst` saved up"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class PooledBot:
+    """One bot identity in the pool with its own rate budget and health"""
+
+    def __init__(self, name, bot, rate=BOT_RATE_PER_SECOND, burst=BOT_RATE_BURST):
+        self.name = name
+        self.bot = bot
+        self.bucket = TokenBucket(rate, burst)
+        self.sent = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.flood_waits = 0
+        self.cooldown_until = 0.0
+        # channel -> (may_post, checked_at)
+        self.admin_checks = {}
+
+    def available(self, now=None):
+        return (now or time.monotonic()) >= self.cooldown_until
+
+    def cool_down(self, seconds):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+
+def bot_name(token):
+    """Stable, non-secret name of a bot: its numeric ID from the token"""
+    return f"bot{token.split(':', 1)[0]}"
+
+
+def _is_access_error(error):
+    message = str(error).lower()
+    return "chat not found" in message or "rights" in message or "not a member" in message
+
+
+def _weight(name, channel):
+    return hashlib.blake2b(f"{name}:{channel}".encode(), digest_size=8).digest()
+
+
+class BotPool:
+    """Spreads channel posts over several bot tokens
+
+    Every channel is served by one bot, picked by rendezvous hashing among
+    the bots that are admins there: the choice is stable, and adding or
+    removing a bot only moves that bot's share of channels. A bot that gets
+    a flood-wait (RetryAfter) rests for the time Telegram asks and its
+    channels fail over to the next bot in their order until it is back.
+
+    `send_message` has the same signature as telegram.Bot.send_message, so
+    the pool can stand in for a bot wherever channel posts are sent. It
+    paces sends itself and is safe to call from many threads: each channel
+    gets a message every `channel_interval` seconds and each bot stays
+    within its token bucket, so throughput grows with channels and bots.
+    """
+
+    def __init__(self, bots, channel_interval=BOT_CHANNEL_INTERVAL):
+        self.members = list(bots)
+        self.channel_interval = channel_interval
+        # channel -> earliest monotonic time of its next message
+        self._channel_next = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, primary_bot, tokens=None):
+        """Pool of `primary_bot` plus a bot for every token in TELEGRAM_BOT_TOKENS
+
+        Returns None when there is no other token, so a lone bot is used as is.
+        """
+        tokens = [t.strip() for t in (TELEGRAM_BOT_TOKENS if tokens is None else tokens).split(",") if t.strip()]
+        members = [PooledBot(bot_name(primary_bot.token), primary_bot)]
+        for token in tokens:
+            if token == primary_bot.token:
+                continue
+            # Sends come from several worker threads at once
+            request = telegram_utils_request.Request(con_pool_size=8)
+            members.append(PooledBot(bot_name(token), telegram.Bot(token, request=request)))
+        if len(members) == 1:
+            return None
+        logger.info(f"Sending through a pool of {len(members)} bots")
+        return cls(members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def candidates(self, channel):
+        """Bots in the channel's sticky preference order"""
+        return sorted(self.members, key=lambda member: _weight(member.name, channel), reverse=True)
+
+    def _may_post(self, member, channel):
+        """True unless the bot is known not to be an admin of the channel"""
+        if len(self.members) == 1:
+            return True
+        checked = member.admin_checks.get(channel)
+        if checked and time.monotonic() - checked[1] < ADMIN_CHECK_TTL:
+            return checked[0]
+        try:
+            status = member.bot.get_chat_member(channel, member.bot.id).status
+            may_post = status in ("administrator", "creator")
+        except telegram_error.BadRequest:
+            # "Chat not found", "member list is inaccessible"; BadRequest
+            # is a NetworkError in PTB 13, so it must be caught first
+            may_post = False
+        except telegram_error.NetworkError:
+            # Unknown for now; let the send decide
+            return True
+        except telegram_error.TelegramError:
+            may_post = False
+        member.admin_checks[channel] = (may_post, time.monotonic())
+        if not may_post:
+            logger.warning(f"{member.name} is not an admin of {channel}; using another bot there")
+        return may_post
+
+    def assigned(self, channel):
+        """The bot that currently serves a channel, or None"""
+        now = time.monotonic()
+        for member in self.candidates(channel):
+            if member.available(now) and self._may_post(member, channel):
+                return member
+        return None
+
+    def _pace_channel(self, chat_id):
+        if self.channel_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._channel_next.get(chat_id, 0.0))
+            self._channel_next[chat_id] = slot + self.channel_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def send_message(self, chat_id, text, **kwargs):
+        self._pace_channel(chat_id)
+        last_error = None
+        for member in self.candidates(chat_id):
+            if not member.available() or not self._may_post(member, chat_id):
+                continue
+            member.bucket.acquire()
+            try:
+                message = member.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except telegram_error.RetryAfter as e:
+                with self._lock:
+                    member.flood_waits += 1
+                    member.failures += 1
+                member.cool_down(e.retry_after)
+                logger.warning(f"{member.name} got a flood-wait of {e.retry_after}s; failing over")
+                last_error = e
+                continue
+            except (telegram_error.Unauthorized, telegram_error.BadRequest) as e:
+                if isinstance(e, telegram_error.BadRequest) and not _is_access_error(e):
+                    # The message itself is at fault; another bot won't help
+                    raise
+                # Removed from the channel, lost its rights, or token revoked
+                member.admin_checks[chat_id] = (False, time.monotonic())
+                with self._lock:
+                    member.failures += 1
+                last_error = e
+                continue
+            except telegram_error.NetworkError as e:
+                with self._lock:
+                    member.failures += 1
+                    member.consecutive_failures += 1
+                    unhealthy = member.consecutive_failures >= UNHEALTHY_AFTER
+                if unhealthy:
+                    member.cool_down(UNHEALTHY_COOLDOWN)
+                    member.consecutive_failures = 0
+                last_error = e
+                continue
+            with self._lock:
+                member.sent += 1
+                member.consecutive_failures = 0
+            return message
+        raise NoBotAvailable(f"No bot could post to {chat_id}" + (f": {last_error}" if last_error else ""))
+
+    def stats(self):
+        now = time.monotonic()
+        return [{
+            "name": member.name,
+            "sent": member.sent,
+            "failures": member.failures,
+            "flood_waits": member.flood_waits,
+            "cooling_down": max(0, round(member.cooldown_until - now)),
+        } for member in self.members]
@@ -1,20 +1,28 @@
+import json
 import os
 
+# Optional JSON file with a "feeds" list (and any other keys below) for
+# deployments with many static feeds
+FEEDS_CONFIG = os.environ.get("FEEDS_CONFIG", "")
+
 # Default configuration
 DEFAULT_CONFIG = {
     "telegram_bot_token": os.environ.get("TELEGRAM_BOT_TOKEN", ""),
     "feeds": [
         {
             "url": os.environ.get("RSS_FEED_URL", ""),
-            "channels": os.environ.get("TELEGRAM_CHANNEL_IDS", "").split(","),
+            "channels": [c.strip() for c in os.environ.get("TELEGRAM_CHANNEL_IDS", "").split(",") if c.strip()],
             "last_check": None,
             "post_limit": 5  # Maximum number of posts per check
         }
     ],
-    "check_interval": 7200,  # 2 hours in seconds
+    "check_interval": int(os.environ.get("CHECK_INTERVAL", 7200)),  # 2 hours in seconds
 }
 
 def get_config():
     """Load configuration from environment or use defaults"""
-    # You could extend this to load from a database or a file
-    return DEFAULT_CONFIG
\ No newline at end of file
+    # You could extend this to load from a database
+    if FEEDS_CONFIG:
+        with open(FEEDS_CONFIG) as f:
+            return {**DEFAULT_CONFIG, **json.load(f)}
+    return DEFAULT_CONFIG
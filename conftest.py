@@ -0,0 +1,19 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """Fresh in-memory app storage, marked ready so no background connect replaces it"""
+    import app
+
+    for name, collection in zip(
+        ("feeds_collection", "entries_collection", "admins_collection", "status_collection"),
+        app._in_memory_storage(),
+    ):
+        monkeypatch.setattr(app, name, collection)
+    monkeypatch.setattr(app, "local_store", None)
+    monkeypatch.setattr(app, "storage_ready", threading.Event())
+    app.storage_ready.set()
+    return app
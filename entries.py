@@ -0,0 +1,60 @@
+import calendar
+
+
+def published_time(entry):
+    """Epoch seconds of a parsed entry's published (or updated) date, or None"""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    return calendar.timegm(parsed)
+
+
+class EntryRecord:
+    """The few fields of a feed entry that dedup, formatting and sending use
+
+    Records are extracted once, right after parsing, so the full
+    FeedParserDict tree (content variants, enclosures, tags...) can be
+    released before any message is rendered.
+    """
+
+    __slots__ = ("entry_id", "title", "link", "description", "categories", "published")
+
+    def __init__(self, entry_id, title, link, description, categories=(), published=None):
+        self.entry_id = entry_id
+        self.title = title
+        self.link = link
+        self.description = description
+        self.categories = categories
+        # Publication (or last update) time in epoch seconds, if the feed gives one
+        self.published = published
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Build a record from a parsed entry; returns None if it has no ID"""
+        entry_id = entry.get('id', entry.get('link', ''))
+        if not entry_id:
+            return None
+        description = entry.get('description', entry.get('summary'))
+        # Category/tag names only, for feed filters
+        categories = tuple(tag.get('term') for tag in entry.get('tags') or () if tag.get('term'))
+        return cls(entry_id, entry.get('title', 'No Title'), entry.get('link', ''), description, categories,
+                   published_time(entry))
+
+    def __eq__(self, other):
+        if not isinstance(other, EntryRecord):
+            return NotImplemented
+        return (self.entry_id, self.title, self.link, self.description, self.categories, self.published) == \
+            (other.entry_id, other.title, other.link, other.description, other.categories, other.published)
+
+    def __repr__(self):
+        return f"EntryRecord({self.entry_id!r}, {self.title!r})"
+
+
+def extract_entries(parsed_feed, limit=10):
+    """Return EntryRecords for the first `limit` entries of a parsed feed"""
+    records = []
+    for entry in parsed_feed.entries[:limit]:
+        record = EntryRecord.from_entry(entry)
+        if record is not None:
+            records.append(record)
+    return records
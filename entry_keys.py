@@ -0,0 +1,60 @@
+import hashlib
+import os
+import unicodedata
+
+# How posted entry IDs are stored:
+#   raw      the entry ID itself (default)
+#   hash64   64-bit digest of the normalized ID (a signed int, fits Int64/INTEGER)
+#   hash128  128-bit digest of the normalized ID (16 bytes)
+# Switching from raw to a hash mode migrates existing data on startup;
+# going back to raw, or between hash sizes, is not possible, so stored
+# data in another hash mode keeps its mode (see use_mode()).
+ENTRY_KEY_MODE = os.environ.get("ENTRY_KEY_MODE", "raw").lower()
+
+MODES = ("raw", "hash64", "hash128")
+
+if ENTRY_KEY_MODE not in MODES:
+    raise ValueError(f"ENTRY_KEY_MODE must be one of {', '.join(MODES)}, not {ENTRY_KEY_MODE!r}")
+
+
+def normalize_entry_id(entry_id):
+    """Canonical form of an entry ID: NFC-normalized, surrounding whitespace removed"""
+    return unicodedata.normalize("NFC", str(entry_id)).strip()
+
+
+def entry_key(entry_id, mode=None):
+    """Key stored for an entry ID in the given (default: configured) mode"""
+    mode = mode or ENTRY_KEY_MODE
+    if mode == "raw":
+        return entry_id
+    data = normalize_entry_id(entry_id).encode("utf-8")
+    if mode == "hash64":
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def binary_entry_key(entry_id, mode=None):
+    """entry_key() as bytes in hash modes, for stores that would turn an int into text"""
+    key = entry_key(entry_id, mode)
+    if isinstance(key, int):
+        return key.to_bytes(8, "big", signed=True)
+    return key
+
+
+def text_entry_key(entry_id, mode=None):
+    """entry_key() as a hex string in hash modes, for formats with string keys such as JSON"""
+    key = binary_entry_key(entry_id, mode)
+    return key.hex() if isinstance(key, bytes) else key
+
+
+def is_compact():
+    return ENTRY_KEY_MODE != "raw"
+
+
+def use_mode(mode):
+    """Switch the mode used by entry_key() when not given one explicitly"""
+    global ENTRY_KEY_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown entry key mode {mode!r}")
+    ENTRY_KEY_MODE = mode
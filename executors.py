@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Interactive command handlers get their own small pool so they never queue
+# behind a long polling cycle; polling and sending are bounded separately
+INTERACTIVE_WORKERS = int(os.environ.get("INTERACTIVE_WORKERS", 4))
+POLLING_WORKERS = int(os.environ.get("POLLING_WORKERS", 2))
+
+
+class MonitoredExecutor:
+    """Thread pool that tracks queue depth and how long tasks wait to start"""
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        queued_at = time.monotonic()
+        with self._lock:
+            self.submitted += 1
+        return self._executor.submit(self._run, queued_at, fn, args, kwargs)
+
+    def _run(self, queued_at, fn, args, kwargs):
+        wait = time.monotonic() - queued_at
+        with self._lock:
+            self.started += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            logger.exception(f"Task {getattr(fn, '__name__', fn)} failed in {self.name} pool")
+            raise
+        finally:
+            with self._lock:
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.submitted - self.started,
+                "running": self.started - self.completed,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait": self.total_wait / self.started if self.started else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+interactive_pool = MonitoredExecutor("interactive", INTERACTIVE_WORKERS)
+polling_pool = MonitoredExecutor("polling", POLLING_WORKERS)
+
+
+def run_in(pool):
+    """Decorator: hand the call to `pool` and return immediately
+
+    Only for callbacks whose return value is ignored (command handlers,
+    job callbacks); conversation steps must return their next state.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            pool.submit(func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def pool_stats():
+    """Return stats for every pool, keyed by pool name"""
+    return {pool.name: pool.stats() for pool in (interactive_pool, polling_pool)}
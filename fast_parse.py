@@ -0,0 +1,239 @@
+import calendar
+import email.utils
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+
+from entries import EntryRecord
+
+# Parse plain, well-formed RSS 2.0 and Atom 1.0 with the C XML parser
+# (expat) instead of feedparser; anything else still goes to feedparser
+FAST_PARSE = os.environ.get("FAST_PARSE", "1").lower() not in ("0", "false", "no")
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+
+# Elements an entry may contain and still take the fast path: those it
+# reads, plus ones feedparser maps to fields EntryRecord doesn't use.
+# Anything else (dc:date, media:title, itunes:summary, atom:link in RSS...)
+# may change the title, link, summary, date or tags feedparser reports.
+RSS_ITEM_TAGS = frozenset({
+    "title", "link", "description", "guid", "pubDate", "category", "author", "comments", "enclosure",
+    DC + "creator", CONTENT + "encoded",
+    "{http://wellformedweb.org/CommentAPI/}commentRss", "{http://purl.org/rss/1.0/modules/slash/}comments",
+    MEDIA + "content", MEDIA + "thumbnail",
+})
+ATOM_ENTRY_TAGS = frozenset(ATOM + tag for tag in (
+    "id", "title", "link", "summary", "content", "published", "updated", "category",
+    "author", "name", "email", "uri", "contributor", "rights",
+)) | {MEDIA + "content", MEDIA + "thumbnail"}
+
+# Content types feedparser accepts without complaint; text/xml only with a charset
+_XML_TYPE = re.compile(r"^(application/(.+\+)?xml|text/xml(?=.*charset))", re.I)
+_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_DECLARED_ENCODING = re.compile(rb"^<\?xml[^>]*encoding\s*=\s*[\"']([\w.:-]+)[\"']")
+
+CHUNK_SIZE = 64 * 1024
+
+_counter_lock = threading.Lock()
+counters = {"fast": 0, "fallback": 0}
+
+
+class Unsupported(Exception):
+    """The document needs feedparser's full treatment"""
+
+
+def _count(name):
+    with _counter_lock:
+        counters[name] += 1
+
+
+def _normal_encoding(name):
+    return name.lower().replace("_", "-").replace("utf8", "utf-8")
+
+
+def _check_envelope(body, headers):
+    """Reject documents whose decoding feedparser might do differently"""
+    if not body.startswith(b"<"):
+        # Byte order marks, leading whitespace, non-XML
+        raise Unsupported("prolog")
+    head = body[:1024]
+    if b"<!DOCTYPE" in head or b"<!ENTITY" in body:
+        raise Unsupported("doctype")
+    declared = _DECLARED_ENCODING.match(head)
+    declared = _normal_encoding(declared.group(1).decode("ascii")) if declared else "utf-8"
+    if declared not in ("utf-8", "us-ascii", "iso-8859-1"):
+        raise Unsupported(f"encoding {declared}")
+    content_type = (headers or {}).get("content-type")
+    if content_type:
+        if not _XML_TYPE.match(content_type.strip()):
+            raise Unsupported(f"content type {content_type}")
+        charset = _CHARSET.search(content_type)
+        if charset and _normal_encoding(charset.group(1)) != declared:
+            raise Unsupported("charset override")
+
+
+def _text(element):
+    """Stripped text of a simple element; markup inside is not expected"""
+    if element is None:
+        return None
+    if len(element):
+        raise Unsupported(f"markup in {element.tag}")
+    return (element.text or "").strip()
+
+
+def _absolute(link):
+    if link and not re.match(r"^[a-z][a-z0-9+.-]*:", link, re.I):
+        # feedparser resolves relative links against the feed location
+        raise Unsupported("relative link")
+    return link
+
+
+def _check_children(entry, allowed):
+    for element in entry.iter():
+        if element is not entry and element.tag not in allowed:
+            raise Unsupported(f"element {element.tag}")
+
+
+def _rss_date(value):
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None or parsed[9] is None:
+        raise Unsupported(f"date {value}")
+    return email.utils.mktime_tz(parsed)
+
+
+def _atom_date(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise Unsupported(f"date {value}") from None
+    if parsed.tzinfo is None:
+        raise Unsupported(f"date {value}")
+    return calendar.timegm(parsed.utctimetuple())
+
+
+def _rss_item(item):
+    _check_children(item, RSS_ITEM_TAGS)
+    if item.find(CONTENT + "encoded") is not None and item.find("description") is None:
+        # feedparser would use the full content as the summary
+        raise Unsupported("content without description")
+    guid = item.find("guid")
+    link = _text(item.find("link"))
+    if not link and guid is not None and guid.get("isPermaLink", "true") != "false":
+        # feedparser would take the link from the guid
+        raise Unsupported("guid link")
+    entry_id = _text(guid) or link
+    if not entry_id:
+        return None
+    title = _text(item.find("title"))
+    description = item.find("description")
+    if description is not None:
+        if len(description):
+            raise Unsupported("markup in description")
+        description = description.text or ""
+    published = item.findtext("pubDate")
+    return EntryRecord(
+        entry_id,
+        "No Title" if title is None else title,
+        _absolute(link) or "",
+        description,
+        tuple(term for term in (_text(category) for category in item.findall("category")) if term),
+        _rss_date(published.strip()) if published and published.strip() else None,
+    )
+
+
+def _atom_text(element):
+    """Text of an Atom text construct; only escaped HTML and plain text are handled"""
+    if element is None:
+        return None
+    kind = element.get("type", "text")
+    if kind not in ("text", "html") or len(element):
+        raise Unsupported(f"{kind} text construct")
+    value = element.text or ""
+    if kind == "text" and ("<" in value or "&" in value):
+        # feedparser escapes plain text that looks like markup
+        raise Unsupported("markup in text construct")
+    return value
+
+
+def _atom_link(entry):
+    links = [link for link in entry.findall(ATOM + "link") if link.get("rel", "alternate") == "alternate"]
+    if len(links) > 1:
+        raise Unsupported("several alternate links")
+    return _absolute((links[0].get("href") or "").strip()) if links else ""
+
+
+def _atom_entry(entry):
+    _check_children(entry, ATOM_ENTRY_TAGS)
+    summary = entry.find(ATOM + "summary")
+    if entry.find(ATOM + "content") is not None and summary is None:
+        raise Unsupported("content without summary")
+    link = _atom_link(entry)
+    entry_id = _text(entry.find(ATOM + "id")) or link
+    if not entry_id:
+        return None
+    title = _atom_text(entry.find(ATOM + "title"))
+    published = entry.findtext(ATOM + "published") or entry.findtext(ATOM + "updated")
+    return EntryRecord(
+        entry_id,
+        "No Title" if title is None else title.strip(),
+        link,
+        _atom_text(summary),
+        tuple(c.get("term").strip() for c in entry.findall(ATOM + "category") if (c.get("term") or "").strip()),
+        _atom_date(published.strip()) if published and published.strip() else None,
+    )
+
+
+def _parse(body, headers, limit):
+    _check_envelope(body, headers)
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    records = []
+    seen = 0
+    root = None
+    kind = None
+    for offset in range(0, len(body), CHUNK_SIZE):
+        parser.feed(body[offset:offset + CHUNK_SIZE])
+        for event, element in parser.read_events():
+            if root is None:
+                root = element
+                if element.tag == "rss" and element.get("version") == "2.0":
+                    kind = "rss"
+                elif element.tag == ATOM + "feed":
+                    kind = "atom"
+                else:
+                    raise Unsupported(f"root {element.tag}")
+                continue
+            if event != "end":
+                continue
+            if kind == "rss" and element.tag == "item":
+                extract = _rss_item
+            elif kind == "atom" and element.tag == ATOM + "entry":
+                extract = _atom_entry
+            else:
+                continue
+            # Entries past the limit are only checked for well-formedness
+            if seen < limit:
+                record = extract(element)
+                if record is not None:
+                    records.append(record)
+            seen += 1
+            element.clear()
+    parser.close()
+    return records
+
+
+def parse_fast(body, headers=None, limit=10):
+    """EntryRecords for the first `limit` entries, or None if feedparser is needed"""
+    if not FAST_PARSE:
+        return None
+    try:
+        records = _parse(body, headers, limit)
+    except (Unsupported, ElementTree.ParseError):
+        _count("fallback")
+        return None
+    _count("fast")
+    return records
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def body_digest(body):
+    """Return a short hex digest identifying a response body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ParsedFeedCache:
+    """Bounded LRU cache of compact parsed entries, keyed by body digest
+
+    Each value is the tuple of EntryRecords produced by the last parse of
+    that body. Entries older than `max_age` seconds are dropped on lookup,
+    and the least recently used entry is evicted once `max_size` is reached.
+
+    The cache also remembers, per feed, the digest of the last body whose
+    entries were all handled, so an identical body can skip dedup entirely,
+    and per URL the ETag/Last-Modified validators of the last response.
+    """
+
+    def __init__(self, max_size=256, max_age=6 * 3600):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._settled = {}
+        self._validators = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.unchanged = 0
+
+    def get(self, digest):
+        """Return cached entries for `digest`, or None on a miss"""
+        with self._lock:
+            item = self._entries.get(digest)
+            if item is not None and time.monotonic() - item[0] > self.max_age:
+                del self._entries[digest]
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return item[1]
+
+    def put(self, digest, entries):
+        """Store the compact entries parsed from the body with `digest`"""
+        with self._lock:
+            self._entries[digest] = (time.monotonic(), tuple(entries))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def is_settled(self, feed_id, digest):
+        """True if every entry of this body was already handled for the feed"""
+        with self._lock:
+            if self._settled.get(feed_id) != digest:
+                return False
+            self.unchanged += 1
+            return True
+
+    def mark_settled(self, feed_id, digest):
+        with self._lock:
+            self._settled[feed_id] = digest
+
+    def forget(self, feed_id):
+        with self._lock:
+            self._settled.pop(feed_id, None)
+
+    def validators(self, url):
+        """Return (etag, last_modified, digest) from the last full response"""
+        with self._lock:
+            return self._validators.get(url, (None, None, None))
+
+    def set_validators(self, url, etag, modified, digest):
+        with self._lock:
+            self._validators[url] = (etag, modified, digest)
+
+    def clear(self):
+        """Drop everything; returns the number of parsed feeds dropped"""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._settled.clear()
+            self._validators.clear()
+            return dropped
+
+    def stats(self):
+        """Return hit/miss counters and the current hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "unchanged": self.unchanged,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by the polling cycle and feed validation
+feed_cache = ParsedFeedCache(
+    max_size=int(os.environ.get("FEED_CACHE_SIZE", 256)),
+    max_age=int(os.environ.get("FEED_CACHE_MAX_AGE", 6 * 3600))
+)
@@ -0,0 +1,223 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rules are stored on the feed as {"include": [...], "exclude": [...]}, each
+# rule one of:
+#   word or phrase      matched case-insensitively as a whole word
+#   /regex/             matched case-insensitively anywhere in the text
+#   category:Name       matches entries tagged Name (case-insensitive)
+# An entry passes if it matches any include rule (or there are none) and
+# no exclude rule. Text is the title plus the description without tags.
+KINDS = ("include", "exclude")
+
+CATEGORY_PREFIX = "category:"
+
+_TAGS = re.compile(r"<[^>]*>")
+
+
+class FilterError(ValueError):
+    """A filter rule that can't be compiled"""
+
+
+def parse_rules(text):
+    """Split a comma-separated rule list as typed in /editfeed
+
+    Commas inside a /regex/ are kept; "-" or an empty text clears the list.
+    """
+    text = text.strip()
+    if text in ("", "-"):
+        return []
+    rules = []
+    current = ""
+    in_regex = False
+    for char in text:
+        if char == "/" and not current.strip():
+            in_regex = True
+        elif char == "/" and in_regex and not current.endswith("\\"):
+            in_regex = False
+        if char == "," and not in_regex:
+            rules.append(current.strip())
+            current = ""
+        else:
+            current += char
+    rules.append(current.strip())
+    return [rule for rule in rules if rule]
+
+
+def _is_regex(rule):
+    return len(rule) > 2 and rule.startswith("/") and rule.endswith("/")
+
+
+def _regex_pattern(rule):
+    pattern = rule[1:-1]
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise FilterError(f"Invalid regex {rule}: {e}") from None
+    return f"(?:{pattern})"
+
+
+def _build_trie(keywords):
+    """Nested dicts keyed by character; "" marks the end of a keyword"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return trie
+
+
+def _trie_ends(trie, text, start):
+    """End offsets of every keyword that occurs in `text` at `start`"""
+    node = trie
+    for pos in range(start, len(text) + 1):
+        if "" in node:
+            yield pos
+        if pos == len(text):
+            return
+        node = node.get(text[pos])
+        if node is None:
+            return
+
+
+def _trie_pattern(trie):
+    """One regex for many keywords, with shared prefixes factored out
+
+    A plain alternation makes re try every keyword at every position; the
+    trie lets it follow a single path per position, like Aho-Corasick.
+    """
+    def pattern(node):
+        ends = "" in node
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if ends else body
+
+    return pattern(trie)
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+class _Matcher:
+    """All rules of one kind: a keyword trie, one regex alternation and a category set"""
+
+    __slots__ = ("trie", "keywords", "regex", "categories")
+
+    def __init__(self, rules):
+        keywords = set()
+        patterns = []
+        categories = set()
+        for rule in rules:
+            if rule.lower().startswith(CATEGORY_PREFIX):
+                categories.add(rule[len(CATEGORY_PREFIX):].strip().casefold())
+            elif _is_regex(rule):
+                patterns.append(_regex_pattern(rule))
+            else:
+                keywords.add(rule.lower())
+        self.trie = _build_trie(keywords)
+        self.keywords = re.compile(_trie_pattern(self.trie)) if keywords else None
+        self.regex = re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+        self.categories = frozenset(categories)
+
+    def __bool__(self):
+        return self.keywords is not None or self.regex is not None or bool(self.categories)
+
+    def _has_keyword(self, lowered):
+        # Word boundaries are checked on the (rare) hits only: lookarounds
+        # and IGNORECASE in the pattern would slow down every position
+        pos = 0
+        while True:
+            match = self.keywords.search(lowered, pos)
+            if match is None:
+                return False
+            start = match.start()
+            if start == 0 or not _is_word_char(lowered[start - 1]):
+                # The regex takes the longest keyword here; a shorter one
+                # starting at the same place may still end on a boundary
+                for end in _trie_ends(self.trie, lowered, start):
+                    if end == len(lowered) or not _is_word_char(lowered[end]):
+                        return True
+            pos = start + 1
+
+    def matches(self, text, lowered, categories):
+        if self.categories and not self.categories.isdisjoint(categories):
+            return True
+        if self.keywords is not None and self._has_keyword(lowered):
+            return True
+        return self.regex is not None and self.regex.search(text) is not None
+
+
+class CompiledFilter:
+    """A feed's include/exclude rules, compiled once"""
+
+    __slots__ = ("rules", "include", "exclude")
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.include = _Matcher(rules.get("include") or [])
+        self.exclude = _Matcher(rules.get("exclude") or [])
+
+    def accepts(self, entry):
+        """True if an EntryRecord should be posted"""
+        text = entry.title or ""
+        if entry.description:
+            text = f"{text}\n{_TAGS.sub(' ', entry.description)}"
+        lowered = text.lower()
+        categories = {category.casefold() for category in entry.categories}
+        if self.include and not self.include.matches(text, lowered, categories):
+            return False
+        return not (self.exclude and self.exclude.matches(text, lowered, categories))
+
+
+def compile_rules(rules):
+    """Compile a feed's rules; raises FilterError for a bad regex"""
+    return CompiledFilter({kind: list(value) for kind, value in rules.items()})
+
+
+class FilterCache:
+    """Compiled filters per feed, rebuilt only when the feed's rules change"""
+
+    def __init__(self):
+        self._filters = {}
+        self._lock = threading.Lock()
+
+    def get(self, feed):
+        """The compiled filter of a feed document, or None if it has no rules"""
+        rules = feed.get("filters")
+        if not rules or not any(rules.get(kind) for kind in KINDS):
+            return None
+        feed_id = feed.get("_id")
+        with self._lock:
+            compiled = self._filters.get(feed_id)
+        # Also recompiles rules changed by another process
+        if compiled is not None and compiled.rules == rules:
+            return compiled
+        try:
+            compiled = compile_rules(rules)
+        except FilterError as e:
+            logger.error(f"Ignoring filters of feed {feed_id}: {e}")
+            return None
+        with self._lock:
+            self._filters[feed_id] = compiled
+        return compiled
+
+    def invalidate(self, feed_id):
+        with self._lock:
+            self._filters.pop(feed_id, None)
+
+    def clear(self):
+        """Drop every compiled filter; returns how many there were"""
+        with self._lock:
+            dropped = len(self._filters)
+            self._filters.clear()
+            return dropped
+
+
+filter_cache = FilterCache()
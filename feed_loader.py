@@ -0,0 +1,208 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+
+from startup import lazy_import
+from entries import extract_entries
+from feed_cache import feed_cache, body_digest
+from websub import find_hub
+from parse_pool import parse_pool, ParseTimeout
+from fast_parse import parse_fast
+
+feedparser = lazy_import("feedparser")
+fetcher = lazy_import("fetcher")
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent entries considered per check
+MAX_ENTRIES_PER_CHECK = 10
+
+# Background validation of newly added feeds
+VALIDATION_WORKERS = int(os.environ.get("VALIDATION_WORKERS", 4))
+VALIDATION_TIMEOUT = float(os.environ.get("VALIDATION_TIMEOUT", 20))
+
+_validation_executor = ThreadPoolExecutor(max_workers=VALIDATION_WORKERS, thread_name_prefix="feed-validate")
+
+# Bulk validation (OPML import) gets its own short-lived pool of this size,
+# so a long import never queues ahead of a single /addfeed
+OPML_VALIDATION_WORKERS = int(os.environ.get("OPML_VALIDATION_WORKERS", 8))
+
+
+class FeedParseError(Exception):
+    """feedparser reported the document as malformed"""
+
+
+def fetch_feed_digest(url, max_bytes=None, usage=None, conditional=True):
+    """Fetch a feed conditionally and return (digest, FetchResult)
+
+    When the server answers 304 the digest of the previous body is returned
+    together with a result whose body is None; `conditional=False` always
+    downloads the body. Downloaded bytes are added to `usage` (an
+    accounting.FeedUsage) if given.
+    """
+    etag, modified, last_digest = feed_cache.validators(url)
+    if not last_digest or not conditional:
+        etag = modified = None
+
+    result = fetcher.fetch_feed(url, max_bytes=max_bytes, max_entries=MAX_ENTRIES_PER_CHECK,
+                                etag=etag, modified=modified)
+    if result.not_modified:
+        return last_digest, result
+
+    if usage is not None:
+        usage.bytes += len(result.body)
+    digest = body_digest(result.body)
+    feed_cache.set_validators(url, result.headers.get("etag"), result.headers.get("last-modified"), digest)
+    return digest, result
+
+
+def parse_entries(result, usage=None):
+    """Parse a fetched body into EntryRecords, releasing the parse tree
+
+    Plain, well-formed RSS 2.0 and Atom take the fast path; other large
+    bodies go to the parse processes when PARSE_PROCESSES is set.
+    """
+    started = time.thread_time()
+    entries = parse_fast(result.body, result.headers, MAX_ENTRIES_PER_CHECK)
+    if usage is not None:
+        usage.parse_cpu += time.thread_time() - started
+    if entries is not None:
+        return entries
+
+    try:
+        offloaded = parse_pool.parse(result.body, result.headers, MAX_ENTRIES_PER_CHECK)
+    except ParseTimeout as e:
+        raise FeedParseError(e)
+    if offloaded is not None:
+        error, entries, cpu = offloaded
+        if usage is not None:
+            usage.parse_cpu += cpu
+        if error:
+            raise FeedParseError(error)
+        return entries
+
+    started = time.thread_time()
+    parsed_feed = feedparser.parse(result.body, response_headers=result.headers)
+    if usage is not None:
+        usage.parse_cpu += time.thread_time() - started
+    if hasattr(parsed_feed, 'bozo_exception') and parsed_feed.bozo_exception:
+        raise FeedParseError(parsed_feed.bozo_exception)
+    return extract_entries(parsed_feed, MAX_ENTRIES_PER_CHECK)
+
+
+def load_feed_entries(url, digest, result, max_bytes=None, usage=None):
+    """Return (digest, entries), parsing only bodies not already cached"""
+    entries = feed_cache.get(digest)
+    if entries is not None:
+        return digest, entries
+
+    if result.not_modified:
+        # The entries of the unchanged body were evicted; fetch it again
+        feed_cache.set_validators(url, None, None, None)
+        digest, result = fetch_feed_digest(url, max_bytes, usage)
+
+    entries = parse_entries(result, usage)
+    feed_cache.put(digest, entries)
+    return digest, entries
+
+
+class ValidationResult:
+    """Outcome of validating a feed URL; `error` is None when it is usable
+
+    `hub` and `topic` are set when the feed advertises a WebSub hub.
+    """
+
+    def __init__(self, url, title=None, entries=(), error=None, hub=None, topic=None):
+        self.url = url
+        self.title = title
+        self.entries = entries
+        self.error = error
+        self.hub = hub
+        self.topic = topic
+
+
+def validate_feed(url):
+    """Download and parse a feed, leaving it in the cache for the first poll"""
+    try:
+        # Always fetch the full body; a 304 would leave nothing to show the admin
+        digest, result = fetch_feed_digest(url, conditional=False)
+        parsed_feed = feedparser.parse(result.body, response_headers=result.headers)
+    except Exception as e:
+        return ValidationResult(url, error=f"Error validating feed: {e}")
+
+    if hasattr(parsed_feed, 'bozo_exception') and parsed_feed.bozo_exception:
+        return ValidationResult(url, error=f"Error parsing the feed: {parsed_feed.bozo_exception}")
+
+    if not parsed_feed.entries:
+        return ValidationResult(url, error="The feed seems to be empty or not a valid RSS/Atom feed.")
+
+    entries = extract_entries(parsed_feed, MAX_ENTRIES_PER_CHECK)
+    feed_cache.put(digest, entries)
+    hub, topic = find_hub(parsed_feed, result.headers, url)
+    return ValidationResult(url, title=parsed_feed.feed.get('title', 'Untitled Feed'), entries=entries,
+                            hub=hub, topic=topic)
+
+
+def submit_validation(url):
+    """Validate a feed on the background executor; returns a Future"""
+    return _validation_executor.submit(validate_feed, url)
+
+
+def validate_feed_with_timeout(url, timeout=None):
+    """Validate a feed in the background, waiting at most `timeout` seconds"""
+    future = submit_validation(url)
+    try:
+        return future.result(VALIDATION_TIMEOUT if timeout is None else timeout)
+    except FutureTimeout:
+        logger.warning(f"Validation of {url} timed out")
+        return ValidationResult(url, error="The feed took too long to respond.")
+
+
+def validate_feeds(urls, workers=None, timeout=None):
+    """Validate many feeds concurrently; returns {url: ValidationResult}
+
+    Each URL gets `timeout` seconds from when a worker picks it up;
+    feeds still unfinished after that are reported as timed out.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    workers = min(workers or OPML_VALIDATION_WORKERS, len(urls))
+    timeout = VALIDATION_TIMEOUT if timeout is None else timeout
+    started = {}
+
+    def run(url):
+        started[url] = time.monotonic()
+        return validate_feed(url)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="opml-validate")
+    futures = {url: executor.submit(run, url) for url in urls}
+    pending = {future: url for url, future in futures.items()}
+    timed_out = set()
+    while pending:
+        now = time.monotonic()
+        deadlines = []
+        for future, url in list(pending.items()):
+            if url not in started or future.done():
+                continue
+            if now - started[url] >= timeout:
+                # Its worker stays busy until the fetch gives up; stop waiting for it
+                timed_out.add(url)
+                del pending[future]
+            else:
+                deadlines.append(started[url] + timeout)
+        # Until a queued URL starts its deadline is unknown, so check back shortly
+        done, _ = wait(pending, timeout=min(deadlines) - now if deadlines else 0.1, return_when=FIRST_COMPLETED)
+        for future in done:
+            del pending[future]
+    executor.shutdown(wait=False)
+
+    results = {}
+    for url, future in futures.items():
+        if url in timed_out:
+            logger.warning(f"Validation of {url} timed out")
+            results[url] = ValidationResult(url, error="The feed took too long to respond.")
+        else:
+            results[url] = future.result()
+    return results
@@ -0,0 +1,169 @@
+import os
+import re
+import urllib.error
+import urllib.request
+import zlib
+
+# Seconds to wait for a feed server before giving up
+FETCH_TIMEOUT = int(os.environ.get("FETCH_TIMEOUT", 30))
+
+# Default ceiling on the decompressed size of a feed; feeds may override it
+FEED_MAX_BYTES = int(os.environ.get("FEED_MAX_BYTES", 5 * 1024 * 1024))
+
+CHUNK_SIZE = 64 * 1024
+
+USER_AGENT = "rss-tg-bot (+https://github.com/prakashgarg91/rss-telegram-bot)"
+
+# Closing tag of one entry, and what has to be appended to close the document
+# again when the download is cut short after it
+_ENTRY_END = {
+    b"</item>": b"</channel></rss>",
+    b"</entry>": b"</feed>",
+}
+_RDF_ROOT = re.compile(rb"<rdf:RDF[\s>]")
+
+
+class FeedTooLarge(Exception):
+    """The feed body exceeded its byte ceiling"""
+
+    def __init__(self, url, limit):
+        super().__init__(f"Feed {url} is larger than {limit} bytes")
+        self.url = url
+        self.limit = limit
+
+
+class FetchResult:
+    """Raw response body plus the headers feedparser needs to parse it"""
+
+    def __init__(self, url, body, headers, truncated=False, not_modified=False):
+        self.url = url
+        self.body = body
+        self.headers = headers
+        self.truncated = truncated
+        # True when the server answered 304 to a conditional request; body is None
+        self.not_modified = not_modified
+
+
+def _decompressor(encoding):
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    return None
+
+
+def _body_pieces(response, decompressor, room):
+    """Yield the decompressed body in pieces of at most CHUNK_SIZE bytes
+
+    Compressed input is inflated in bounded steps, each no larger than
+    `room()`, so a small download can't expand far past the ceiling.
+    """
+    while True:
+        chunk = response.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            yield decompressor.decompress(chunk, min(CHUNK_SIZE, room()))
+            chunk = decompressor.unconsumed_tail
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+class _EntryCounter:
+    """Count complete entries in a growing body without rescanning it"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.tag = None
+        self.end = 0
+        self._scanned = 0
+
+    def feed(self, body):
+        """Scan newly appended bytes; returns True once `limit` is reached"""
+        tags = [self.tag] if self.tag else _ENTRY_END
+        # Back up a little in case a closing tag straddles two chunks
+        start = max(self.end, self._scanned - 8)
+        for tag in tags:
+            pos = body.find(tag, start)
+            while pos != -1 and self.count < self.limit:
+                self.tag = tag
+                self.count += 1
+                self.end = pos + len(tag)
+                pos = body.find(tag, self.end)
+            if self.tag:
+                break
+        self._scanned = len(body)
+        return self.count >= self.limit
+
+
+def fetch_feed(url, timeout=FETCH_TIMEOUT, max_bytes=None, max_entries=None, etag=None, modified=None):
+    """Stream a feed into memory and return its decompressed body and headers
+
+    The body is decompressed incrementally and never grows past `max_bytes`
+    (FeedTooLarge is raised instead). With `max_entries`, the transfer stops
+    as soon as that many complete entries have arrived and the document is
+    closed off after the last one. `etag` and `modified` make the request
+    conditional; a 304 answer returns a result with `not_modified` set.
+    """
+    max_bytes = max_bytes or FEED_MAX_BYTES
+    request_headers = {
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+    }
+    if etag:
+        request_headers["If-None-Match"] = etag
+    if modified:
+        request_headers["If-Modified-Since"] = modified
+    request = urllib.request.Request(url, headers=request_headers)
+
+    body = bytearray()
+    counter = _EntryCounter(max_entries) if max_entries else None
+    truncated = False
+
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return FetchResult(url, None, {key.lower(): value for key, value in e.headers.items()},
+                               not_modified=True)
+        raise
+
+    with response:
+        headers = {key.lower(): value for key, value in response.headers.items()}
+        final_url = response.geturl()
+
+        length = headers.get("content-length", "")
+        decompressor = _decompressor(headers.get("content-encoding", "").lower())
+        # Without early abort, an oversized declared length can fail up front
+        if counter is None and decompressor is None and length.isdigit() and int(length) > max_bytes:
+            raise FeedTooLarge(url, max_bytes)
+
+        # One byte past the ceiling is enough to know the body is too large
+        room = lambda: max_bytes - len(body) + 1
+        for piece in _body_pieces(response, decompressor, room):
+            body += piece
+
+            if counter is not None and counter.feed(body):
+                truncated = True
+                if counter.end > max_bytes:
+                    raise FeedTooLarge(url, max_bytes)
+                break
+            if len(body) > max_bytes:
+                raise FeedTooLarge(url, max_bytes)
+
+    if decompressor is not None:
+        headers.pop("content-encoding", None)
+        headers.pop("content-length", None)
+
+    if truncated:
+        closing = b"</rdf:RDF>" if _RDF_ROOT.search(body, 0, 4096) else _ENTRY_END[counter.tag]
+        del body[counter.end:]
+        body += closing
+
+    # Lets feedparser resolve relative links against the feed location
+    headers.setdefault("content-location", final_url)
+    return FetchResult(final_url, bytes(body), headers, truncated)
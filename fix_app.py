@@ -14,6 +14,8 @@ import json
 import pytz
 from datetime import datetime
 import threading
+import webhook
+from memory_watchdog import memory_watchdog
 
 # Setup logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -81,13 +83,20 @@ def status(update: Update, context: CallbackContext) -> None:
         return
     
     feed_count = len(feeds)
+    memory = memory_watchdog.stats()
     
     status_text = (
         "🤖 *Bot Status*\n\n"
         f"Active feeds: {feed_count}\n"
         f"Bot running since: {start_time_str}\n"
-        f"Current time: {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}\n\n"
+        f"Current time: {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
     )
+    if memory["rss_mb"] is not None:
+        status_text += (
+            f"Memory: {memory['rss_mb']:.0f} MB (peak {memory['peak_mb']:.0f} MB, "
+            f"soft limit {memory['soft_limit_mb']:.0f} MB)\n"
+        )
+    status_text += "\n"
     
     update.message.reply_text(status_text, parse_mode=ParseMode.MARKDOWN)
 
@@ -119,11 +128,12 @@ def main() -> None:
     # Start keepalive thread
     threading.Thread(target=keepalive_log, daemon=True).start()
     
-    # Start the Bot
-    updater.start_polling()
+    # Sample memory and log the allocation sites that keep growing
+    memory_watchdog.start()
     
-    # Run the bot until the user presses Ctrl-C or the process receives SIGINT, SIGTERM or SIGABRT
-    updater.idle()
+    # Start the Bot, by long polling or webhook depending on UPDATE_MODE.
+    # Runs until the user presses Ctrl-C or the process receives SIGINT, SIGTERM or SIGABRT
+    webhook.run(updater)
 
 if __name__ == '__main__':
     logger.info("Starting bot...")
@@ -1,8 +1,10 @@
 # Fix for feedparser with Python 3.13+
 import sys
+import importlib.util
 
-# Check if cgi module exists, if not create a minimal shim
-if "cgi" not in sys.modules:
+# Only install the shim when the cgi module is really gone (Python 3.13+);
+# find_spec checks for it without paying for the import
+if "cgi" not in sys.modules and importlib.util.find_spec("cgi") is None:
     import html
     
     class MiniCGI:
@@ -11,4 +13,4 @@ if "cgi" not in sys.modules:
     
     sys.modules["cgi"] = MiniCGI()
     
-    print("Applied CGI module shim for feedparser compatibility")
\ No newline at end of file
+    print("Applied CGI module shim for feedparser compatibility")
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Lag samples kept per feed for the percentiles
+FRESHNESS_SAMPLES = int(os.environ.get("FRESHNESS_SAMPLES", 200))
+
+# Entries seen but not sent yet that are remembered (oldest are dropped)
+MAX_PENDING = 10000
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def format_lag(seconds):
+    """Short human form of a lag: 45s, 12m, 3.5h, 2.0d"""
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
+class FeedLag:
+    """Recent lag samples of one feed"""
+
+    __slots__ = ("detection", "delivery", "total", "delivered")
+
+    def __init__(self, size):
+        self.detection = deque(maxlen=size)
+        self.delivery = deque(maxlen=size)
+        self.total = deque(maxlen=size)
+        self.delivered = 0
+
+
+class FreshnessTracker:
+    """How long entries take from publication to the channel
+
+    For every entry two lags are measured:
+      detection  published/updated time -> first seen by a check
+      delivery   first seen -> sent to the channel
+    Detection lag is only known for dated entries, and is skipped for
+    entries published before the feed was added (its backlog).
+    """
+
+    def __init__(self, samples=FRESHNESS_SAMPLES, max_pending=MAX_PENDING):
+        self.samples = samples
+        self.max_pending = max_pending
+        # (feed_id, entry_id) -> (first_seen, detection lag or None)
+        self._pending = OrderedDict()
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def seen(self, feed_id, entry_id, published=None, since=None, now=None):
+        """Note that a check found an unsent entry; only the first sighting counts
+
+        `published` and `since` (when the feed started being watched) are
+        epoch seconds.
+        """
+        key = (feed_id, entry_id)
+        now = time.time() if now is None else now
+        with self._lock:
+            if key in self._pending:
+                return
+            detection = None
+            if published is not None and (since is None or published >= since):
+                # Clock skew and future-dated entries count as detected at once
+                detection = max(0.0, now - published)
+            self._pending[key] = (now, detection)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def discard(self, feed_id, entry_id):
+        """Forget an entry that won't be sent (e.g. filtered out)"""
+        with self._lock:
+            self._pending.pop((feed_id, entry_id), None)
+
+    def clear_pending(self):
+        """Forget entries seen but not yet sent; returns how many there were"""
+        with self._lock:
+            dropped = len(self._pending)
+            self._pending.clear()
+            return dropped
+
+    def delivered(self, feed_id, entry_id, now=None):
+        """Record the lags of an entry that was just sent"""
+        now = time.time() if now is None else now
+        with self._lock:
+            first_seen, detection = self._pending.pop((feed_id, entry_id), (now, None))
+            lag = self._feeds.get(feed_id)
+            if lag is None:
+                lag = self._feeds[feed_id] = FeedLag(self.samples)
+            delivery = max(0.0, now - first_seen)
+            lag.delivery.append(delivery)
+            if detection is not None:
+                lag.detection.append(detection)
+                lag.total.append(detection + delivery)
+            lag.delivered += 1
+
+    def feed_stats(self, feed_id):
+        """Percentiles of a feed's detection, delivery and total lag in seconds"""
+        with self._lock:
+            lag = self._feeds.get(feed_id)
+            if lag is None:
+                return None
+            series = {name: sorted(getattr(lag, name)) for name in ("detection", "delivery", "total")}
+            delivered = lag.delivered
+        stats = {"delivered": delivered}
+        for name, values in series.items():
+            stats[name] = {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+        return stats
+
+    def slowest(self, count=5, pct=90):
+        """(feed_id, stats) of the feeds with the highest total lag percentile"""
+        with self._lock:
+            feed_ids = list(self._feeds)
+        ranked = []
+        for feed_id in feed_ids:
+            stats = self.feed_stats(feed_id)
+            key = stats["total"][f"p{pct}"]
+            if key is None:
+                key = stats["delivery"][f"p{pct}"]
+            ranked.append((key or 0, feed_id, stats))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [(feed_id, stats) for _, feed_id, stats in ranked[:count]]
+
+    def overall(self):
+        """Percentiles over all feeds' samples"""
+        with self._lock:
+            lags = list(self._feeds.values())
+            series = {
+                name: sorted(value for lag in lags for value in getattr(lag, name))
+                for name in ("detection", "delivery", "total")
+            }
+        return {name: {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+                for name, values in series.items()}
+
+
+freshness = FreshnessTracker()
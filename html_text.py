@@ -0,0 +1,89 @@
+import html
+import re
+
+# One token per match; text runs are capped so a huge text node can't be
+# scanned past the point where enough characters have been produced.
+# Comments and script/style blocks cut off by a truncated feed run to the end
+_TOKEN = re.compile(r'''
+    <!\[CDATA\[(?P<cdata>.*?)\]\]>
+  | <!--.*?(?:-->|\Z)
+  | <(?P<skip>script|style)\b.*?(?:</(?P=skip)\s*>|\Z)
+  | <(?P<tag>/?[a-zA-Z][\w:-]*)[^>]*>
+  | <[!?][^>]*>
+  | (?P<entity>&(?:\#[0-9]+|\#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);?)
+  | (?P<text>[^<&]{1,512}|[<&])
+''', re.S | re.I | re.X)
+
+# Tags that separate blocks of text
+_BLOCK_TAGS = {
+    "br", "p", "/p", "div", "/div", "li", "/li", "tr", "/tr", "blockquote", "/blockquote",
+    "h1", "/h1", "h2", "/h2", "h3", "/h3", "h4", "/h4", "h5", "/h5", "h6", "/h6",
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Characters with a meaning in Telegram's (legacy) Markdown
+_MARKDOWN_ESCAPES = str.maketrans({c: "\\" + c for c in "_*`["})
+
+
+def escape_markdown(text):
+    """Escape Telegram Markdown control characters in plain text"""
+    return text.translate(_MARKDOWN_ESCAPES)
+
+
+def html_to_text(html_text, limit=300, ellipsis="...", markdown=True):
+    """Convert HTML to plain text, stopping once `limit` characters exist
+
+    Tags are dropped (block tags become line breaks), entities are decoded,
+    CDATA sections are kept as text and script/style blocks are skipped.
+    Whitespace is collapsed. If the text is longer than `limit`, it is cut
+    to `limit` characters including `ellipsis`. With `markdown`, the result
+    is escaped for Telegram Markdown.
+    """
+    if not html_text:
+        return ""
+
+    pieces = []
+    length = 0
+    # Pending separator: "" (none), " " or "\n"
+    pending = ""
+
+    for match in _TOKEN.finditer(html_text):
+        kind = match.lastgroup
+        if kind == "tag":
+            if match.group("tag").lower() in _BLOCK_TAGS:
+                pending = "\n"
+            continue
+        if kind == "text":
+            text = match.group("text")
+        elif kind == "entity":
+            text = html.unescape(match.group("entity"))
+        elif kind == "cdata":
+            text = match.group("cdata")
+        else:
+            # Comments, declarations and script/style blocks
+            continue
+
+        # Collapse whitespace, remembering it as a separator for the next word
+        words = _WHITESPACE.split(text)
+        if words[0] == "" and len(words) > 1 and not pending:
+            pending = " "
+        for i, word in enumerate(words):
+            if i and not pending:
+                pending = " "
+            if not word:
+                continue
+            if pending and pieces:
+                pieces.append(pending)
+                length += 1
+            pending = ""
+            pieces.append(word)
+            length += len(word)
+
+        if length > limit:
+            break
+
+    text = "".join(pieces)
+    if len(text) > limit:
+        text = text[:limit - len(ellipsis)].rstrip() + ellipsis
+    return escape_markdown(text) if markdown else text
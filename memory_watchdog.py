@@ -0,0 +1,255 @@
+import gc
+import logging
+import os
+import threading
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between memory samples (0 = no watchdog)
+MEMORY_WATCH_INTERVAL = float(os.environ.get("MEMORY_WATCH_INTERVAL", 300))
+
+# Resident memory at which caches are evicted and a report is written.
+# Heroku's R14 starts at the dyno's quota (512 MB on standard dynos)
+MEMORY_SOFT_LIMIT_MB = float(os.environ.get("MEMORY_SOFT_LIMIT_MB", 400))
+
+# Stack frames tracemalloc records per allocation; 0 (the default) samples
+# RSS only. Tracing adds memory to every live block, slows allocations down
+# and makes each sample take a while, so turn it on while diagnosing
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", 0))
+
+# Where reports are written, and how many allocation sites they list
+MEMORY_DIR = os.environ.get("MEMORY_DIR", "memory")
+MEMORY_TOP = int(os.environ.get("MEMORY_TOP", 10))
+
+# Allocations made by the tracing itself, this module or imports are not leaks
+_IGNORED = frozenset({
+    tracemalloc.__file__,
+    __file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+})
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or the peak where the current one is unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0.0
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def site_totals(snapshot):
+    """{(filename, lineno): (bytes, blocks)} of a snapshot, without the ignored files
+
+    Grouping is done once per sample; comparing these small dicts is far
+    cheaper than Snapshot.compare_to or filter_traces over every trace.
+    """
+    totals = {}
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        if frame.filename not in _IGNORED:
+            totals[(frame.filename, frame.lineno)] = (stat.size, stat.count)
+    return totals
+
+
+def top_growth(current, previous, top):
+    """The `top` sites that grew most: [(filename, lineno, bytes, bytes grown, blocks grown)]"""
+    growth = []
+    for site, (size, count) in current.items():
+        old_size, old_count = previous.get(site, (0, 0))
+        if size > old_size:
+            growth.append((*site, size, size - old_size, count - old_count))
+    growth.sort(key=lambda item: item[3], reverse=True)
+    return growth[:top]
+
+
+def format_site(filename, lineno, size, size_diff, count_diff):
+    return f"{filename}:{lineno}: {size / 1024:.1f} KB ({size_diff / 1024:+.1f} KB, {count_diff:+d} blocks)"
+
+
+class MemoryWatchdog:
+    """Samples memory on a background thread and reacts to a soft limit
+
+    Every `interval` seconds the resident set size is read and, with
+    tracing on, a tracemalloc snapshot is compared with the previous one
+    to log the allocation sites that grew the most. When RSS crosses
+    `soft_limit_mb` the registered evictors run (caches that can be
+    rebuilt), and the growth since the first sample is written to a
+    report in `directory`. Only per-line totals of the previous sample
+    are kept in memory; the first snapshot is dumped to disk.
+    """
+
+    def __init__(self, interval=MEMORY_WATCH_INTERVAL, soft_limit_mb=MEMORY_SOFT_LIMIT_MB,
+                 frames=MEMORY_TRACE_FRAMES, directory=MEMORY_DIR, top=MEMORY_TOP, rss=current_rss_mb):
+        self.interval = interval
+        self.soft_limit_mb = soft_limit_mb
+        self.frames = frames
+        self.directory = directory
+        self.top = top
+        self.rss = rss
+        self._evictors = []
+        self._previous = None
+        self._baseline_path = None
+        self._over_limit = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.last_rss = None
+        self.peak_rss = 0.0
+        self.growth = []
+        self.events = []
+        self.limit_crossings = 0
+
+    def add_evictor(self, name, evict):
+        """Run `evict()` when the soft limit is crossed; it may return the number of items dropped"""
+        self._evictors.append((name, evict))
+
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        """Start tracing and the sampling thread; returns False when disabled or already running"""
+        if not self.enabled() or self._thread is not None:
+            return False
+        if self.frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Memory watchdog started: every {self.interval:.0f}s, soft limit {self.soft_limit_mb:.0f} MB")
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Memory sample failed: {e!r}")
+
+    def sample(self):
+        """Take one sample; returns the RSS in MB"""
+        rss = self.rss()
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        growth = []
+        if snapshot is not None:
+            totals = site_totals(snapshot)
+            if self._previous is None:
+                self._baseline_path = self._dump_baseline(snapshot)
+            else:
+                growth = top_growth(totals, self._previous, self.top)
+            self._previous = totals
+
+        with self._lock:
+            self.samples += 1
+            self.last_rss = rss
+            self.peak_rss = max(self.peak_rss, rss)
+            self.growth = [format_site(*site) for site in growth]
+            crossed = rss >= self.soft_limit_mb > 0 and not self._over_limit
+            self._over_limit = rss >= self.soft_limit_mb > 0
+
+        traced = f", traced {tracemalloc.get_traced_memory()[0] / (1024 * 1024):.1f} MB" if snapshot else ""
+        logger.info(f"Memory: RSS {rss:.1f} MB{traced}")
+        for line in self.growth:
+            logger.info(f"Memory growth: {line}")
+        if crossed:
+            self._on_limit(rss, snapshot)
+        return rss
+
+    def _dump_baseline(self, snapshot):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"baseline-{os.getpid()}.snapshot")
+            snapshot.dump(path)
+            return path
+        except OSError as e:
+            logger.error(f"Could not write the memory baseline: {e}")
+            return None
+
+    def _on_limit(self, rss, snapshot):
+        logger.warning(f"Memory soft limit crossed: RSS {rss:.1f} MB >= {self.soft_limit_mb:.0f} MB")
+        report = self._write_report(rss, snapshot) if snapshot is not None else None
+
+        evicted = {}
+        for name, evict in self._evictors:
+            try:
+                evicted[name] = evict()
+            except Exception as e:
+                logger.error(f"Evicting {name} failed: {e!r}")
+                evicted[name] = None
+        gc.collect()
+        after = self.rss()
+        dropped = ", ".join(f"{name} {count if count is not None else '-'}" for name, count in evicted.items())
+        logger.warning(f"Evicted caches ({dropped or 'none registered'}); RSS now {after:.1f} MB")
+
+        with self._lock:
+            self.limit_crossings += 1
+            self.events.append({
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "rss_before": rss,
+                "rss_after": after,
+                "evicted": evicted,
+                "report": report,
+            })
+            del self.events[:-10]
+
+    def _write_report(self, rss, snapshot):
+        """Write the growth since the first sample, by line (and by traceback with several frames)"""
+        try:
+            baseline = tracemalloc.Snapshot.load(self._baseline_path) if self._baseline_path else None
+        except OSError:
+            baseline = None
+        if baseline is None:
+            return None
+        path = os.path.join(self.directory, f"memory-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+        try:
+            with open(path, "w") as out:
+                out.write(f"RSS {rss:.1f} MB, soft limit {self.soft_limit_mb:.0f} MB\n")
+                out.write(f"Traced {tracemalloc.get_traced_memory()[0] / (1024 * 1024):.1f} MB\n\n")
+                out.write(f"Top {self.top} allocation sites by growth since the first sample:\n")
+                for site in top_growth(self._previous, site_totals(baseline), self.top):
+                    out.write(format_site(*site) + "\n")
+                if self.frames > 1:
+                    out.write("\nTracebacks:\n")
+                    stats = [stat for stat in snapshot.compare_to(baseline, "traceback")
+                             if stat.traceback[0].filename not in _IGNORED]
+                    for stat in stats[:self.top]:
+                        out.write(f"\n{stat.size_diff / 1024:+.1f} KB, {stat.count_diff:+d} blocks\n")
+                        out.write("\n".join(stat.traceback.format()) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write the memory report: {e}")
+            return None
+        logger.warning(f"Memory report written to {path}")
+        return path
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rss_mb": self.last_rss,
+                "peak_mb": self.peak_rss,
+                "soft_limit_mb": self.soft_limit_mb,
+                "over_limit": self._over_limit,
+                "tracing": tracemalloc.is_tracing(),
+                "samples": self.samples,
+                "growth": list(self.growth),
+                "last_event": self.events[-1] if self.events else None,
+                "limit_crossings": self.limit_crossings,
+            }
+
+
+memory_watchdog = MemoryWatchdog()
@@ -0,0 +1,162 @@
+"""OPML import and export of the feed list
+
+    python opml.py import FILE --channel @channel [--schedule 2h] [--format detailed] [--user-id ID]
+    python opml.py export [FILE]
+
+`import` validates every feed URL in the OPML document concurrently and
+adds the valid ones in one bulk insert, printing a line per URL. Outlines
+may carry their own channel/schedule/format attributes (as written by
+`export`); --channel is used for the others. `export` writes the active
+feeds to FILE or stdout.
+
+Both use the bot's storage (MONGODB_URI, or the local state in STATE_DIR;
+stop the bot before importing into local state).
+"""
+import argparse
+import sys
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from xml.sax.saxutils import quoteattr
+
+# Largest OPML document accepted
+MAX_OPML_BYTES = 2 * 1024 * 1024
+
+# Feed settings kept as extra outline attributes, so an export imports back
+SETTINGS = ("channel", "schedule", "timezone", "format")
+
+
+class OPMLError(ValueError):
+    """The document is not usable OPML"""
+
+
+class Outline:
+    """One feed of an OPML document"""
+
+    __slots__ = ("url", "title", "settings")
+
+    def __init__(self, url, title=None, settings=None):
+        self.url = url
+        self.title = title
+        self.settings = settings or {}
+
+
+def parse_opml(data):
+    """Return the feed outlines (those with an xmlUrl) of an OPML document, in order
+
+    Category outlines are walked into; their own attributes are ignored.
+    """
+    if len(data) > MAX_OPML_BYTES:
+        raise OPMLError(f"OPML document is larger than {MAX_OPML_BYTES // 1024} KB")
+    if b"<!DOCTYPE" in data[:1024] or b"<!ENTITY" in data:
+        raise OPMLError("OPML documents with a DTD are not accepted")
+    try:
+        root = ElementTree.fromstring(data)
+    except ElementTree.ParseError as e:
+        raise OPMLError(f"Not a valid OPML document: {e}") from None
+    if root.tag != "opml" or root.find("body") is None:
+        raise OPMLError("Not an OPML document (no <opml><body>)")
+
+    outlines = []
+    for element in root.find("body").iter("outline"):
+        url = (element.get("xmlUrl") or element.get("xmlurl") or "").strip()
+        if not url:
+            continue
+        settings = {name: element.get(name).strip() for name in SETTINGS if (element.get(name) or "").strip()}
+        outlines.append(Outline(url, element.get("title") or element.get("text"), settings))
+    return outlines
+
+
+def write_opml(feeds, out, title="RSS Feed Manager Bot feeds"):
+    """Write feed documents to the text stream `out` as OPML, one outline at a time"""
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">\n<head>\n')
+    out.write(f"<title>{_escape(title)}</title>\n")
+    out.write(f"<dateCreated>{datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S GMT')}</dateCreated>\n")
+    out.write("</head>\n<body>\n")
+    count = 0
+    for feed in feeds:
+        url = feed.get("url")
+        if not url:
+            continue
+        attributes = {
+            "type": "rss",
+            "text": feed.get("title") or url,
+            "xmlUrl": url,
+            "channel": feed.get("channel"),
+            "schedule": feed.get("schedule"),
+            "timezone": feed.get("timezone"),
+            "format": feed.get("format_template"),
+        }
+        out.write("<outline" + "".join(
+            f" {name}={quoteattr(str(value))}" for name, value in attributes.items() if value
+        ) + "/>\n")
+        count += 1
+    out.write("</body>\n</opml>\n")
+    return count
+
+
+def _escape(text):
+    return quoteattr(text)[1:-1]
+
+
+def format_report(report):
+    """One line per URL of an import report"""
+    icons = {"added": "✅", "exists": "↩️", "duplicate": "↩️", "invalid": "❌"}
+    lines = []
+    for item in report:
+        detail = item.get("feed_id") if item["status"] == "added" else item.get("detail")
+        line = f"{icons.get(item['status'], '•')} {item['url']} — {item['status']}"
+        lines.append(line + (f": {detail}" if detail else ""))
+    return "\n".join(lines)
+
+
+def summarize(report):
+    counts = {}
+    for item in report:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return ", ".join(f"{count} {status}" for status, count in counts.items()) or "no feeds"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export the bot's feeds as OPML")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="validate and add the feeds of an OPML file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--channel", help="channel for outlines without a channel attribute")
+    import_parser.add_argument("--schedule", default="2h")
+    import_parser.add_argument("--format", default="detailed")
+    import_parser.add_argument("--user-id", type=int, default=0, help="recorded as the feeds' added_by")
+
+    export_parser = commands.add_parser("export", help="write the active feeds as OPML")
+    export_parser.add_argument("file", nargs="?", help="output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+
+    # The storage helpers live in the bot module
+    import app
+    app.connect_storage()
+
+    if args.command == "import":
+        with open(args.file, "rb") as f:
+            data = f.read()
+        try:
+            report = app.import_opml(data, args.channel, args.schedule, args.format, args.user_id)
+        except OPMLError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(format_report(report))
+        print(summarize(report))
+        app.snapshot_local_state(force=True)
+        return 0
+
+    if args.file:
+        with open(args.file, "w", encoding="utf-8") as out:
+            count = write_opml(app.iter_feeds(app.EXPORT_FIELDS), out)
+    else:
+        count = write_opml(app.iter_feeds(app.EXPORT_FIELDS), sys.stdout)
+    print(f"Exported {count} feeds", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
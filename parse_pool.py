@@ -0,0 +1,143 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from startup import lazy_import
+from entries import EntryRecord, extract_entries
+
+feedparser = lazy_import("feedparser")
+
+logger = logging.getLogger(__name__)
+
+# Worker processes that parse feed bodies; 0 parses in the polling threads
+PARSE_PROCESSES = int(os.environ.get("PARSE_PROCESSES", 0))
+
+# A worker is replaced after this many parses, which bounds its memory
+PARSE_TASKS_PER_CHILD = int(os.environ.get("PARSE_TASKS_PER_CHILD", 200))
+
+# Smaller bodies parse faster than the round trip to a worker costs
+PARSE_MIN_BYTES = int(os.environ.get("PARSE_MIN_BYTES", 64 * 1024))
+
+# A parse taking longer than this is reported as a parse error
+PARSE_TIMEOUT = float(os.environ.get("PARSE_TIMEOUT", 60))
+
+
+class ParseTimeout(Exception):
+    """A worker did not finish parsing a body in time"""
+
+
+def parse_body(body, headers, limit):
+    """Parse a feed body; runs in a worker process
+
+    Returns (error, entry tuples, CPU seconds), with the error as text
+    and each entry as the fields of an EntryRecord, so only small,
+    picklable values travel back to the parent.
+    """
+    started = time.process_time()
+    parsed_feed = feedparser.parse(body, response_headers=headers)
+    error = getattr(parsed_feed, 'bozo_exception', None)
+    records = [
+        (record.entry_id, record.title, record.link, record.description, record.categories, record.published)
+        for record in extract_entries(parsed_feed, limit)
+    ]
+    return (str(error) if error else None), records, time.process_time() - started
+
+
+class ParsePool:
+    """Optional pool of worker processes for CPU-bound feedparser work
+
+    feedparser is pure Python, so parses in polling threads share one core
+    through the GIL. With `processes` > 0 large bodies are parsed in
+    worker processes instead. When the pool is off, can't start, or a
+    worker dies, callers get None from parse() and parse in-process.
+    """
+
+    def __init__(self, processes=PARSE_PROCESSES, tasks_per_child=PARSE_TASKS_PER_CHILD,
+                 min_bytes=PARSE_MIN_BYTES, timeout=PARSE_TIMEOUT):
+        self.processes = processes
+        self.tasks_per_child = tasks_per_child
+        self.min_bytes = min_bytes
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.offloaded = 0
+        self.fallbacks = 0
+        self.restarts = 0
+
+    def enabled(self):
+        return self.processes > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Never fork: the parent runs many threads. forkserver keeps
+                # worker start-up cheap where available
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    # Workers need this module, not the caller's __main__ (app.py)
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=context,
+                    max_tasks_per_child=self.tasks_per_child or None,
+                )
+                logger.info(f"Started {self.processes} feed parsing processes")
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def parse(self, body, headers, limit):
+        """(error, EntryRecords, CPU seconds) from a worker, or None to parse in-process"""
+        if not self.enabled() or len(body) < self.min_bytes:
+            return None
+        try:
+            executor = self._get_executor()
+        except Exception as e:
+            logger.error(f"Feed parsing processes unavailable, parsing in-process: {e}")
+            self.processes = 0
+            return None
+        try:
+            future = executor.submit(parse_body, body, dict(headers or {}), limit)
+            error, records, cpu = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise ParseTimeout(f"Parsing took longer than {self.timeout:.0f}s")
+        except (BrokenProcessPool, RuntimeError) as e:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            logger.error(f"Feed parsing process failed, parsing in-process: {e!r}")
+            self._discard_executor(executor)
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        with self._lock:
+            self.offloaded += 1
+        return error, [EntryRecord(*fields) for fields in records], cpu
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "offloaded": self.offloaded,
+                "fallbacks": self.fallbacks,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+parse_pool = ParsePool()
@@ -0,0 +1,120 @@
+import logging
+import os
+import pickle
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Directory for the snapshot and journal; empty disables local persistence
+STATE_DIR = os.environ.get("STATE_DIR", "state")
+
+# A new snapshot is written after this many journal records or seconds
+SNAPSHOT_EVERY = int(os.environ.get("SNAPSHOT_EVERY", 5000))
+SNAPSHOT_INTERVAL = int(os.environ.get("SNAPSHOT_INTERVAL", 3600))
+
+# fsync the journal after every record (safer, slower)
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC", "").lower() in ("1", "true", "yes")
+
+
+def _apply(collections, op, name, key, value):
+    collection = collections.setdefault(name, {})
+    if op == "put":
+        collection[key] = value
+    elif op == "merge":
+        collection.setdefault(key, {}).update(value)
+    elif op == "delete":
+        collection.pop(key, None)
+
+
+class LocalStore:
+    """Snapshot + append-only journal for the in-memory collections
+
+    Every mutation is appended to the journal as one pickled
+    (op, collection, key, value) record. Ops are idempotent ("put" a whole
+    document, "merge" fields into it, "delete"), so replaying a record the
+    snapshot already contains is harmless. The snapshot is a zlib-compressed
+    pickle of all collections, written atomically; after it is written the
+    journal starts over.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, "state.snapshot")
+        self.journal_path = os.path.join(directory, "state.journal")
+        self._lock = threading.Lock()
+        self._journal = None
+        self.records = 0
+        self.last_snapshot = time.monotonic()
+
+    def load(self):
+        """Return the collections from the snapshot with the journal replayed"""
+        os.makedirs(self.directory, exist_ok=True)
+        collections = {}
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                collections = pickle.loads(zlib.decompress(f.read()))
+
+        replayed = 0
+        good_offset = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                while True:
+                    try:
+                        op, name, key, value = pickle.load(f)
+                    except EOFError:
+                        break
+                    except Exception as e:
+                        # A crash can leave a partial record at the end
+                        logger.warning(f"Journal ends with a damaged record, ignoring it: {e}")
+                        break
+                    _apply(collections, op, name, key, value)
+                    good_offset = f.tell()
+                    replayed += 1
+            os.truncate(self.journal_path, good_offset)
+
+        self.records = replayed
+        self._journal = open(self.journal_path, "ab")
+        logger.info(f"Loaded local state: {sum(len(c) for c in collections.values())} documents, "
+                    f"{replayed} journal records replayed")
+        return collections
+
+    def record(self, op, name, key, value=None):
+        """Append one mutation to the journal"""
+        data = pickle.dumps((op, name, key, value), pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._journal is None:
+                return
+            self._journal.write(data)
+            self._journal.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(self._journal.fileno())
+            self.records += 1
+
+    def snapshot(self, collections):
+        """Write all collections to a new snapshot and start a fresh journal"""
+        with self._lock:
+            # pickle.dumps of plain dicts runs without releasing the GIL, so
+            # concurrent writers can't change the collections mid-dump
+            data = zlib.compress(pickle.dumps(collections, pickle.HIGHEST_PROTOCOL))
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, "wb")
+            self.records = 0
+            self.last_snapshot = time.monotonic()
+        logger.info(f"Wrote state snapshot ({len(data)} bytes)")
+
+    def maybe_snapshot(self, collections):
+        """Snapshot if the journal is long or the last snapshot is old"""
+        if self.records >= SNAPSHOT_EVERY or \
+                (self.records and time.monotonic() - self.last_snapshot >= SNAPSHOT_INTERVAL):
+            self.snapshot(collections)
@@ -0,0 +1,173 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Profile the first N polling cycles after startup (0 = off)
+PROFILE_CYCLES = int(os.environ.get("PROFILE_CYCLES", 0))
+
+# Where reports are written, and how many functions they list
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", 40))
+
+# Functions whose cumulative time makes up each stage of a cycle
+STAGES = {
+    "fetch": ("fetch_feed_digest",),
+    "parse": ("parse_entries",),
+    "render": ("format_entry",),
+    "send": ("send_message",),
+}
+
+
+class _Session:
+    """One profiling request: cycles starting before `deadline`, at least `cycles` of them"""
+
+    def __init__(self, seconds, cycles, on_report):
+        self.deadline = time.monotonic() + seconds
+        self.cycles = cycles
+        self.on_report = on_report
+        self.started = 0
+        self.running = 0
+        self.wall = 0.0
+        self.stats = None
+
+    def accepting(self):
+        return self.started < self.cycles or time.monotonic() < self.deadline
+
+    def done(self):
+        return not self.accepting() and not self.running and self.started
+
+
+class CycleProfiler:
+    """Runs cProfile over whole polling cycles on request
+
+    While no session is active, `cycle()` costs one attribute check.
+    Each profiled cycle gets its own cProfile.Profile in its own thread;
+    the results are merged and written out once the session ends.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, top=PROFILE_TOP):
+        self.directory = directory
+        self.top = top
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._session is not None
+
+    def start(self, seconds=0, cycles=1, on_report=None):
+        """Profile cycles starting in the next `seconds` (and at least `cycles` of them)
+
+        `on_report(path, summary)` is called with the report file once the
+        session ends. Returns False if a session is already running.
+        """
+        with self._lock:
+            if self._session is not None:
+                return False
+            self._session = _Session(seconds, cycles, on_report)
+        if seconds:
+            timer = threading.Timer(seconds, self._maybe_finish)
+            timer.daemon = True
+            timer.start()
+        logger.info(f"Profiling polling cycles (seconds={seconds}, cycles={cycles})")
+        return True
+
+    @contextmanager
+    def cycle(self):
+        """Wrap one polling cycle; profiles it if a session wants it"""
+        session = self._session
+        if session is None:
+            yield
+            return
+
+        with self._lock:
+            if session is not self._session or not session.accepting():
+                session = None
+            else:
+                session.started += 1
+                session.running += 1
+        if session is None:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        started = time.monotonic()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                session.wall += time.monotonic() - started
+                session.running -= 1
+                if session.stats is None:
+                    session.stats = pstats.Stats(profile)
+                else:
+                    session.stats.add(profile)
+            self._maybe_finish()
+
+    def _maybe_finish(self):
+        with self._lock:
+            session = self._session
+            if session is None or not session.done():
+                return
+            self._session = None
+
+        try:
+            path, summary = self.write_report(session)
+        except Exception as e:
+            logger.error(f"Error writing profile report: {e}")
+            return
+        logger.info(f"Profile written to {path}: {summary}")
+        if session.on_report:
+            try:
+                session.on_report(path, summary)
+            except Exception as e:
+                logger.error(f"Error delivering profile report: {e}")
+
+    def write_report(self, session):
+        """Write the text report (and a .prof dump) and return (path, summary)"""
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+        stats = session.stats
+        stages = stage_breakdown(stats)
+        summary = f"{session.started} cycle(s), {session.wall:.2f}s wall; " + ", ".join(
+            f"{stage} {seconds:.2f}s" for stage, seconds in stages.items()
+        )
+
+        out = io.StringIO()
+        out.write(f"Profile of {summary}\n\n")
+        out.write("Stage breakdown (cumulative seconds)\n")
+        for stage, seconds in stages.items():
+            share = seconds / session.wall * 100 if session.wall else 0
+            out.write(f"  {stage:<8}{seconds:10.3f}  {share:5.1f}%\n")
+        out.write("\n")
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        with open(base + ".txt", "w") as f:
+            f.write(out.getvalue())
+        stats.dump_stats(base + ".prof")
+        return base + ".txt", summary
+
+
+def stage_breakdown(stats):
+    """Cumulative seconds spent in each of STAGES"""
+    totals = dict.fromkeys(STAGES, 0.0)
+    for (filename, line, name), (cc, nc, tt, ct, callers) in stats.stats.items():
+        for stage, functions in STAGES.items():
+            if name in functions:
+                totals[stage] += ct
+    return totals
+
+
+cycle_profiler = CycleProfiler()
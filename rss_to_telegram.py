@@ -2,10 +2,19 @@ import os
 import time
 import json
 import logging
+import threading
 import feedparser
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import telegram
 from telegram.error import TelegramError
+from html_text import html_to_text
+from config import get_config
+from bot_pool import BotPool, NoBotAvailable
+from entries import published_time
+from freshness import freshness, format_lag
+import entry_keys
+from entry_keys import text_entry_key
 
 # Set up logging
 logging.basicConfig(
@@ -23,51 +32,84 @@ HISTORY_FILE = 'posted_entries.json'
 telegram_channels_env = os.environ.get('TELEGRAM_CHANNEL_IDS', '')
 TELEGRAM_CHANNEL_IDS = [channel.strip() for channel in telegram_channels_env.split(',') if channel.strip()]
 
+# Feeds checked at the same time
+FEED_WORKERS = int(os.environ.get('FEED_WORKERS', 8))
+
+# Marks which entry key mode the history file uses
+KEY_MODE_FIELD = '_entry_key_mode'
+
+# Entries considered per feed (the most recent ones)
+ENTRIES_PER_FEED = 10
+
 def load_history():
-    """Load history of previously posted entries"""
+    """Load history of previously posted entries, keyed by feed URL"""
     try:
         if os.path.exists(HISTORY_FILE):
             with open(HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        return {}
+                history = json.load(f)
+            # Older files hold one flat {entry_id: posted_at} map for RSS_FEED_URL
+            if history and KEY_MODE_FIELD not in history and all(isinstance(value, str) for value in history.values()):
+                history = {RSS_FEED_URL or '': history}
+            return migrate_history_keys(history)
+        return {KEY_MODE_FIELD: entry_keys.ENTRY_KEY_MODE}
     except Exception as e:
         logger.error(f"Error loading history: {str(e)}")
-        return {}
+        # Entries posted from now on are keyed in the current mode; say so
+        return {KEY_MODE_FIELD: entry_keys.ENTRY_KEY_MODE}
+
+def migrate_history_keys(history):
+    """Rewrite raw entry IDs in a loaded history to ENTRY_KEY_MODE keys"""
+    mode = entry_keys.ENTRY_KEY_MODE
+    stored_mode = history.get(KEY_MODE_FIELD, 'raw')
+    if stored_mode == mode:
+        return history
+    if stored_mode != 'raw':
+        # Digests can't be turned back into IDs; keep matching what is stored
+        logger.error(f"{HISTORY_FILE} uses {stored_mode} keys and can't be converted to {mode}; "
+                     f"keeping {stored_mode}")
+        entry_keys.use_mode(stored_mode)
+        return history
+    
+    migrated = {KEY_MODE_FIELD: mode}
+    for url, posted in history.items():
+        if url != KEY_MODE_FIELD:
+            migrated[url] = {text_entry_key(entry_id): posted_at for entry_id, posted_at in posted.items()}
+    logger.info(f"Converted {HISTORY_FILE} to {mode} entry keys")
+    save_history(migrated)
+    return migrated
 
 def save_history(history):
-    """Save history of posted entries"""
+    """Save history of posted entries, marked with the entry key mode in use"""
     try:
         with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f)
+            json.dump({**history, KEY_MODE_FIELD: entry_keys.ENTRY_KEY_MODE}, f)
     except Exception as e:
         logger.error(f"Error saving history: {str(e)}")
 
-def post_to_telegram(entry):
-    """Post a message to all configured Telegram channels"""
+def post_to_telegram(entry, channels=None, bot=None):
+    """Post a message to the given (default: all configured) Telegram channels"""
     if not TELEGRAM_BOT_TOKEN:
         logger.error("Telegram bot token not configured")
         return False
     
-    if not TELEGRAM_CHANNEL_IDS:
+    channels = channels or TELEGRAM_CHANNEL_IDS
+    if not channels:
         logger.error("No Telegram channels configured")
         return False
 
     try:
-        bot = telegram.Bot(token=TELEGRAM_BOT_TOKEN)
+        bot = bot or telegram.Bot(token=TELEGRAM_BOT_TOKEN)
         
         # Format message
         message = f"*{entry.get('title', 'No Title')}*\n\n"
         if entry.get('summary'):
-            # Clean up summary and limit length
-            summary = entry.get('summary', '')
-            if len(summary) > 200:
-                summary = summary[:197] + "..."
+            # Strip HTML and limit length without cutting tags in half
+            summary = html_to_text(entry.get('summary', ''), limit=200)
             message += f"{summary}\n\n"
         
         message += f"[Read more]({entry.get('link', '')})"
         
-        success_count = 0
-        for channel in TELEGRAM_CHANNEL_IDS:
+        def send(channel):
             try:
                 bot.send_message(
                     chat_id=channel, 
@@ -75,61 +117,133 @@ def post_to_telegram(entry):
                     parse_mode="Markdown",
                     disable_web_page_preview=False
                 )
-                success_count += 1
-                # Add a small delay between messages to avoid rate limiting
-                time.sleep(1)
-            except TelegramError as te:
+                return True
+            except (TelegramError, NoBotAvailable) as te:
                 logger.error(f"Error posting to channel {channel}: {str(te)}")
+                return False
         
-        logger.info(f"Posted to {success_count}/{len(TELEGRAM_CHANNEL_IDS)} channels")
+        if isinstance(bot, BotPool):
+            # The pool paces every channel and bot itself; channels go out side by side
+            with ThreadPoolExecutor(max_workers=max(1, min(FEED_WORKERS, len(channels)))) as executor:
+                success_count = sum(executor.map(send, channels))
+        else:
+            success_count = 0
+            for channel in channels:
+                if send(channel):
+                    success_count += 1
+                    # Add a small delay between messages to avoid rate limiting
+                    time.sleep(1)
+        
+        logger.info(f"Posted to {success_count}/{len(channels)} channels")
         return success_count > 0
     except Exception as e:
         logger.error(f"Error in post_to_telegram: {str(e)}")
         return False
 
-def parse_rss_feed():
-    """Parse RSS feed and post new entries"""
-    if not RSS_FEED_URL:
-        logger.error("RSS feed URL not configured")
-        return
+def feed_channels(feed):
+    """Channels a configured feed posts to, falling back to TELEGRAM_CHANNEL_IDS"""
+    channels = [str(channel).strip() for channel in feed.get('channels') or [] if str(channel).strip()]
+    return channels or TELEGRAM_CHANNEL_IDS
 
+def process_feed(feed, history, bot, history_lock):
+    """Check one configured feed and post up to its post_limit new entries"""
+    url = feed['url']
+    result = {'url': url, 'new': 0, 'posted': 0, 'error': None}
     try:
-        logger.info(f"Fetching RSS feed: {RSS_FEED_URL}")
-        feed = feedparser.parse(RSS_FEED_URL)
+        logger.info(f"Fetching RSS feed: {url}")
+        parsed = feedparser.parse(url)
         
-        if hasattr(feed, 'status') and feed.status != 200:
-            logger.error(f"Failed to fetch RSS feed. Status: {feed.status}")
-            return
+        if hasattr(parsed, 'status') and parsed.status != 200:
+            result['error'] = f"status {parsed.status}"
+            logger.error(f"Failed to fetch RSS feed {url}. Status: {parsed.status}")
+            return result
         
-        if not feed.entries:
-            logger.info("No entries found in the feed")
-            return
+        if not parsed.entries:
+            logger.info(f"No entries found in {url}")
+            return result
         
-        history = load_history()
+        with history_lock:
+            # A feed without history is new: its backlog says nothing about detection lag
+            since = time.time() if url not in history else None
+            posted = history.setdefault(url, {})
+        post_limit = feed.get('post_limit') or ENTRIES_PER_FEED
+        channels = feed_channels(feed)
         current_time = datetime.utcnow().isoformat()
-        posted_count = 0
         
-        for entry in feed.entries[:10]:  # Process the 10 most recent entries
-            entry_id = entry.get('id', entry.get('link', ''))
+        for entry in parsed.entries[:ENTRIES_PER_FEED]:  # The most recent entries
+            entry_id = text_entry_key(entry.get('id', entry.get('link', '')))
             
             # Skip if already posted
-            if entry_id in history:
+            if entry_id in posted:
                 continue
-                
-            logger.info(f"New entry found: {entry.get('title', 'No Title')}")
             
-            if post_to_telegram(entry):
-                history[entry_id] = current_time
-                posted_count += 1
-                
-        if posted_count > 0:
-            logger.info(f"Posted {posted_count} new entries")
-            save_history(history)
-        else:
-            logger.info("No new entries to post")
+            result['new'] += 1
+            freshness.seen(url, entry_id, published_time(entry), since)
+            if result['posted'] >= post_limit:
+                continue
+            
+            logger.info(f"New entry found in {url}: {entry.get('title', 'No Title')}")
             
+            if post_to_telegram(entry, channels, bot):
+                with history_lock:
+                    posted[entry_id] = current_time
+                freshness.delivered(url, entry_id)
+                result['posted'] += 1
     except Exception as e:
-        logger.error(f"Error parsing RSS feed: {str(e)}")
+        result['error'] = str(e)
+        logger.error(f"Error parsing RSS feed {url}: {str(e)}")
+    return result
+
+def parse_rss_feed(config=None):
+    """Check every configured feed concurrently and post new entries
+
+    Returns an aggregate summary of the run.
+    """
+    config = config or get_config()
+    feeds = [feed for feed in config.get('feeds', []) if feed.get('url')]
+    if not feeds:
+        logger.error("RSS feed URL not configured")
+        return None
+    
+    started = time.time()
+    history = load_history()
+    history_lock = threading.Lock()
+    # Spread posts over TELEGRAM_BOT_TOKENS as well, if configured
+    bot = None
+    if TELEGRAM_BOT_TOKEN:
+        bot = telegram.Bot(token=TELEGRAM_BOT_TOKEN)
+        bot = BotPool.from_env(bot) or bot
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(FEED_WORKERS, len(feeds)))) as executor:
+        results = list(executor.map(lambda feed: process_feed(feed, history, bot, history_lock), feeds))
+    
+    summary = {
+        'feeds': len(results),
+        'new': sum(r['new'] for r in results),
+        'posted': sum(r['posted'] for r in results),
+        'failed': [r['url'] for r in results if r['error']],
+        'elapsed': time.time() - started,
+        # Lag percentiles of the entries sent by this process so far
+        'lag': freshness.overall(),
+    }
+    if summary['posted'] > 0:
+        save_history(history)
+    
+    logger.info(
+        f"Checked {summary['feeds']} feeds in {summary['elapsed']:.1f}s: "
+        f"{summary['new']} new entries, {summary['posted']} posted, {len(summary['failed'])} feeds failed"
+    )
+    for url in summary['failed']:
+        logger.info(f"Failed feed: {url}")
+    if summary['posted'] > 0:
+        lag = summary['lag']
+        logger.info(
+            f"Freshness p50/p90: detection {format_lag(lag['detection']['p50'])}/{format_lag(lag['detection']['p90'])}, "
+            f"delivery {format_lag(lag['delivery']['p50'])}/{format_lag(lag['delivery']['p90'])}"
+        )
+        for url, stats in freshness.slowest(3):
+            logger.info(f"Slow feed: {url} p90 published → sent {format_lag(stats['total']['p90'])}")
+    return summary
 
 def main():
     """Main function to run the script"""
@@ -139,15 +253,16 @@ def main():
         logger.error("TELEGRAM_BOT_TOKEN environment variable not set")
         return
         
-    if not RSS_FEED_URL:
-        logger.error("RSS_FEED_URL environment variable not set")
+    feeds = [feed for feed in get_config().get('feeds', []) if feed.get('url')]
+    if not feeds:
+        logger.error("No feeds configured (set RSS_FEED_URL or FEEDS_CONFIG)")
         return
         
-    if not TELEGRAM_CHANNEL_IDS:
+    if not all(feed_channels(feed) for feed in feeds):
         logger.error("TELEGRAM_CHANNEL_IDS environment variable not set or empty")
         return
         
-    logger.info(f"Configured to post to {len(TELEGRAM_CHANNEL_IDS)} channels")
+    logger.info(f"Configured to check {len(feeds)} feeds")
     parse_rss_feed()
     logger.info("Script execution completed")
 
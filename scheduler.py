@@ -3,6 +3,7 @@ import os
 import logging
 from datetime import datetime
 from rss_to_telegram import parse_rss_feed
+from config import get_config
 
 # Set up logging
 logging.basicConfig(
@@ -11,8 +12,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Get check interval from environment or default to 2 hours
-CHECK_INTERVAL = int(os.environ.get('CHECK_INTERVAL', 7200))  # Default: 2 hours in seconds
+# Check interval from the config (CHECK_INTERVAL env, default 2 hours)
+CHECK_INTERVAL = int(get_config().get('check_interval', 7200))
 
 def start_scheduler():
     """Start the scheduler loop"""
@@ -23,8 +24,10 @@ def start_scheduler():
             start_time = time.time()
             logger.info(f"Running scheduled task at {datetime.now().isoformat()}")
             
-            # Run the RSS parser
-            parse_rss_feed()
+            # Check all configured feeds concurrently
+            summary = parse_rss_feed()
+            if summary and summary['failed']:
+                logger.warning(f"{len(summary['failed'])}/{summary['feeds']} feeds failed this run")
             
             # Calculate sleep time to maintain consistent intervals
             elapsed = time.time() - start_time
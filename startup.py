@@ -0,0 +1,89 @@
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Record how long each startup phase takes, relative to process start"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases = {}
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def phase(self, name):
+        """Context manager that times a block as a named phase"""
+        return _Phase(self, name)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def first_cycle_done(self):
+        """Log the startup report once, after the first polling cycle"""
+        with self._lock:
+            if self.reported:
+                return
+            self.reported = True
+            self.phases["time_to_first_poll"] = self.elapsed()
+        logger.info(f"Startup timing: {self.summary()}")
+
+    def summary(self):
+        with self._lock:
+            return ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.phases.items())
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.monotonic() - self.start)
+        return False
+
+
+startup_timer = StartupTimer()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            name = self.__dict__["_name"]
+            with startup_timer.phase(f"import {name}"):
+                module = importlib.import_module(name)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for `name` that defers the import until it is used"""
+    return LazyModule(name)
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import accounting
+from accounting import FeedUsage
+from entries import EntryRecord
+
+NOW = datetime(2024, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def app(memory_storage, monkeypatch):
+    monkeypatch.setattr(memory_storage, "bot_pool", None)
+    monkeypatch.setattr(memory_storage, "websub_manager", None)
+    monkeypatch.setattr(memory_storage.time, "sleep", lambda seconds: None)
+    return memory_storage
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+def _entries(*ids):
+    return [EntryRecord(entry_id, f"Entry {entry_id}", f"https://example.com/{entry_id}", "") for entry_id in ids]
+
+
+def _usage(**metrics):
+    usage = FeedUsage()
+    for metric, value in metrics.items():
+        setattr(usage, metric, value)
+    return usage
+
+
+def test_message_quota_stops_a_feed_mid_cycle(app, monkeypatch):
+    monkeypatch.setattr(accounting, "QUOTA_MESSAGES_PER_DAY", 3)
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 1)
+    app.add_feed_usage(app.get_feed(feed_id), _usage(messages=1))
+    context = SimpleNamespace(bot=Bot())
+    usage = FeedUsage()
+
+    assert not app.post_new_entries(context, app.get_feed(feed_id), _entries("a", "b", "c", "d"), usage)
+    app.add_feed_usage(app.get_feed(feed_id), usage)
+
+    assert len(context.bot.sent) == 2
+    assert usage.messages == 2
+    feed = app.get_feed(feed_id)
+    assert accounting.messages_left(feed) == 0
+    assert accounting.over_quota(feed) == ["messages"]
+    # The rest is left for tomorrow, not marked as posted
+    assert app.is_entry_posted(feed_id, "b")
+    assert not app.is_entry_posted(feed_id, "c")
+
+    assert not app.post_new_entries(context, feed, _entries("c", "d"), FeedUsage())
+    assert len(context.bot.sent) == 2
+
+
+def test_quotas_are_off_by_default():
+    feed = {"usage": {accounting.day_key(): {"bytes": 10 ** 12, "parse_cpu": 10 ** 6, "messages": 10 ** 6}}}
+
+    assert accounting.over_quota(feed) == []
+    assert accounting.messages_left(feed) is None
+    assert not accounting.is_demoted(dict(feed, last_check=datetime.now().isoformat()))
+
+
+def test_byte_quota_demotes_a_feed(app, monkeypatch):
+    monkeypatch.setattr(accounting, "QUOTA_BYTES_PER_DAY", 1000)
+    checked = []
+    monkeypatch.setattr(app, "check_feed", lambda context, feed: checked.append(feed["_id"]))
+    hungry = app.add_feed("https://example.com/hungry", "@chan", "UTC", "1h", "simple", None, 1)
+    light = app.add_feed("https://example.com/light", "@chan", "UTC", "1h", "simple", None, 1)
+    app.add_feed_usage(app.get_feed(hungry), _usage(bytes=1500))
+    app.add_feed_usage(app.get_feed(light), _usage(bytes=500))
+    for feed_id in (hungry, light):
+        app.update_last_check(feed_id)
+
+    app._check_feeds(None)
+
+    assert checked == [light]
+
+
+def test_demoted_feeds_run_again_after_the_interval(monkeypatch):
+    monkeypatch.setattr(accounting, "QUOTA_BYTES_PER_DAY", 1000)
+    feed = {"usage": {"2024-03-10": {"bytes": 1500}}, "last_check": NOW.isoformat()}
+
+    assert accounting.is_demoted(feed, NOW + timedelta(hours=1))
+    assert not accounting.is_demoted(feed, NOW + timedelta(seconds=accounting.DEMOTED_INTERVAL + 1))
+
+
+def test_usage_rolls_over_and_expires(app, monkeypatch):
+    monkeypatch.setattr(accounting, "QUOTA_MESSAGES_PER_DAY", 5)
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 1)
+    app.add_feed_usage(app.get_feed(feed_id), _usage(messages=5, bytes=100), NOW)
+    app.add_feed_usage(app.get_feed(feed_id), _usage(bytes=50), NOW)
+    feed = app.get_feed(feed_id)
+
+    assert feed["usage"]["2024-03-10"]["bytes"] == 150
+    assert accounting.messages_left(feed, NOW) == 0
+    # A new day starts with the full quota
+    assert accounting.messages_left(feed, NOW + timedelta(days=1)) == 5
+
+    later = NOW + timedelta(days=accounting.USAGE_HISTORY_DAYS + 1)
+    assert accounting.expired_days(feed["usage"], later) == ["2024-03-10"]
+    app.add_feed_usage(feed, _usage(messages=1), later)
+
+    assert list(app.get_feed(feed_id)["usage"]) == [accounting.day_key(later)]
+
+
+def test_costly_feeds_are_listed_costliest_first(app, monkeypatch):
+    monkeypatch.setattr(accounting, "QUOTA_PARSE_CPU_PER_DAY", 30)
+    monkeypatch.setattr(app, "is_admin", lambda user_id: True)
+    costs = {"cheap": _usage(bytes=1024 * 1024), "cpu": _usage(parse_cpu=40),
+             "chatty": _usage(messages=100), "idle": FeedUsage()}
+    for name, usage in costs.items():
+        feed_id = app.add_feed(f"https://example.com/{name}", "@chan", "UTC", "1h", "simple", None, 1)
+        app.add_feed_usage(app.get_feed(feed_id), usage)
+    replies = []
+    message = SimpleNamespace(reply_text=lambda text, **kwargs: replies.append(text))
+    update = SimpleNamespace(callback_query=None, effective_user=SimpleNamespace(id=1), effective_message=message)
+
+    app.costly_feeds_command(update, None)
+
+    lines = [line for line in replies[0].splitlines() if "example.com" in line]
+    assert [line.rsplit("/", 1)[1] for line in lines] == ["cpu", "chatty", "cheap", "idle"]
+    assert "over quota: parse\\_cpu" in replies[0]
+    ranked = accounting.top_costly(app.iter_feeds(fields=app.COST_FIELDS), limit=2)
+    assert [feed["url"] for feed, _ in ranked] == ["https://example.com/cpu", "https://example.com/chatty"]
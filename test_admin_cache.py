@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+import admin_cache
+from admin_cache import AdminCache
+
+
+class Loader:
+    """Returns the stored admin IDs and counts the database reads"""
+
+    def __init__(self, *ids):
+        self.ids = set(ids)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.ids)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(admin_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_admins_are_loaded_once_per_ttl(clock):
+    loader = Loader(1)
+    cache = AdminCache(loader, ttl=60)
+
+    assert cache.is_admin(1)
+    assert not cache.is_admin(2)
+    clock.now += 59
+    loader.ids.add(2)
+    assert not cache.is_admin(2)
+    assert loader.calls == 1
+
+    clock.now += 1
+    assert cache.is_admin(2)
+    assert loader.calls == 2
+
+
+def test_everyone_is_admin_only_while_there_are_no_admins(clock):
+    loader = Loader()
+    cache = AdminCache(loader, ttl=60)
+
+    assert cache.is_admin(1) and cache.is_admin(2)
+    assert not cache.is_known(1)
+
+    # The first user claims the bot; from then on nobody else is an admin
+    loader.ids.add(1)
+    cache.add(1)
+    assert cache.is_admin(1)
+    assert cache.is_known(1)
+    assert not cache.is_admin(2)
+    clock.now += 60
+    assert not cache.is_admin(2)
+
+
+def test_admins_added_elsewhere_close_the_open_bot_after_the_ttl(clock):
+    loader = Loader()
+    cache = AdminCache(loader, ttl=60)
+    assert cache.is_admin(2)
+
+    loader.ids.add(1)
+    clock.now += 60
+
+    assert not cache.is_admin(2)
+
+
+def test_invalidate_reloads_on_the_next_check(clock):
+    loader = Loader(1)
+    cache = AdminCache(loader, ttl=60)
+    assert not cache.is_admin(2)
+
+    loader.ids = {2}
+    cache.invalidate()
+
+    assert cache.is_admin(2)
+    assert not cache.is_admin(1)
+    assert loader.calls == 2
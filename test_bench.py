@@ -0,0 +1,62 @@
+import json
+
+import bench
+
+
+def _results(**timings):
+    return {"results": {name: {"min": seconds, "median": seconds, "rounds": 1, "loops": 1}
+                        for name, seconds in timings.items()}}
+
+
+def test_compare_flags_only_benchmarks_past_the_threshold():
+    baseline = _results(clean_html=1.0, parse_schedule=1.0, removed=1.0)
+    current = _results(clean_html=1.5, parse_schedule=1.1, added=9.0)
+
+    rows, regressions = bench.compare_results(baseline, current, threshold=1.3)
+
+    assert [row[0] for row in rows] == ["clean_html", "parse_schedule"]
+    assert [row[0] for row in regressions] == ["clean_html"]
+
+
+def test_compare_command_exit_status(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    current = tmp_path / "current.json"
+    baseline.write_text(json.dumps(_results(clean_html=1.0)))
+
+    current.write_text(json.dumps(_results(clean_html=1.2)))
+    assert bench.main(["compare", str(baseline), "--current", str(current)]) == 0
+
+    current.write_text(json.dumps(_results(clean_html=2.0)))
+    assert bench.main(["compare", str(baseline), "--current", str(current)]) == 1
+
+
+def test_run_times_selected_benchmarks():
+    document = bench.run(bench.selected(name_filter="parse_schedule"))
+
+    assert list(document["results"]) == ["parse_schedule"]
+    assert document["results"]["parse_schedule"]["min"] > 0
+
+
+def test_skipped_benchmarks_are_reported(monkeypatch, capsys):
+    monkeypatch.setitem(bench.SKIPPED, "mark_entry_posted[nowhere]", "no such backend")
+
+    document = bench.run(bench.selected(name_filter="nowhere"), bench.skipped("nowhere"))
+
+    assert document["results"] == {}
+    assert document["skipped"] == {"mark_entry_posted[nowhere]": "no such backend"}
+    assert "skipped  (no such backend)" in capsys.readouterr().out
+
+
+def test_merge_keeps_other_results_and_updates_the_metadata(tmp_path):
+    path = tmp_path / "baseline.json"
+    old = _results(clean_html=1.0, parse_schedule=1.0)
+    old.update(created="2020-01-01T00:00:00", python="2.7", machine="vax")
+    path.write_text(json.dumps(old))
+
+    assert bench.main(["run", "--filter", "parse_schedule", "--save", str(path), "--merge"]) == 0
+
+    document = json.loads(path.read_text())
+    assert document["results"]["clean_html"] == old["results"]["clean_html"]
+    assert document["results"]["parse_schedule"]["min"] < 1.0
+    assert document["created"] > old["created"]
+    assert document["python"] != "2.7"
@@ -0,0 +1,162 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest, RetryAfter, Unauthorized
+
+import bot_pool
+from entries import EntryRecord
+from bot_pool import BotPool, NoBotAvailable, PooledBot
+
+
+class FakeBot:
+    def __init__(self, token, admin_of=None, errors=None):
+        self.token = token
+        self.id = int(token.split(":")[0])
+        self.admin_of = admin_of
+        self.errors = list(errors or [])
+        self.sent = []
+        self.member_checks = 0
+        self.member_error = None
+
+    def get_chat_member(self, chat_id, user_id):
+        self.member_checks += 1
+        if self.member_error:
+            raise self.member_error
+        admin = self.admin_of is None or chat_id in self.admin_of
+        return SimpleNamespace(status="administrator" if admin else "left")
+
+    def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(chat_id)
+        return SimpleNamespace(chat_id=chat_id, text=text)
+
+
+def _pool(*bots):
+    return BotPool([PooledBot(bot_pool.bot_name(bot.token), bot, rate=0, burst=0) for bot in bots],
+                   channel_interval=0)
+
+
+def test_channels_stick_to_one_bot_and_spread_across_the_pool():
+    bots = [FakeBot(f"{n}:x") for n in (101, 102, 103)]
+    pool = _pool(*bots)
+    channels = [f"@channel{n}" for n in range(60)]
+
+    for _ in range(3):
+        for channel in channels:
+            pool.send_message(channel, "hi")
+
+    for channel in channels:
+        assert sum(channel in bot.sent for bot in bots) == 1
+    assert all(len(bot.sent) >= 20 for bot in bots)
+
+    # Adding a bot only moves the channels it takes over
+    before = {channel: pool.assigned(channel).name for channel in channels}
+    bigger = _pool(*bots, FakeBot("104:x"))
+    moved = [c for c in channels if bigger.assigned(c).name != before[c]]
+    assert all(bigger.assigned(c).name == "bot104" for c in moved)
+
+
+def test_flood_wait_fails_over_and_the_bot_rests():
+    first, second = FakeBot("201:x"), FakeBot("202:x")
+    pool = _pool(first, second)
+    channel = "@busy"
+    preferred = pool.assigned(channel).bot
+    other = second if preferred is first else first
+    preferred.errors.append(RetryAfter(30))
+
+    pool.send_message(channel, "one")
+    pool.send_message(channel, "two")
+
+    assert other.sent == [channel, channel]
+    assert preferred.sent == []
+    stats = {s["name"]: s for s in pool.stats()}
+    assert stats[bot_pool.bot_name(preferred.token)]["flood_waits"] == 1
+    assert stats[bot_pool.bot_name(preferred.token)]["cooling_down"] > 0
+
+
+def test_only_bots_that_are_admins_post_to_a_channel():
+    admin, outsider = FakeBot("301:x", admin_of={"@mine"}), FakeBot("302:x", admin_of=set())
+    pool = _pool(admin, outsider)
+
+    for _ in range(5):
+        pool.send_message("@mine", "hi")
+
+    assert admin.sent == ["@mine"] * 5
+    assert outsider.sent == []
+
+
+def test_inaccessible_channel_is_checked_once():
+    blind, admin = FakeBot("351:x"), FakeBot("352:x")
+    blind.member_error = BadRequest("Chat not found")
+    pool = _pool(blind, admin)
+
+    for _ in range(5):
+        pool.send_message("@hidden", "hi")
+
+    assert admin.sent == ["@hidden"] * 5
+    assert blind.sent == []
+    assert blind.member_checks == 1
+
+
+def test_removed_bot_fails_over_and_bad_messages_raise():
+    first, second = FakeBot("401:x"), FakeBot("402:x")
+    pool = _pool(first, second)
+    preferred = pool.assigned("@c").bot
+    preferred.errors.append(Unauthorized("Forbidden: bot was kicked"))
+    pool.send_message("@c", "hi")
+    assert pool.assigned("@c").bot is not preferred
+
+    pool.assigned("@c").bot.errors.append(BadRequest("Can't parse entities"))
+    with pytest.raises(BadRequest):
+        pool.send_message("@c", "*broken")
+
+
+def test_no_bot_available_when_all_are_resting():
+    only = FakeBot("501:x", errors=[RetryAfter(60)])
+    pool = _pool(only)
+
+    with pytest.raises(NoBotAvailable):
+        pool.send_message("@c", "hi")
+    with pytest.raises(NoBotAvailable):
+        pool.send_message("@c", "again")
+    assert only.sent == []
+
+
+def test_sends_are_paced_per_channel_not_per_pool():
+    bots = [FakeBot(f"{n}:x") for n in (601, 602)]
+    pool = BotPool([PooledBot(bot_pool.bot_name(bot.token), bot, rate=0, burst=0) for bot in bots],
+                   channel_interval=0.1)
+
+    started = time.monotonic()
+    for _ in range(3):
+        pool.send_message("@one", "hi")
+    assert time.monotonic() - started >= 0.2
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda n: pool.send_message(f"@parallel{n}", "hi"), range(6)))
+    assert time.monotonic() - started < 0.1
+    assert sum(len(bot.sent) for bot in bots) == 9
+
+
+def test_posting_through_the_pool_does_not_sleep(memory_storage, monkeypatch):
+    app = memory_storage
+    bot = FakeBot("701:x")
+    monkeypatch.setattr(app, "bot_pool", _pool(bot))
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: pytest.fail("slept between sends"))
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 1)
+    entries = [EntryRecord(str(n), f"Entry {n}", "https://example.com/", "") for n in range(5)]
+
+    assert app.post_new_entries(None, app.get_feed(feed_id), entries, app.accounting.FeedUsage())
+    assert bot.sent == ["@chan"] * 5
+
+
+def test_no_pool_without_extra_tokens():
+    primary = FakeBot("101:x")
+
+    assert BotPool.from_env(primary, tokens="") is None
+    assert BotPool.from_env(primary, tokens=" 101:x, ") is None
+    assert len(BotPool.from_env(primary, tokens="101:x,102:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA")) == 2
@@ -0,0 +1,201 @@
+import threading
+import types
+
+import pytest
+
+import entry_keys
+
+LEGACY = {
+    "f1": ["https://example.com/1", "tag:example.com,2024:2"],
+    "f2": ["https://example.com/1"],
+}
+
+
+@pytest.fixture
+def hash64(memory_storage, monkeypatch):
+    """App storage holding raw-keyed posted entries, configured for hash64 keys"""
+    app = memory_storage
+    for feed_id, entry_ids in LEGACY.items():
+        for entry_id in entry_ids:
+            app.mark_entry_posted(feed_id, entry_id)
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "hash64")
+    monkeypatch.setattr(app, "_raw_entry_keys", False)
+    return app
+
+
+def test_legacy_ids_are_migrated(hash64):
+    app = hash64
+    posted_at = app.entries_collection["f1_https://example.com/1"]["posted_at"]
+
+    app.migrate_entry_keys()
+
+    assert set(app.entries_collection) == {
+        (feed_id, entry_keys.entry_key(entry_id)) for feed_id, entry_ids in LEGACY.items() for entry_id in entry_ids
+    }
+    assert app.entries_collection[("f1", entry_keys.entry_key("https://example.com/1"))] == posted_at
+    assert app.status_collection["system"]["entry_key_mode"] == "hash64"
+    for feed_id, entry_ids in LEGACY.items():
+        for entry_id in entry_ids:
+            assert app.is_entry_posted(feed_id, entry_id)
+    assert not app.is_entry_posted("f2", "tag:example.com,2024:2")
+
+
+def test_migrating_twice_changes_nothing(hash64):
+    app = hash64
+    app.migrate_entry_keys()
+    entries = dict(app.entries_collection)
+    app.mark_entry_posted("f1", "https://example.com/3")
+
+    app.migrate_entry_keys()
+
+    assert {key: value for key, value in app.entries_collection.items() if key in entries} == entries
+    assert len(app.entries_collection) == len(entries) + 1
+    assert app.is_entry_posted("f1", "https://example.com/3")
+
+
+def test_both_key_forms_match_during_the_transition(hash64, monkeypatch):
+    app = hash64
+    monkeypatch.setattr(app, "_raw_entry_keys", True)
+    app.mark_entry_posted("f2", "https://example.com/new")
+
+    # Raw keys from before the switch and hashed keys written since
+    assert "f1_https://example.com/1" in app.entries_collection
+    assert app.is_entry_posted("f1", "https://example.com/1")
+    assert app.is_entry_posted("f2", "https://example.com/new")
+    assert not app.is_entry_posted("f2", "tag:example.com,2024:2")
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the key migration
+
+    bulk_write waits for `gate` and then raises `error` or applies the updates.
+    """
+
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+        self.queries = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = None
+
+    def _matches(self, doc, query):
+        for field, value in query.items():
+            if isinstance(value, dict) and "$in" in value:
+                if doc.get(field) not in value["$in"]:
+                    return False
+            elif isinstance(value, dict):
+                # Only {"$type": "string"}
+                if not isinstance(doc.get(field), str):
+                    return False
+            elif doc.get(field) != value:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        return [dict(doc) for doc in self.docs if self._matches(doc, query)]
+
+    def find_one(self, query, projection=None):
+        self.queries.append(query)
+        return next((dict(doc) for doc in self.docs if self._matches(doc, query)), None)
+
+    def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if self._matches(doc, query)), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = dict(query, **update.get("$setOnInsert", {}))
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def bulk_write(self, requests, ordered=True):
+        self.gate.wait(5)
+        if self.error:
+            raise self.error
+        for query, update in requests:
+            self.update_one(query, update)
+        return types.SimpleNamespace(modified_count=len(requests))
+
+
+@pytest.fixture
+def mongo(memory_storage, monkeypatch):
+    """connect_storage() against fake MongoDB collections holding raw-keyed entries"""
+    app = memory_storage
+    db = types.SimpleNamespace(
+        feeds=FakeCollection(), admins=FakeCollection(), status=FakeCollection(),
+        entries=FakeCollection([{"_id": 1, "feed_id": "f1", "entry_id": "https://example.com/1"}]),
+    )
+    client = types.SimpleNamespace(get_database=lambda name: db)
+    monkeypatch.setattr(app, "pymongo", types.SimpleNamespace(
+        MongoClient=lambda uri: client, UpdateOne=lambda query, update: (query, update),
+        errors=types.SimpleNamespace(BulkWriteError=type("BulkWriteError", (Exception,), {})),
+    ))
+    monkeypatch.setattr(app, "MONGODB_URI", "mongodb://fake")
+    monkeypatch.setattr(app, "storage_ready", threading.Event())
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "hash64")
+    monkeypatch.setattr(app, "_raw_entry_keys", False)
+    return app, db
+
+
+def _migration_thread():
+    return next((thread for thread in threading.enumerate() if thread.name == "entry-key-migration"), None)
+
+
+def test_storage_is_ready_while_mongo_entries_migrate(mongo):
+    app, db = mongo
+    db.entries.gate.clear()
+
+    app.connect_storage()
+    migration = _migration_thread()
+    try:
+        assert app.storage_ready.is_set()
+        assert app.entries_collection is db.entries
+        assert app.is_entry_posted("f1", "https://example.com/1")
+        assert db.entries.queries[-1]["entry_id"] == {
+            "$in": [entry_keys.entry_key("https://example.com/1"), "https://example.com/1"]
+        }
+    finally:
+        db.entries.gate.set()
+    migration.join(5)
+
+    assert not app._raw_entry_keys
+    assert db.entries.docs[0]["entry_id"] == entry_keys.entry_key("https://example.com/1")
+    assert db.status.find_one({"_id": "system"})["entry_key_mode"] == "hash64"
+    assert app.is_entry_posted("f1", "https://example.com/1")
+
+
+def test_failed_mongo_migration_keeps_matching_raw_ids(mongo):
+    app, db = mongo
+    db.entries.error = ConnectionError("connection reset")
+    db.entries.gate.clear()
+
+    app.connect_storage()
+    migration = _migration_thread()
+    db.entries.gate.set()
+    migration.join(5)
+
+    # Still on MongoDB, and not recorded as done, so the next start retries
+    assert app.entries_collection is db.entries
+    assert "entry_key_mode" not in db.status.find_one({"_id": "system"})
+    assert app._raw_entry_keys
+    assert app.is_entry_posted("f1", "https://example.com/1")
+
+
+def test_failed_memory_migration_still_marks_storage_ready(memory_storage, monkeypatch):
+    app = memory_storage
+    feeds, entries, admins, status = app._in_memory_storage()
+    # A legacy record without its feed_id can't be converted
+    entries["f1_https://example.com/1"] = {"entry_id": "https://example.com/1", "posted_at": "2024-01-01"}
+    monkeypatch.setattr(app, "_local_storage", lambda: (feeds, entries, admins, status))
+    monkeypatch.setattr(app, "MONGODB_URI", "")
+    monkeypatch.setattr(app, "storage_ready", threading.Event())
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "hash64")
+    monkeypatch.setattr(app, "_raw_entry_keys", False)
+
+    app.connect_storage()
+
+    assert app.storage_ready.is_set()
+    assert "entry_key_mode" not in status["system"]
+    assert app.is_entry_posted("f1", "https://example.com/1")
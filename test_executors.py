@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from executors import MonitoredExecutor, run_in
+
+
+@pytest.fixture
+def pool():
+    pool = MonitoredExecutor("test", 1)
+    yield pool
+    pool.shutdown()
+
+
+def test_blocked_worker_queues_tasks_and_records_their_wait(pool):
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    first = pool.submit(block)
+    started.wait(5)
+    waiting = [pool.submit(lambda: None) for _ in range(2)]
+
+    stats = pool.stats()
+    assert stats["workers"] == 1
+    assert stats["running"] == 1
+    assert stats["queued"] == 2
+    assert stats["max_wait"] < 0.2
+
+    time.sleep(0.3)
+    release.set()
+    for future in [first, *waiting]:
+        future.result(5)
+
+    stats = pool.stats()
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    assert stats["completed"] == 3
+    # The queued tasks waited out the blocked worker
+    assert stats["max_wait"] >= 0.3
+    assert 0 < stats["avg_wait"] < stats["max_wait"]
+
+
+def test_failures_are_counted_and_raised(pool):
+    def fail():
+        raise ValueError("boom")
+
+    future = pool.submit(fail)
+
+    with pytest.raises(ValueError):
+        future.result(5)
+    assert pool.stats()["failed"] == 1
+    assert pool.stats()["completed"] == 1
+
+
+def test_run_in_returns_before_the_task_runs(pool):
+    release = threading.Event()
+    done = []
+
+    @run_in(pool)
+    def handler(value):
+        release.wait(5)
+        done.append(value)
+
+    assert handler("x") is None
+    assert done == []
+    release.set()
+    pool.shutdown()
+    assert done == ["x"]
@@ -0,0 +1,56 @@
+import os
+
+import feedparser
+import pytest
+
+import app
+import fast_parse
+from entries import extract_entries
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "feeds")
+
+
+def _fixtures(prefix):
+    return sorted(name for name in os.listdir(FIXTURES) if name.startswith(prefix))
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def _comparable(record):
+    # feedparser sanitizes summaries; both are turned into the same text by clean_html
+    description = app.clean_html(record.description) if record.description is not None else None
+    return (record.entry_id, record.title, record.link, description, record.categories, record.published)
+
+
+@pytest.mark.parametrize("name", _fixtures("fast_"))
+def test_fast_path_matches_feedparser(name):
+    body = _read(name)
+    fast = fast_parse.parse_fast(body, {"content-type": "application/xml"})
+    assert fast is not None, "expected the fast path"
+    expected = extract_entries(feedparser.parse(body), 10)
+    assert [_comparable(record) for record in fast] == [_comparable(record) for record in expected]
+
+
+@pytest.mark.parametrize("name", _fixtures("fallback_"))
+def test_unusual_documents_go_to_feedparser(name):
+    assert fast_parse.parse_fast(_read(name)) is None
+
+
+def test_content_types_and_charsets_feedparser_treats_differently():
+    body = _read("fast_rss_basic.xml")
+    assert fast_parse.parse_fast(body, {"content-type": "application/rss+xml; charset=utf-8"}) is not None
+    assert fast_parse.parse_fast(body, {"content-type": "text/xml; charset=UTF-8"}) is not None
+    assert fast_parse.parse_fast(body, {"content-type": "text/xml"}) is None
+    assert fast_parse.parse_fast(body, {"content-type": "text/html"}) is None
+    assert fast_parse.parse_fast(body, {"content-type": "application/xml; charset=iso-8859-1"}) is None
+
+
+def test_limit_and_well_formedness_past_it():
+    items = "".join(f"<item><guid>{i}</guid><link>https://e/{i}</link></item>" for i in range(30))
+    body = f"<rss version='2.0'><channel>{items}</channel></rss>".encode()
+    assert [record.entry_id for record in fast_parse.parse_fast(body, limit=3)] == ["0", "1", "2"]
+    # Entries past the limit aren't extracted, but the document must still be well-formed
+    assert fast_parse.parse_fast(body.replace(b"</channel>", b""), limit=3) is None
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+import feed_cache
+from feed_cache import ParsedFeedCache, body_digest
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(feed_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_least_recently_used_body_is_evicted(clock):
+    cache = ParsedFeedCache(max_size=2)
+    cache.put("a", ["a1"])
+    cache.put("b", ["b1"])
+    assert cache.get("a") == ("a1",)
+
+    cache.put("c", ["c1"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ("a1",)
+    assert cache.get("c") == ("c1",)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_entries_expire_after_max_age(clock):
+    cache = ParsedFeedCache(max_age=60)
+    cache.put("a", ["a1"])
+
+    clock.now += 60
+    assert cache.get("a") == ("a1",)
+    clock.now += 1
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["expired"] == 1
+    assert stats["size"] == 0
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_putting_a_body_again_refreshes_it(clock):
+    cache = ParsedFeedCache(max_size=2, max_age=60)
+    cache.put("a", ["old"])
+    cache.put("b", ["b1"])
+    clock.now += 50
+    cache.put("a", ["new"])
+    cache.put("c", ["c1"])
+    clock.now += 20
+
+    assert cache.get("a") == ("new",)
+    assert cache.get("b") is None
+
+
+def test_settled_bodies_are_tracked_per_feed():
+    cache = ParsedFeedCache()
+    digest = body_digest(b"<rss/>")
+
+    assert not cache.is_settled("f1", digest)
+    cache.mark_settled("f1", digest)
+    assert cache.is_settled("f1", digest)
+    assert not cache.is_settled("f2", digest)
+    assert not cache.is_settled("f1", body_digest(b"<rss>changed</rss>"))
+    assert cache.stats()["unchanged"] == 1
+
+    cache.forget("f1")
+    assert not cache.is_settled("f1", digest)
+
+
+def test_validators_are_kept_per_url():
+    cache = ParsedFeedCache()
+
+    assert cache.validators("https://example.com/feed") == (None, None, None)
+    cache.set_validators("https://example.com/feed", '"v1"', "Mon, 06 Jan 2025 10:00:00 GMT", "d1")
+    assert cache.validators("https://example.com/feed") == ('"v1"', "Mon, 06 Jan 2025 10:00:00 GMT", "d1")
+    assert cache.validators("https://example.com/other") == (None, None, None)
+
+
+def test_clear_drops_everything():
+    cache = ParsedFeedCache()
+    cache.put("a", ["a1"])
+    cache.mark_settled("f1", "a")
+    cache.set_validators("https://example.com/feed", '"v1"', None, "a")
+
+    assert cache.clear() == 1
+    assert cache.get("a") is None
+    assert not cache.is_settled("f1", "a")
+    assert cache.validators("https://example.com/feed") == (None, None, None)
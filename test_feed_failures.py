@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def app(memory_storage, monkeypatch):
+    monkeypatch.setattr(memory_storage, "websub_manager", None)
+    monkeypatch.setattr(memory_storage, "FAILURE_BACKOFF_BASE", 300)
+    monkeypatch.setattr(memory_storage, "FAILURE_BACKOFF_MAX", 3600)
+    monkeypatch.setattr(memory_storage, "FAILURE_SUSPEND_THRESHOLD", 10)
+    return memory_storage
+
+
+@pytest.fixture
+def context():
+    return SimpleNamespace(bot=Bot())
+
+
+def _fail(app, context, feed_id, times):
+    for _ in range(times):
+        app.record_feed_failure(context, app.get_feed(feed_id), "HTTP Error 500")
+    return app.get_feed(feed_id)
+
+
+def _delay(feed):
+    """Seconds of backoff the feed was given, from when it was recorded"""
+    retry_at = datetime.fromisoformat(feed["next_retry_at"])
+    return round((retry_at - datetime.fromisoformat(feed["last_error_at"])).total_seconds())
+
+
+def test_backoff_doubles_up_to_the_cap(app, context):
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 7)
+
+    delays = [_delay(_fail(app, context, feed_id, 1)) for _ in range(6)]
+
+    assert delays == [300, 600, 1200, 2400, 3600, 3600]
+    feed = app.get_feed(feed_id)
+    assert feed["consecutive_failures"] == 6
+    assert feed["last_error"] == "HTTP Error 500"
+    assert not feed.get("suspended")
+    assert context.bot.sent == []
+
+
+def test_feed_is_skipped_while_backing_off(app, context):
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 7)
+    feed = _fail(app, context, feed_id, 1)
+
+    assert not app.is_feed_due(feed)
+    assert app.is_feed_due(feed, datetime.now() + timedelta(seconds=301))
+
+
+def test_success_clears_the_failures(app, context):
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 7)
+    app.record_feed_success(_fail(app, context, feed_id, 3))
+
+    feed = app.get_feed(feed_id)
+    assert feed["consecutive_failures"] == 0
+    assert feed["last_error"] is None
+    assert app.is_feed_due(feed)
+    # The next failure starts the backoff over
+    assert _delay(_fail(app, context, feed_id, 1)) == 300
+
+
+def test_persistent_failures_suspend_and_notify_the_owner(app, context):
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 7)
+
+    feed = _fail(app, context, feed_id, 10)
+
+    assert feed["suspended"]
+    assert not app.is_feed_due(feed, datetime.now() + timedelta(days=30))
+    assert len(context.bot.sent) == 1
+    chat_id, text = context.bot.sent[0]
+    assert chat_id == 7
+    assert f"/resumefeed {feed_id}" in text and "HTTP Error 500" in text
+
+
+def test_resume_command_lifts_the_suspension(app, context, monkeypatch):
+    monkeypatch.setattr(app, "is_admin", lambda user_id: True)
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 7)
+    _fail(app, context, feed_id, 10)
+    replies = []
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=7),
+                             message=SimpleNamespace(reply_text=replies.append))
+
+    app.resume_feed_command(update, SimpleNamespace(args=[feed_id]))
+
+    assert "resumed" in replies[0]
+    feed = app.get_feed(feed_id)
+    assert not feed["suspended"]
+    assert feed["consecutive_failures"] == 0
+    assert app.is_feed_due(feed)
+
+    app.resume_feed_command(update, SimpleNamespace(args=["missing"]))
+    assert replies[1] == "Feed missing not found."
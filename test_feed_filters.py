@@ -0,0 +1,85 @@
+import feedparser
+import pytest
+
+import app
+from entries import EntryRecord, extract_entries
+from feed_filters import FilterCache, FilterError, compile_rules, parse_rules
+
+
+def _entry(title, description="", categories=()):
+    return EntryRecord(title, title, "https://example.com/", description, categories)
+
+
+def test_parse_rules_keeps_commas_inside_regexes():
+    assert parse_rules("python, rust lang , /a{1,3}b/, category:Tech") == \
+        ["python", "rust lang", "/a{1,3}b/", "category:Tech"]
+    assert parse_rules(" - ") == []
+
+
+def test_keywords_match_whole_words_case_insensitively():
+    compiled = compile_rules({"include": ["python", "C++", "machine learning"]})
+
+    assert compiled.accepts(_entry("Python 3.13 released"))
+    assert compiled.accepts(_entry("News", "<p>Why <b>C++</b> still matters</p>"))
+    assert compiled.accepts(_entry("Intro to Machine Learning"))
+    assert not compiled.accepts(_entry("Pythonic idioms"))
+    assert not compiled.accepts(_entry("Learning machines"))
+
+
+def test_shorter_keywords_match_where_a_longer_one_fails():
+    compiled = compile_rules({"include": ["apple", "apple pie"]})
+
+    assert compiled.accepts(_entry("apple pies are great"))
+    assert compiled.accepts(_entry("Apple pie recipe"))
+    assert not compiled.accepts(_entry("applesauce"))
+
+
+def test_exclude_regexes_and_categories():
+    compiled = compile_rules({
+        "include": ["category:Tech", "/\\bv\\d+\\.\\d+/"],
+        "exclude": ["sponsored", "category:Ads"],
+    })
+
+    assert compiled.accepts(_entry("Anything", categories=("tech",)))
+    assert compiled.accepts(_entry("Tool v2.1 is out"))
+    assert not compiled.accepts(_entry("Tool v2.1 is out", categories=("Ads",)))
+    assert not compiled.accepts(_entry("Sponsored: tool v2.1"))
+    assert not compiled.accepts(_entry("Unrelated"))
+
+    with pytest.raises(FilterError):
+        compile_rules({"include": ["/(unclosed/"]})
+
+
+def test_categories_come_from_feed_tags():
+    parsed = feedparser.parse(
+        b"<rss version='2.0'><channel><item><guid>1</guid><title>T</title>"
+        b"<category>Tech</category><category>AI</category></item></channel></rss>"
+    )
+    assert extract_entries(parsed)[0].categories == ("Tech", "AI")
+
+
+def test_cache_compiles_once_until_the_rules_change():
+    cache = FilterCache()
+    feed = {"_id": "feed_1", "filters": {"include": ["python"]}}
+
+    first = cache.get(feed)
+    assert cache.get(feed) is first
+    feed["filters"] = {"include": ["rust"]}
+    assert cache.get(feed) is not first
+    assert cache.get({"_id": "feed_2", "filters": {"include": [], "exclude": []}}) is None
+
+
+def test_filtered_entries_are_marked_seen_and_not_sent(memory_storage, monkeypatch):
+    feed_id = app.add_feed("https://example.com/feed", "@chan", "UTC", "1h", "simple", None, 1)
+    app.update_feed(feed_id, "filters", {"exclude": ["sponsored"]})
+    sent = []
+    monkeypatch.setattr(app, "bot_pool", None)
+    monkeypatch.setattr(app.time, "sleep", lambda seconds: None)
+    context = type("Context", (), {"bot": type("Bot", (), {"send_message": lambda self, **kw: sent.append(kw)})()})()
+
+    entries = [_entry("Good news"), _entry("Sponsored post")]
+    assert app.post_new_entries(context, app.get_feed(feed_id), entries, app.accounting.FeedUsage())
+
+    assert [message["text"] for message in sent] == ["*Good news*\n\n[Read more](https://example.com/)"]
+    assert app.is_entry_posted(feed_id, "Sponsored post")
+    assert app.get_status()["entries_filtered"] == 1
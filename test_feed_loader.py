@@ -0,0 +1,59 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import feed_loader
+from feed_cache import feed_cache
+
+RSS = (
+    b'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>Tagged</title>'
+    b"<item><guid>1</guid><title>One</title><link>https://example.com/1</link></item>"
+    b"</channel></rss>"
+)
+
+
+@pytest.fixture
+def url():
+    """A feed that answers 304 to a matching If-None-Match"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(RSS)))
+            self.end_headers()
+            self.wfile.write(RSS)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    feed_cache.clear()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/feed"
+    httpd.shutdown()
+    httpd.server_close()
+    feed_cache.clear()
+
+
+def test_validating_the_same_feed_twice(url):
+    first = feed_loader.validate_feed(url)
+    second = feed_loader.validate_feed(url)
+
+    assert first.error is None and second.error is None
+    assert second.title == "Tagged"
+    assert [entry.title for entry in second.entries] == ["One"]
+
+
+def test_validation_keeps_the_poll_conditional(url):
+    feed_loader.validate_feed(url)
+
+    digest, result = feed_loader.fetch_feed_digest(url)
+
+    assert result.not_modified
+    assert feed_cache.get(digest)[0].title == "One"
@@ -0,0 +1,121 @@
+import gzip
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import feedparser
+import pytest
+
+import fetcher
+from fetcher import FeedTooLarge, fetch_feed
+
+RSS = (
+    b'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>Big</title>'
+    + b"".join(
+        b"<item><guid>%d</guid><title>Entry %d</title><description>%s</description></item>"
+        % (i, i, b"x" * 2000) for i in range(500)
+    )
+    + b"</channel></rss>"
+)
+
+
+class FeedServer:
+    """Serves RSS as-is at /plain, gzipped at /gzip and deflated at /deflate"""
+
+    def __init__(self, body):
+        bodies = {
+            "/plain": (body, None),
+            "/gzip": (gzip.compress(body), "gzip"),
+            "/deflate": (zlib.compress(body), "deflate"),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data, encoding = bodies[self.path]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(data)))
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except ConnectionError:
+                    # The client stopped reading early
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = FeedServer(RSS)
+    yield server
+    server.close()
+
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/deflate"])
+def test_full_body_is_decompressed(server, path):
+    result = fetch_feed(server.url + path)
+
+    assert result.body == RSS
+    assert not result.truncated
+    assert "content-encoding" not in result.headers
+
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/deflate"])
+def test_byte_ceiling(server, path):
+    with pytest.raises(FeedTooLarge):
+        fetch_feed(server.url + path, max_bytes=100_000)
+
+
+@pytest.mark.parametrize("path", ["/plain", "/gzip", "/deflate"])
+def test_early_abort_closes_the_document(server, path):
+    result = fetch_feed(server.url + path, max_bytes=100_000, max_entries=10)
+
+    assert result.truncated
+    assert len(result.body) < 100_000
+    assert result.body.endswith(b"</item></channel></rss>")
+    parsed = feedparser.parse(result.body)
+    assert not parsed.bozo
+    assert [entry.id for entry in parsed.entries] == [str(i) for i in range(10)]
+
+
+def test_entries_past_the_ceiling_are_too_large(server):
+    # Ten entries don't fit under this ceiling, compressed or not
+    for path in ("/plain", "/gzip"):
+        with pytest.raises(FeedTooLarge):
+            fetch_feed(server.url + path, max_bytes=15_000, max_entries=10)
+
+
+def test_inflation_is_bounded(server, monkeypatch):
+    sizes = []
+    decompressor = fetcher._decompressor
+
+    class Recording:
+        def __init__(self, inner):
+            self.inner = inner
+
+        def decompress(self, data, max_length=0):
+            output = self.inner.decompress(data, max_length)
+            sizes.append(len(output))
+            return output
+
+        def __getattr__(self, name):
+            return getattr(self.inner, name)
+
+    monkeypatch.setattr(fetcher, "_decompressor", lambda encoding: Recording(decompressor(encoding)))
+    with pytest.raises(FeedTooLarge):
+        fetch_feed(server.url + "/gzip", max_bytes=100_000)
+
+    assert max(sizes) <= fetcher.CHUNK_SIZE
+    assert sum(sizes) <= 100_001
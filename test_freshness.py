@@ -0,0 +1,68 @@
+import feedparser
+
+from entries import extract_entries
+from freshness import FreshnessTracker, format_lag, percentile
+
+
+def test_percentile_and_format():
+    values = sorted(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 90) == 90
+    assert percentile(values, 99) == 99
+    assert percentile([7], 90) == 7
+    assert percentile([], 50) is None
+    assert [format_lag(s) for s in (5, 600, 5400, 2 * 86400, None)] == ["5s", "10m", "1.5h", "2.0d", "-"]
+
+
+def test_detection_and_delivery_lag():
+    tracker = FreshnessTracker()
+    # Published at 1000, first seen at 1300, sent at 1310
+    tracker.seen("feed_1", "a", published=1000, now=1300)
+    # A later sighting doesn't restart the clock
+    tracker.seen("feed_1", "a", published=1000, now=1305)
+    tracker.delivered("feed_1", "a", now=1310)
+
+    stats = tracker.feed_stats("feed_1")
+    assert stats["delivered"] == 1
+    assert stats["detection"]["p50"] == 300
+    assert stats["delivery"]["p50"] == 10
+    assert stats["total"]["p50"] == 310
+
+
+def test_backlog_undated_and_filtered_entries():
+    tracker = FreshnessTracker()
+    # Published before the feed was added: only delivery lag counts
+    tracker.seen("feed_1", "old", published=100, since=500, now=1000)
+    tracker.delivered("feed_1", "old", now=1002)
+    # No date at all
+    tracker.seen("feed_1", "undated", now=1000)
+    tracker.delivered("feed_1", "undated", now=1001)
+    # Filtered out, never sent
+    tracker.seen("feed_1", "skipped", published=900, now=1000)
+    tracker.discard("feed_1", "skipped")
+
+    stats = tracker.feed_stats("feed_1")
+    assert stats["delivered"] == 2
+    assert stats["detection"]["p50"] is None
+    assert stats["delivery"]["p90"] == 2
+
+
+def test_slowest_feeds_rank_by_total_lag():
+    tracker = FreshnessTracker()
+    for feed_id, detection in (("fast", 10), ("slow", 3600), ("medium", 600)):
+        tracker.seen(feed_id, "x", published=10_000 - detection, now=10_000)
+        tracker.delivered(feed_id, "x", now=10_001)
+
+    assert [feed_id for feed_id, _ in tracker.slowest(2)] == ["slow", "medium"]
+    assert tracker.overall()["detection"]["p50"] == 600
+
+
+def test_entry_records_carry_the_published_time():
+    parsed = feedparser.parse(
+        b"<rss version='2.0'><channel><item><guid>1</guid><title>T</title>"
+        b"<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>"
+        b"<item><guid>2</guid><title>U</title></item></channel></rss>"
+    )
+    dated, undated = extract_entries(parsed)
+    assert dated.published == 1736157600
+    assert undated.published is None
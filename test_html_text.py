@@ -0,0 +1,61 @@
+import pytest
+
+from html_text import escape_markdown, html_to_text
+
+
+def test_tags_are_dropped_and_blocks_break_lines():
+    assert html_to_text("<p>Hello <b>big</b>\n  world</p><p>Again<br>and again</p>") == \
+        "Hello big world\nAgain\nand again"
+
+
+def test_entities_are_decoded():
+    assert html_to_text("Fish &amp; chips &#8211; &#x2603; &copy &nbsp;x", markdown=False) == \
+        "Fish & chips – ☃ © x"
+
+
+def test_cdata_is_kept_and_comments_are_dropped():
+    assert html_to_text("<![CDATA[<kept> as text]]> and <!-- not this --> the rest", markdown=False) == \
+        "<kept> as text and the rest"
+
+
+@pytest.mark.parametrize("html_text", [
+    "Story<script>var tracking = 1;</script> text",
+    "Story<STYLE type='text/css'>p { color: red }</style > text",
+    "Story <!-- [if IE]> something <![endif]--> text",
+])
+def test_script_style_and_comments_are_skipped(html_text):
+    assert html_to_text(html_text) == "Story text"
+
+
+@pytest.mark.parametrize("html_text", [
+    "Story<style>a{}</style",
+    "Story<script>var tracking = 1;",
+    "Story<!-- cut off",
+])
+def test_unterminated_blocks_are_skipped_to_the_end(html_text):
+    assert html_to_text(html_text) == "Story"
+
+
+def test_long_text_is_cut_with_an_ellipsis():
+    text = html_to_text("<p>" + "word " * 200 + "</p>")
+
+    assert len(text) == 300
+    assert text.startswith("word word ")
+    assert text.endswith("...")
+
+
+def test_text_at_the_limit_is_kept_whole():
+    assert html_to_text("x" * 300) == "x" * 300
+    assert html_to_text("x" * 301, limit=300, ellipsis="…") == "x" * 299 + "…"
+
+
+def test_markdown_is_escaped():
+    assert html_to_text("<b>snake_case</b> *stars* `code` [link]") == \
+        "snake\\_case \\*stars\\* \\`code\\` \\[link]"
+    assert html_to_text("snake_case", markdown=False) == "snake_case"
+    assert escape_markdown("a_b*c`d[e]") == "a\\_b\\*c\\`d\\[e]"
+
+
+def test_empty_input():
+    assert html_to_text(None) == ""
+    assert html_to_text("") == ""
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from html_text import escape_markdown
+
+
+@pytest.fixture
+def app(memory_storage, monkeypatch):
+    monkeypatch.setattr(memory_storage, "FEEDS_PAGE_SIZE", 3)
+    monkeypatch.setattr(memory_storage, "is_admin", lambda user_id: True)
+    return memory_storage
+
+
+def _add(app, count):
+    ids = [app.add_feed(f"https://example.com/{n}", "@chan", "UTC", "1h", "simple", None, 1) for n in range(count)]
+    return sorted(ids)
+
+
+def _page(page, ids):
+    """(feed IDs shown, navigation callback data) of a rendered page"""
+    text, markup = page
+    shown = [feed_id for feed_id in ids if f"*{escape_markdown(feed_id)}*" in text]
+    buttons = [button.callback_data for row in markup.inline_keyboard for button in row]
+    return shown, [data for data in buttons if data.startswith("feeds_")]
+
+
+def test_pages_walk_forward_and_back(app):
+    ids = _add(app, 7)
+
+    assert _page(app._feeds_page_message(), ids) == (ids[:3], [f"feeds_next:{ids[2]}"])
+    assert _page(app._feeds_page_message(after=ids[2]), ids) == \
+        (ids[3:6], [f"feeds_prev:{ids[3]}", f"feeds_next:{ids[5]}"])
+    assert _page(app._feeds_page_message(after=ids[5]), ids) == ([ids[6]], [f"feeds_prev:{ids[6]}"])
+    assert _page(app._feeds_page_message(before=ids[6]), ids) == \
+        (ids[3:6], [f"feeds_prev:{ids[3]}", f"feeds_next:{ids[5]}"])
+    assert _page(app._feeds_page_message(before=ids[3]), ids) == (ids[:3], [f"feeds_next:{ids[2]}"])
+
+
+def test_a_full_last_page_has_no_next_button(app):
+    ids = _add(app, 6)
+
+    assert _page(app._feeds_page_message(after=ids[2]), ids) == (ids[3:], [f"feeds_prev:{ids[3]}"])
+    assert app._feeds_page_message(after=ids[5]) is None
+
+
+def test_listing_shows_the_channel_but_no_schedule(app):
+    _add(app, 1)
+
+    text, _ = app._feeds_page_message()
+
+    assert "→ @chan\n" in text
+    assert "every" not in text
+
+
+def test_callback_edits_the_message_with_the_next_page(app):
+    ids = _add(app, 4)
+    edits = []
+    query = SimpleNamespace(data=f"feeds_next:{ids[2]}", answer=lambda: None,
+                            edit_message_text=lambda text, **kwargs: edits.append(kwargs["reply_markup"]))
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=1))
+
+    app.list_feeds_page_callback(update, None)
+
+    assert _page(("", edits[0]), ids)[1] == [f"feeds_prev:{ids[3]}"]
+
+
+def test_callback_ignores_other_users(app, monkeypatch):
+    ids = _add(app, 4)
+    monkeypatch.setattr(app, "is_admin", lambda user_id: False)
+    edits = []
+    query = SimpleNamespace(data=f"feeds_next:{ids[2]}", answer=lambda: None,
+                            edit_message_text=lambda text, **kwargs: edits.append(text))
+
+    app.list_feeds_page_callback(SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=2)), None)
+
+    assert edits == []
+
+
+def test_no_feeds(app):
+    replies = []
+    update = SimpleNamespace(callback_query=None, effective_user=SimpleNamespace(id=1),
+                             effective_message=SimpleNamespace(reply_text=lambda text, **kwargs: replies.append(text)))
+
+    app.list_feeds_command(update, SimpleNamespace(args=[]))
+
+    assert replies == ["No active feeds. Use /addfeed to add one."]
@@ -0,0 +1,81 @@
+import tracemalloc
+
+import pytest
+
+from memory_watchdog import MemoryWatchdog
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start(1)
+    yield
+    tracemalloc.stop()
+
+
+def test_growth_is_reported_by_allocation_site(tmp_path, tracing):
+    watchdog = MemoryWatchdog(soft_limit_mb=0, directory=str(tmp_path), rss=lambda: 100.0)
+    watchdog.sample()
+    leak = [bytearray(1024) for _ in range(2000)]
+
+    watchdog.sample()
+
+    stats = watchdog.stats()
+    assert stats["samples"] == 2 and stats["rss_mb"] == 100.0
+    assert "test_memory_watchdog.py" in stats["growth"][0]
+    assert not stats["over_limit"] and stats["last_event"] is None
+    assert leak
+
+
+def test_soft_limit_evicts_once_and_writes_a_report(tmp_path, tracing):
+    readings = iter([100.0, 450.0, 300.0, 460.0])
+    watchdog = MemoryWatchdog(soft_limit_mb=400, directory=str(tmp_path), rss=lambda: next(readings))
+    cache = {i: bytearray(1024) for i in range(2000)}
+
+    def evict():
+        dropped = len(cache)
+        cache.clear()
+        return dropped
+
+    watchdog.add_evictor("cache", evict)
+    watchdog.add_evictor("broken", lambda: 1 / 0)
+    watchdog.sample()
+    cache.update({i: bytearray(1024) for i in range(2000, 4000)})
+
+    # Crossing the limit: evict, then read RSS again
+    watchdog.sample()
+    event = watchdog.stats()["last_event"]
+    assert event["evicted"] == {"cache": 4000, "broken": None}
+    assert (event["rss_before"], event["rss_after"]) == (450.0, 300.0)
+    with open(event["report"]) as report:
+        assert "test_memory_watchdog.py" in report.read()
+
+    # Staying over the limit does not evict again; crossing it anew does
+    watchdog.sample()
+    assert watchdog.stats()["limit_crossings"] == 1
+    watchdog.rss = lambda: 100.0
+    watchdog.sample()
+    watchdog.rss = lambda: 500.0
+    watchdog.sample()
+    assert watchdog.stats()["limit_crossings"] == 2
+
+
+def test_without_tracing_only_rss_is_watched(tmp_path):
+    watchdog = MemoryWatchdog(soft_limit_mb=50, frames=0, directory=str(tmp_path), rss=lambda: 60.0)
+    watchdog.add_evictor("cache", lambda: 3)
+
+    watchdog.sample()
+
+    stats = watchdog.stats()
+    assert stats["over_limit"] and not stats["tracing"]
+    assert stats["last_event"]["report"] is None
+    assert stats["last_event"]["evicted"] == {"cache": 3}
+    assert not list(tmp_path.iterdir())
+
+
+def test_tracing_is_off_by_default(tmp_path):
+    watchdog = MemoryWatchdog(interval=3600, directory=str(tmp_path))
+    try:
+        assert watchdog.start()
+        assert not tracemalloc.is_tracing()
+    finally:
+        watchdog.stop()
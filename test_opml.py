@@ -0,0 +1,160 @@
+import io
+import threading
+import time
+
+import pytest
+
+import app
+import feed_loader
+import opml
+from feed_loader import ValidationResult
+
+DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<opml version="2.0">
+<head><title>Subscriptions</title></head>
+<body>
+  <outline text="Tech">
+    <outline type="rss" text="Good" xmlUrl="https://example.com/good"/>
+    <outline type="rss" text="Broken" xmlUrl="https://example.com/broken"/>
+    <outline type="rss" text="Again" xmlUrl="https://example.com/good"/>
+  </outline>
+  <outline type="rss" text="Elsewhere" xmlUrl="https://example.com/other" channel="@other" schedule="30m"/>
+  <outline type="rss" text="Known" xmlUrl="https://example.com/known"/>
+  <outline text="No feed here" htmlUrl="https://example.com/"/>
+</body>
+</opml>"""
+
+
+@pytest.fixture
+def storage(memory_storage, monkeypatch):
+    monkeypatch.setattr(app, "websub_manager", None)
+
+
+def test_parse_opml_walks_categories():
+    outlines = opml.parse_opml(DOCUMENT)
+
+    assert [outline.url for outline in outlines] == [
+        "https://example.com/good", "https://example.com/broken", "https://example.com/good",
+        "https://example.com/other", "https://example.com/known",
+    ]
+    assert outlines[3].settings == {"channel": "@other", "schedule": "30m"}
+    assert outlines[0].title == "Good"
+
+
+@pytest.mark.parametrize("data", [
+    b"not xml",
+    b"<rss version='2.0'><channel/></rss>",
+    b"<!DOCTYPE opml [<!ENTITY x 'y'>]><opml><body/></opml>",
+])
+def test_parse_opml_rejects_other_documents(data):
+    with pytest.raises(opml.OPMLError):
+        opml.parse_opml(data)
+
+
+def test_export_imports_back():
+    feeds = [
+        {"url": "https://example.com/a?x=1&y=2", "channel": "@chan", "schedule": "1h",
+         "timezone": "Europe/Berlin", "format_template": "simple"},
+        {"url": "https://example.com/b", "channel": "@chan", "schedule": "2h", "timezone": "UTC"},
+    ]
+    out = io.StringIO()
+
+    assert opml.write_opml(iter(feeds), out) == 2
+    outlines = opml.parse_opml(out.getvalue().encode("utf-8"))
+    assert [outline.url for outline in outlines] == [feed["url"] for feed in feeds]
+    assert outlines[0].settings == {"channel": "@chan", "schedule": "1h", "timezone": "Europe/Berlin",
+                                    "format": "simple"}
+
+
+def test_import_reports_every_url(storage, monkeypatch):
+    validated = []
+
+    def validate_feed(url):
+        validated.append(url)
+        if "broken" in url:
+            return ValidationResult(url, error="Error parsing the feed: mismatched tag")
+        return ValidationResult(url, title="Feed", entries=[])
+
+    monkeypatch.setattr(feed_loader, "validate_feed", validate_feed)
+    app.add_feed("https://example.com/known", "@chan", "UTC", "2h", "detailed", None, 1)
+
+    report = app.import_opml(DOCUMENT, "@chan", "1h", "detailed", 7)
+
+    assert [item["status"] for item in report] == ["added", "invalid", "duplicate", "added", "exists"]
+    assert "mismatched tag" in report[1]["detail"]
+    assert sorted(validated) == ["https://example.com/broken", "https://example.com/good",
+                                 "https://example.com/other"]
+    feeds = {feed["url"]: feed for feed in app.iter_feeds()}
+    assert len(feeds) == 3
+    assert feeds["https://example.com/good"]["schedule"] == "1h"
+    assert feeds["https://example.com/other"]["channel"] == "@other"
+    assert feeds["https://example.com/other"]["schedule"] == "30m"
+    assert feeds["https://example.com/good"]["_id"] == report[0]["feed_id"]
+    assert opml.summarize(report) == "2 added, 1 invalid, 1 duplicate, 1 exists"
+
+
+def test_import_without_channel_is_invalid(storage, monkeypatch):
+    monkeypatch.setattr(feed_loader, "validate_feed", lambda url: ValidationResult(url, title="Feed"))
+
+    report = app.import_opml(DOCUMENT, None)
+
+    assert [item["status"] for item in report] == ["invalid", "invalid", "invalid", "added", "invalid"]
+
+
+def test_feed_ids_are_unique_within_a_millisecond():
+    assert len({app.new_feed_id() for _ in range(1000)}) == 1000
+
+
+def test_slow_feeds_time_out_without_holding_up_the_rest(monkeypatch):
+    release = threading.Event()
+
+    def validate_feed(url):
+        if "slow" in url:
+            release.wait(5)
+        return ValidationResult(url, title="Feed")
+
+    monkeypatch.setattr(feed_loader, "validate_feed", validate_feed)
+    try:
+        results = feed_loader.validate_feeds(
+            ["https://example.com/slow", "https://example.com/a", "https://example.com/b"], workers=2, timeout=0.2
+        )
+    finally:
+        release.set()
+
+    assert results["https://example.com/a"].error is None
+    assert results["https://example.com/b"].error is None
+    assert "too long" in results["https://example.com/slow"].error
+
+
+def test_timeouts_do_not_add_up_per_round(monkeypatch):
+    release = threading.Event()
+
+    def validate_feed(url):
+        if "slow" in url:
+            release.wait(5)
+        return ValidationResult(url, title="Feed")
+
+    monkeypatch.setattr(feed_loader, "validate_feed", validate_feed)
+    urls = ["https://example.com/slow"] + [f"https://example.com/{i}" for i in range(8)]
+    start = time.monotonic()
+    try:
+        results = feed_loader.validate_feeds(urls, workers=2, timeout=0.5)
+    finally:
+        release.set()
+
+    # Five rounds of two workers, but only the slow feed's own timeout is waited out
+    assert time.monotonic() - start < 1.5
+    assert "too long" in results["https://example.com/slow"].error
+    assert all(results[url].error is None for url in urls[1:])
+
+
+def test_queued_feeds_get_their_own_timeout(monkeypatch):
+    def validate_feed(url):
+        time.sleep(0.3)
+        return ValidationResult(url, title="Feed")
+
+    monkeypatch.setattr(feed_loader, "validate_feed", validate_feed)
+    results = feed_loader.validate_feeds(["https://example.com/a", "https://example.com/b"], workers=1, timeout=0.5)
+
+    # b starts when a is done and takes less than its own timeout
+    assert results["https://example.com/b"].error is None
@@ -0,0 +1,65 @@
+import os
+import signal
+
+import feedparser
+import pytest
+
+import accounting
+import fast_parse
+import feed_loader
+from entries import extract_entries
+from fetcher import FetchResult
+from parse_pool import ParsePool
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Pool</title>
+""" + b"".join(
+    b"<entry><id>urn:%d</id><title>Entry %d</title><link href='https://example.com/%d'/>"
+    b"<updated>2025-01-06T10:00:00Z</updated><category term='news'/><summary>Text %d</summary></entry>"
+    % (i, i, i, i) for i in range(20)
+) + b"</feed>"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ParsePool(processes=1, tasks_per_child=2, min_bytes=0)
+    monkeypatch.setattr(feed_loader, "parse_pool", pool)
+    # Well-formed Atom would otherwise never reach the pool
+    monkeypatch.setattr(fast_parse, "FAST_PARSE", False)
+    yield pool
+    pool.shutdown()
+
+
+def test_disabled_pool_and_small_bodies_parse_in_process():
+    assert ParsePool(processes=0).parse(ATOM, {}, 10) is None
+    assert ParsePool(processes=1, min_bytes=len(ATOM) + 1).parse(ATOM, {}, 10) is None
+
+
+def test_worker_results_match_in_process_parsing(pool):
+    result = FetchResult("https://example.com/feed", ATOM, {"content-type": "application/atom+xml"})
+    expected = extract_entries(feedparser.parse(ATOM), feed_loader.MAX_ENTRIES_PER_CHECK)
+
+    usage = accounting.FeedUsage()
+    # More parses than tasks_per_child, so the worker gets replaced
+    for _ in range(3):
+        assert feed_loader.parse_entries(result, usage) == expected
+    assert expected[0].categories == ("news",) and expected[0].published == 1736157600
+    assert pool.stats()["offloaded"] == 3
+    assert usage.parse_cpu > 0
+
+
+def test_malformed_body_is_a_parse_error(pool):
+    with pytest.raises(feed_loader.FeedParseError):
+        feed_loader.parse_entries(FetchResult("https://example.com/feed", b"<rss><channel><item>", {}))
+
+
+def test_dead_worker_falls_back_and_restarts(pool):
+    assert pool.parse(ATOM, {}, 10) is not None
+    for pid in list(pool._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    assert pool.parse(ATOM, {}, 10) is None
+    assert pool.stats()["fallbacks"] == 1
+    assert pool.parse(ATOM, {}, 10) is not None
+    assert pool.stats()["restarts"] == 1
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from persistence import LocalStore
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """Opens LocalStores on one directory, as successive runs of the bot would"""
+    opened = []
+
+    def open_store():
+        store = LocalStore(str(tmp_path))
+        opened.append(store)
+        return store
+
+    yield open_store
+    for store in opened:
+        if store._journal is not None:
+            store._journal.close()
+
+
+def test_journal_is_replayed(stores):
+    store = stores()
+    store.load()
+    store.record("put", "feeds", "f1", {"url": "https://example.com/feed", "channel": "@a"})
+    store.record("merge", "feeds", "f1", {"channel": "@b"})
+    store.record("put", "entries", ("f1", 42), "2024-01-01T00:00:00")
+    store.record("put", "entries", ("f1", 43), "2024-01-02T00:00:00")
+    store.record("delete", "entries", ("f1", 42))
+
+    reloaded = stores()
+    collections = reloaded.load()
+
+    assert collections == {
+        "feeds": {"f1": {"url": "https://example.com/feed", "channel": "@b"}},
+        "entries": {("f1", 43): "2024-01-02T00:00:00"},
+    }
+    assert reloaded.records == 5
+
+
+def test_snapshot_and_journal_round_trip(stores):
+    store = stores()
+    collections = store.load()
+    collections["feeds"] = {"f1": {"url": "https://example.com/feed"}}
+    collections["status"] = {"system": {"entry_key_mode": "hash64"}}
+    store.snapshot(collections)
+    assert os.path.getsize(store.journal_path) == 0
+    store.record("put", "feeds", "f2", {"url": "https://example.com/other"})
+
+    reloaded = stores()
+
+    assert reloaded.load() == {
+        "feeds": {"f1": {"url": "https://example.com/feed"}, "f2": {"url": "https://example.com/other"}},
+        "status": {"system": {"entry_key_mode": "hash64"}},
+    }
+    assert reloaded.records == 1
+
+
+def test_torn_tail_record_is_dropped(stores):
+    store = stores()
+    store.load()
+    store.record("put", "feeds", "f1", {"url": "https://example.com/feed"})
+    intact = os.path.getsize(store.journal_path)
+    store.record("put", "feeds", "f2", {"url": "https://example.com/other"})
+    store._journal.close()
+    # A crash part-way through writing the second record
+    os.truncate(store.journal_path, os.path.getsize(store.journal_path) - 5)
+
+    reloaded = stores()
+    collections = reloaded.load()
+
+    assert collections == {"feeds": {"f1": {"url": "https://example.com/feed"}}}
+    assert os.path.getsize(reloaded.journal_path) == intact
+
+    # Records appended after the damage are read back too
+    reloaded.record("put", "feeds", "f3", {"url": "https://example.com/third"})
+    assert set(stores().load()["feeds"]) == {"f1", "f3"}
+
+
+def test_garbage_after_the_last_record_is_dropped(stores):
+    store = stores()
+    store.load()
+    store.record("put", "feeds", "f1", {"url": "https://example.com/feed"})
+    store._journal.write(b"\x00\xffnot a pickle")
+    store._journal.close()
+
+    assert stores().load() == {"feeds": {"f1": {"url": "https://example.com/feed"}}}
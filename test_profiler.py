@@ -0,0 +1,53 @@
+import pstats
+import time
+
+from profiler import CycleProfiler
+
+
+def fetch_feed_digest():
+    time.sleep(0.02)
+
+
+def format_entry():
+    return "".join(str(n) for n in range(1000))
+
+
+def _cycle(profiler):
+    with profiler.cycle():
+        fetch_feed_digest()
+        format_entry()
+
+
+def test_profiles_the_requested_cycles_into_a_report(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path), top=10)
+    reports = []
+
+    assert profiler.start(cycles=2, on_report=lambda path, summary: reports.append((path, summary)))
+    assert not profiler.start(cycles=1)
+    _cycle(profiler)
+    assert reports == []
+    assert profiler.active
+    _cycle(profiler)
+
+    assert not profiler.active
+    [(path, summary)] = reports
+    assert summary.startswith("2 cycle(s)")
+    assert path.startswith(str(tmp_path)) and path.endswith(".txt")
+    with open(path) as f:
+        report = f.read()
+    assert "Stage breakdown" in report
+    assert "fetch_feed_digest" in report
+    fetch = float(summary.split("fetch ")[1].split("s")[0])
+    assert fetch >= 0.04
+
+    # The binary dump loads for further analysis
+    stats = pstats.Stats(path[:-len(".txt")] + ".prof")
+    assert any(name == "format_entry" for _, _, name in stats.stats)
+
+
+def test_cycles_run_unprofiled_without_a_session(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path))
+
+    _cycle(profiler)
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,140 @@
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import feedparser
+import pytest
+from telegram.error import TelegramError
+
+import bot_pool
+import entry_keys
+import rss_to_telegram
+from rss_to_telegram import KEY_MODE_FIELD
+
+
+@pytest.fixture
+def history_file(tmp_path, monkeypatch):
+    path = tmp_path / "posted_entries.json"
+    monkeypatch.setattr(rss_to_telegram, "HISTORY_FILE", str(path))
+    return path
+
+
+def test_unreadable_history_keeps_the_key_mode(history_file, monkeypatch):
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "hash64")
+    history_file.write_text("{not json")
+    key = entry_keys.text_entry_key("https://example.com/1")
+
+    history = rss_to_telegram.load_history()
+    history.setdefault("https://example.com/feed", {})[key] = "2024-01-01T00:00:00"
+    rss_to_telegram.save_history(history)
+
+    # The keys written since are not hashed a second time
+    assert rss_to_telegram.load_history()["https://example.com/feed"] == {key: "2024-01-01T00:00:00"}
+
+
+def test_saved_history_is_marked_with_the_key_mode(history_file, monkeypatch):
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "hash128")
+
+    rss_to_telegram.save_history({"https://example.com/feed": {}})
+
+    assert json.loads(history_file.read_text())[KEY_MODE_FIELD] == "hash128"
+
+
+# The tests replace feedparser.parse for rss_to_telegram
+_parse = feedparser.parse
+
+
+def _rss(*guids):
+    items = "".join(
+        f"<item><guid>{guid}</guid><title>Post {guid}</title><link>https://example.com/{guid}</link>"
+        f"<description>&lt;p&gt;About {guid}&lt;/p&gt;</description></item>"
+        for guid in guids
+    )
+    return _parse(f"<rss version='2.0'><channel><title>T</title>{items}</channel></rss>".encode())
+
+
+class Bot:
+    token = "100:x"
+
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        with self.lock:
+            self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def feeds(history_file, monkeypatch):
+    """Serves {url: parsed feed} from `feeds` to parse_rss_feed, posting through one fake bot"""
+    served = {}
+    bot = Bot()
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "raw")
+    monkeypatch.setattr(rss_to_telegram.feedparser, "parse", lambda url: served[url])
+    monkeypatch.setattr(rss_to_telegram, "TELEGRAM_BOT_TOKEN", "100:x")
+    monkeypatch.setattr(rss_to_telegram, "TELEGRAM_CHANNEL_IDS", ["@default"])
+    monkeypatch.setattr(rss_to_telegram.telegram, "Bot", lambda token: bot)
+    monkeypatch.setattr(bot_pool, "TELEGRAM_BOT_TOKENS", "")
+    monkeypatch.setattr(rss_to_telegram.time, "sleep", lambda seconds: None)
+    return served, bot
+
+
+def test_feeds_are_checked_together_within_their_post_limits(feeds):
+    served, bot = feeds
+    urls = [f"https://example.com/feed{n}" for n in range(12)]
+    for url in urls:
+        served[url] = _rss(f"{url}#1", f"{url}#2", f"{url}#3")
+    served["https://example.com/broken"] = SimpleNamespace(status=500, entries=[])
+    config = {"feeds": [{"url": url, "post_limit": 2} for url in urls] + [{"url": "https://example.com/broken"}]}
+
+    summary = rss_to_telegram.parse_rss_feed(config)
+
+    assert summary["feeds"] == 13
+    assert summary["new"] == 36
+    assert summary["posted"] == 24
+    assert summary["failed"] == ["https://example.com/broken"]
+    assert len(bot.sent) == 24
+    history = rss_to_telegram.load_history()
+    assert all(set(history[url]) == {f"{url}#1", f"{url}#2"} for url in urls)
+
+    # The entries over the limit go out on the next run
+    summary = rss_to_telegram.parse_rss_feed(config)
+    assert summary["posted"] == 12
+    assert all(len(history) == 3 for url, history in rss_to_telegram.load_history().items() if url in urls)
+
+
+def test_entries_go_to_the_feed_channels_or_the_default_ones(feeds):
+    served, bot = feeds
+    served["https://example.com/a"] = _rss("a1")
+    served["https://example.com/b"] = _rss("b1")
+
+    rss_to_telegram.parse_rss_feed({"feeds": [
+        {"url": "https://example.com/a", "channels": ["@one", " @two "]},
+        {"url": "https://example.com/b"},
+    ]})
+
+    assert sorted(chat_id for chat_id, _ in bot.sent) == ["@default", "@one", "@two"]
+    assert all(text.startswith("*Post ") and "About" in text for _, text in bot.sent)
+
+
+def test_failed_posts_are_retried_next_run(feeds, monkeypatch):
+    served, bot = feeds
+    served["https://example.com/a"] = _rss("a1")
+    monkeypatch.setattr(bot, "send_message", Mock(side_effect=TelegramError("chat not found")))
+
+    summary = rss_to_telegram.parse_rss_feed({"feeds": [{"url": "https://example.com/a"}]})
+
+    assert summary["new"] == 1 and summary["posted"] == 0
+    assert "https://example.com/a" not in rss_to_telegram.load_history()
+
+
+def test_flat_history_is_upgraded_to_the_per_feed_layout(history_file, monkeypatch):
+    monkeypatch.setattr(entry_keys, "ENTRY_KEY_MODE", "raw")
+    monkeypatch.setattr(rss_to_telegram, "RSS_FEED_URL", "https://example.com/feed")
+    history_file.write_text(json.dumps({"https://example.com/1": "2024-01-01T00:00:00"}))
+
+    assert rss_to_telegram.load_history() == {
+        "https://example.com/feed": {"https://example.com/1": "2024-01-01T00:00:00"},
+    }
@@ -0,0 +1,68 @@
+import logging
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import startup
+from startup import StartupTimer, lazy_import
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(startup, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_phases_add_up_and_are_reported_once(clock, caplog):
+    timer = StartupTimer()
+    with timer.phase("connect"):
+        clock[0] += 1.5
+    with timer.phase("import telegram"):
+        clock[0] += 0.25
+    with timer.phase("connect"):
+        clock[0] += 0.5
+    clock[0] += 1
+
+    with caplog.at_level(logging.INFO, logger="startup"):
+        timer.first_cycle_done()
+        timer.first_cycle_done()
+
+    assert timer.phases == {"connect": 2.0, "import telegram": 0.25, "time_to_first_poll": 3.25}
+    assert [record.getMessage() for record in caplog.records] == [
+        "Startup timing: connect=2.000s, import telegram=0.250s, time_to_first_poll=3.250s"
+    ]
+
+
+def test_a_failing_phase_is_still_timed(clock):
+    timer = StartupTimer()
+
+    with pytest.raises(RuntimeError):
+        with timer.phase("indexes"):
+            clock[0] += 2
+            raise RuntimeError("no connection")
+
+    assert timer.phases == {"indexes": 2}
+
+
+def test_lazy_module_imports_on_first_attribute_access(tmp_path, monkeypatch):
+    (tmp_path / "lazy_probe.py").write_text("IMPORTS = []\nIMPORTS.append(1)\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_probe", raising=False)
+
+    module = lazy_import("lazy_probe")
+
+    assert "lazy_probe" not in sys.modules
+    assert "not loaded" in repr(module)
+    assert module.VALUE == 42
+    assert module.IMPORTS == [1]
+    assert "lazy_probe" in sys.modules
+    assert "(loaded)" in repr(module)
+    assert "import lazy_probe" in startup.startup_timer.phases
+
+    # Later attribute access reuses the module; assignment goes through to it
+    module.VALUE = 7
+    assert sys.modules["lazy_probe"].VALUE == 7
+    assert module.IMPORTS == [1]
+    monkeypatch.delitem(sys.modules, "lazy_probe")
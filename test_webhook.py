@@ -0,0 +1,70 @@
+import json
+import queue
+import urllib.error
+import urllib.request
+
+import telegram
+
+from webhook import WebhookServer, SECRET_HEADER
+
+SECRET = "test-secret"
+
+UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 1,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Admin"},
+        "text": "/status",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 7}]
+    }
+}
+
+
+def start_server():
+    updates = queue.Queue()
+    bot = telegram.Bot("123456:TEST")
+    server = WebhookServer(updates, bot, SECRET, path="/telegram", listen="127.0.0.1", port=0)
+    server.start()
+    return server, updates
+
+
+def post(server, payload, secret=SECRET, path="/telegram"):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.port}{path}",
+        data=body,
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_webhook_queues_valid_updates():
+    server, updates = start_server()
+    try:
+        for i in range(5):
+            assert post(server, dict(UPDATE, update_id=1001 + i)) == 200
+        received = [updates.get(timeout=1) for _ in range(5)]
+        assert sorted(update.update_id for update in received) == list(range(1001, 1006))
+        assert received[0].message.text == "/status"
+        assert server.counters["received"] == 5
+    finally:
+        server.stop()
+
+
+def test_webhook_rejects_bad_requests():
+    server, updates = start_server()
+    try:
+        assert post(server, UPDATE, secret="wrong") == 403
+        assert post(server, UPDATE, path="/other") == 404
+        assert post(server, b"not json") == 400
+        assert updates.empty()
+        assert server.counters["rejected"] == 1
+        assert server.counters["invalid"] == 1
+    finally:
+        server.stop()
@@ -0,0 +1,205 @@
+import hashlib
+import hmac
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import feedparser
+import pytest
+
+import websub
+
+TOPIC = "https://example.com/feed.xml"
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Pushed</title>
+  <link rel="hub" href="https://hub.example.com/"/>
+  <link rel="self" href="https://example.com/feed.xml"/>
+  <entry><id>urn:1</id><title>One</title><link href="https://example.com/1"/></entry>
+</feed>"""
+
+
+class StandInHub:
+    """Minimal WebSub hub: verifies subscriptions, then publishes signed content"""
+
+    def __init__(self):
+        hub = self
+        self.subscriptions = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                form = dict(urllib.parse.parse_qsl(self.rfile.read(int(self.headers["Content-Length"])).decode()))
+                self.send_response(202)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                threading.Thread(target=hub._verify, args=(form,), daemon=True).start()
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+
+    def _verify(self, form):
+        query = urllib.parse.urlencode({
+            "hub.mode": form["hub.mode"],
+            "hub.topic": form["hub.topic"],
+            "hub.challenge": "challenge-123",
+            "hub.lease_seconds": "600",
+        })
+        with urllib.request.urlopen(f"{form['hub.callback']}?{query}") as response:
+            if response.read() == b"challenge-123":
+                self.subscriptions[form["hub.topic"]] = form
+
+    def publish(self, topic, body, secret=None):
+        form = self.subscriptions[topic]
+        signature = hmac.new((secret or form["hub.secret"]).encode(), body, hashlib.sha256).hexdigest()
+        request = urllib.request.Request(form["hub.callback"], data=body, method="POST")
+        request.add_header("Content-Type", "application/atom+xml")
+        request.add_header("X-Hub-Signature", f"sha256={signature}")
+        with urllib.request.urlopen(request) as response:
+            return response.status
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def setup():
+    subscriptions = {}
+    received = []
+    manager = websub.WebSub(
+        subscriptions.get,
+        subscriptions.__setitem__,
+        lambda feed_id, body, headers: received.append((feed_id, body)),
+        "test-secret",
+        callback_base="http://127.0.0.1:0",
+    )
+    server = websub.WebSubServer(manager, listen="127.0.0.1", port=0)
+    server.start()
+    manager.callback_base = f"http://127.0.0.1:{server.port}"
+    hub = StandInHub()
+    yield manager, subscriptions, received, hub
+    hub.close()
+    server.stop()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_subscription_is_verified_and_pushes_are_delivered(setup):
+    manager, subscriptions, received, hub = setup
+
+    assert manager.subscribe("feed_1", hub.url, TOPIC)
+    _wait_for(lambda: subscriptions["feed_1"]["state"] == "active")
+    assert subscriptions["feed_1"]["lease_seconds"] == 600
+    assert websub.is_push_active(subscriptions["feed_1"])
+
+    assert hub.publish(TOPIC, ATOM) == 202
+    assert received == [("feed_1", ATOM)]
+    assert manager.counters["pushed"] == 1
+
+
+def test_push_with_bad_signature_is_acknowledged_but_ignored(setup):
+    manager, subscriptions, received, hub = setup
+    manager.subscribe("feed_1", hub.url, TOPIC)
+    _wait_for(lambda: subscriptions["feed_1"]["state"] == "active")
+
+    assert hub.publish(TOPIC, ATOM, secret="wrong") == 202
+    assert received == []
+    assert manager.counters["rejected"] == 1
+
+
+def test_unknown_feeds_and_topics_are_refused(setup):
+    manager, subscriptions, received, hub = setup
+    subscriptions["feed_1"] = {"hub": hub.url, "topic": TOPIC, "state": "pending"}
+
+    query = urllib.parse.urlencode({"hub.mode": "subscribe", "hub.topic": "https://other/", "hub.challenge": "x"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{manager.callback_url('feed_1')}?{query}")
+    assert error.value.code == 404
+
+    request = urllib.request.Request(manager.callback_url("feed_2"), data=ATOM, method="POST")
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+    assert error.value.code == 410
+
+
+def test_unrequested_unsubscribe_is_refused(setup):
+    manager, subscriptions, received, hub = setup
+    manager.subscribe("feed_1", hub.url, TOPIC)
+    _wait_for(lambda: subscriptions["feed_1"]["state"] == "active")
+
+    query = urllib.parse.urlencode({"hub.mode": "unsubscribe", "hub.topic": TOPIC, "hub.challenge": "x"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{manager.callback_url('feed_1')}?{query}")
+    assert error.value.code == 404
+    assert subscriptions["feed_1"]["state"] == "active"
+
+    # Once we ask for it, the hub's verification is accepted
+    subscriptions["feed_1"] = dict(subscriptions["feed_1"], state="unsubscribing")
+    assert manager.verify("feed_1", {"hub.mode": "unsubscribe", "hub.topic": TOPIC, "hub.challenge": "y"}) == \
+        (200, b"y")
+    assert subscriptions["feed_1"]["state"] == "unsubscribed"
+
+
+def test_find_hub_in_feed_links_and_link_header():
+    parsed = feedparser.parse(ATOM)
+    assert websub.find_hub(parsed) == ("https://hub.example.com/", TOPIC)
+
+    plain = feedparser.parse(b"<rss version='2.0'><channel><title>x</title></channel></rss>")
+    assert websub.find_hub(plain, url="https://a/feed") == (None, None)
+    headers = {"link": '<https://hub.example.net/>; rel="hub", <https://a/feed.xml>; rel="self"'}
+    assert websub.find_hub(plain, headers, "https://a/feed") == ("https://hub.example.net/", "https://a/feed.xml")
+
+
+def test_needs_subscribe_renews_and_retries():
+    now = datetime(2025, 1, 6, 12, 0)
+    hours_ago = lambda hours: (now - timedelta(hours=hours)).isoformat()
+
+    active = {"hub": "h", "topic": "t", "state": "active", "lease_seconds": 7 * 86400,
+              "requested_at": hours_ago(100), "expires_at": (now + timedelta(days=3)).isoformat()}
+    assert not websub.needs_subscribe(active, now)
+    expiring = dict(active, expires_at=(now + timedelta(hours=2)).isoformat())
+    assert websub.needs_subscribe(expiring, now)
+    assert not websub.needs_subscribe(dict(expiring, requested_at=hours_ago(0.1)), now)
+
+    assert websub.needs_subscribe({"hub": "h", "topic": "t", "state": "pending", "requested_at": hours_ago(2)}, now)
+    assert not websub.needs_subscribe({"hub": "h", "topic": "t", "state": "failed", "requested_at": hours_ago(1)}, now)
+    assert websub.needs_subscribe({"hub": "h", "topic": "t", "state": "denied", "requested_at": hours_ago(7)}, now)
+    assert not websub.needs_subscribe(None, now)
+
+
+@pytest.mark.parametrize("granted, lease", [
+    ("10" * 20, websub.MAX_LEASE_SECONDS),
+    ("-5", 1),
+    ("", websub.WEBSUB_LEASE_SECONDS),
+])
+def test_granted_lease_is_clamped(granted, lease):
+    subscriptions = {"feed_1": {"hub": "h", "topic": TOPIC, "state": "pending"}}
+    manager = websub.WebSub(subscriptions.get, subscriptions.__setitem__, None, "test-secret")
+
+    assert manager.verify("feed_1", {"hub.mode": "subscribe", "hub.topic": TOPIC, "hub.challenge": "c",
+                                     "hub.lease_seconds": granted}) == (200, b"c")
+    assert subscriptions["feed_1"]["lease_seconds"] == lease
+    assert subscriptions["feed_1"]["state"] == "active"
+
+
+def test_non_numeric_lease_is_refused():
+    subscriptions = {"feed_1": {"hub": "h", "topic": TOPIC, "state": "pending"}}
+    manager = websub.WebSub(subscriptions.get, subscriptions.__setitem__, None, "test-secret")
+
+    assert manager.verify("feed_1", {"hub.mode": "subscribe", "hub.topic": TOPIC, "hub.challenge": "c",
+                                     "hub.lease_seconds": "a week"}) == (400, b"")
+    assert subscriptions["feed_1"]["state"] == "pending"
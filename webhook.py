@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from startup import lazy_import
+
+telegram = lazy_import("telegram")
+
+logger = logging.getLogger(__name__)
+
+# "polling" (default) or "webhook"
+UPDATE_MODE = os.environ.get("UPDATE_MODE", "polling").lower()
+
+# Public base URL Telegram should call, e.g. https://my-app.herokuapp.com
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("PORT", os.environ.get("WEBHOOK_PORT", 8443)))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", 40))
+
+# Largest update body accepted; Telegram updates are a few KB
+MAX_UPDATE_BYTES = 1024 * 1024
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Other endpoints served by the webhook listener: path prefix -> handle(request, method)
+ROUTES = {}
+
+
+def add_route(prefix, handle):
+    """Serve requests under `prefix` with handle(request_handler, method)"""
+    ROUTES[prefix.rstrip("/") + "/"] = handle
+
+
+def _route(path):
+    for prefix, handle in ROUTES.items():
+        if path.startswith(prefix):
+            return handle
+    return None
+
+
+def default_secret(token):
+    """Derive a stable secret token from the bot token"""
+    return hashlib.sha256(f"webhook:{token}".encode()).hexdigest()
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    server_version = "rss-tg-bot"
+
+    def do_POST(self):
+        webhook = self.server.webhook
+        path = self.path.split("?", 1)[0]
+        if path != webhook.path:
+            handle = _route(path)
+            return handle(self, "POST") if handle else self._reply(404)
+
+        secret = self.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(secret.encode(), webhook.secret.encode()):
+            webhook.count("rejected")
+            return self._reply(403)
+
+        length = self.headers.get("Content-Length", "")
+        if not length.isdigit() or int(length) > MAX_UPDATE_BYTES:
+            return self._reply(413 if length.isdigit() else 411)
+
+        try:
+            data = json.loads(self.rfile.read(int(length)))
+            update = telegram.Update.de_json(data, webhook.bot)
+        except Exception as e:
+            logger.warning(f"Bad webhook payload: {e}")
+            webhook.count("invalid")
+            return self._reply(400)
+
+        # Answer right away; the dispatcher processes the update
+        webhook.update_queue.put(update)
+        webhook.count("received")
+        self._reply(200)
+
+    def do_GET(self):
+        handle = _route(self.path.split("?", 1)[0])
+        if handle:
+            return handle(self, "GET")
+        self._reply(405)
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class WebhookServer:
+    """HTTP listener that validates Telegram webhook calls and queues updates
+
+    Every request is handled on its own thread, so slow clients never hold
+    up other updates; decoded updates go onto the dispatcher's queue.
+    """
+
+    def __init__(self, update_queue, bot, secret, path=WEBHOOK_PATH, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT):
+        self.update_queue = update_queue
+        self.bot = bot
+        self.secret = secret
+        self.path = path
+        self.counters = {"received": 0, "rejected": 0, "invalid": 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((listen, port), _WebhookHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.webhook = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="webhook", daemon=True)
+        self._thread.start()
+        logger.info(f"Webhook listening on port {self.port} at {self.path}")
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def start_webhook(updater):
+    """Start the dispatcher, job queue and webhook listener, and register it"""
+    secret = WEBHOOK_SECRET or default_secret(updater.bot.token)
+
+    threading.Thread(target=updater.dispatcher.start, name="dispatcher", daemon=True).start()
+    updater.job_queue.start()
+
+    server = WebhookServer(updater.dispatcher.update_queue, updater.bot, secret)
+    server.start()
+
+    if WEBHOOK_URL:
+        updater.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            secret_token=secret
+        )
+    else:
+        logger.warning("WEBHOOK_URL not set; assuming the webhook is registered elsewhere")
+    return server
+
+
+def run(updater):
+    """Receive updates by webhook or long polling (UPDATE_MODE) until stopped"""
+    if UPDATE_MODE != "webhook":
+        updater.start_polling()
+        updater.idle()
+        return
+
+    server = start_webhook(updater)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGABRT):
+        signal.signal(sig, lambda signum, frame: stop.set())
+    while not stop.wait(1):
+        pass
+
+    logger.info("Stopping webhook listener")
+    server.stop()
+    updater.job_queue.stop()
+    updater.dispatcher.stop()
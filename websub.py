@@ -0,0 +1,333 @@
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Public base URL hubs call back, e.g. https://my-app.herokuapp.com;
+# empty disables WebSub and every feed is polled
+WEBSUB_CALLBACK_URL = os.environ.get("WEBSUB_CALLBACK_URL", "")
+WEBSUB_PATH = os.environ.get("WEBSUB_PATH", "/websub")
+WEBSUB_SECRET = os.environ.get("WEBSUB_SECRET", "")
+
+# Listener used when updates are long-polled (in webhook mode the
+# webhook listener serves WEBSUB_PATH too)
+WEBSUB_LISTEN = os.environ.get("WEBSUB_LISTEN", "0.0.0.0")
+WEBSUB_PORT = int(os.environ.get("WEBSUB_PORT", os.environ.get("PORT", 8444)))
+
+# Lease asked of hubs, and how long before it ends it is renewed
+WEBSUB_LEASE_SECONDS = int(os.environ.get("WEBSUB_LEASE_SECONDS", 7 * 86400))
+WEBSUB_RENEW_BEFORE = int(os.environ.get("WEBSUB_RENEW_BEFORE", 86400))
+
+# Hubs may grant another lease than asked; what they grant is kept to
+# 1 second .. this many seconds, so it always fits a datetime
+MAX_LEASE_SECONDS = 4 * WEBSUB_LEASE_SECONDS
+
+# Subscribed feeds are still polled this often in case pushes stop arriving
+WEBSUB_FALLBACK_INTERVAL = int(os.environ.get("WEBSUB_FALLBACK_INTERVAL", 86400))
+
+# A subscription not verified within this time counts as failed; failed
+# and denied subscriptions are retried after WEBSUB_RETRY_INTERVAL
+WEBSUB_VERIFY_TIMEOUT = int(os.environ.get("WEBSUB_VERIFY_TIMEOUT", 3600))
+WEBSUB_RETRY_INTERVAL = int(os.environ.get("WEBSUB_RETRY_INTERVAL", 6 * 3600))
+
+HUB_TIMEOUT = 15
+MAX_PUSH_BYTES = int(os.environ.get("FEED_MAX_BYTES", 5 * 1024 * 1024))
+
+SIGNATURE_HEADER = "X-Hub-Signature"
+SIGNATURE_METHODS = {"sha1", "sha256", "sha384", "sha512"}
+
+
+class WebSubError(Exception):
+    """The hub refused a (un)subscription request"""
+
+
+def enabled():
+    return bool(WEBSUB_CALLBACK_URL)
+
+
+def find_hub(parsed_feed, headers=None, url=None):
+    """Return (hub, topic) advertised by a feed or its Link headers, or (None, None)"""
+    hub = topic = None
+    for link in parsed_feed.feed.get("links", []):
+        rel = link.get("rel")
+        if rel == "hub" and not hub:
+            hub = link.get("href")
+        elif rel == "self" and not topic:
+            topic = link.get("href")
+
+    link_header = (headers or {}).get("link", "")
+    for part in link_header.split(","):
+        target, _, params = part.partition(";")
+        rels = [value.strip().strip('"')
+                for key, _, value in (param.partition("=") for param in params.split(";"))
+                if key.strip().lower() == "rel"]
+        href = target.strip().strip("<>")
+        for rel in " ".join(rels).split():
+            if rel == "hub" and not hub:
+                hub = href
+            elif rel == "self" and not topic:
+                topic = href
+
+    if not hub:
+        return None, None
+    return hub, topic or url
+
+
+def sign(secret, body, method="sha256"):
+    return f"{method}={hmac.new(secret.encode(), body, method).hexdigest()}"
+
+
+def verify_signature(secret, body, header):
+    """True if `header` ("method=hexdigest") is a valid HMAC of body"""
+    method, _, signature = (header or "").partition("=")
+    method = method.strip().lower()
+    if method not in SIGNATURE_METHODS or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, method).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def request_subscription(hub, topic, callback, secret, mode="subscribe", lease_seconds=WEBSUB_LEASE_SECONDS):
+    """Send a (un)subscription request; the hub verifies it asynchronously"""
+    params = {"hub.mode": mode, "hub.topic": topic, "hub.callback": callback}
+    if mode == "subscribe":
+        params["hub.secret"] = secret
+        params["hub.lease_seconds"] = str(lease_seconds)
+    request = urllib.request.Request(hub, data=urllib.parse.urlencode(params).encode(), method="POST")
+    request.add_header("Content-Type", "application/x-www-form-urlencoded")
+    try:
+        with urllib.request.urlopen(request, timeout=HUB_TIMEOUT) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        raise WebSubError(f"hub answered {e.code}") from e
+    except OSError as e:
+        raise WebSubError(f"hub unreachable: {e}") from e
+    if status not in (202, 204):
+        raise WebSubError(f"hub answered {status}")
+
+
+def _seconds_since(timestamp, now):
+    if not timestamp:
+        return float("inf")
+    return (now - datetime.fromisoformat(timestamp)).total_seconds()
+
+
+def is_push_active(subscription, now=None):
+    """True while a verified subscription's lease runs"""
+    if not subscription or subscription.get("state") != "active":
+        return False
+    expires_at = subscription.get("expires_at")
+    return not expires_at or expires_at > (now or datetime.now()).isoformat()
+
+
+def needs_subscribe(subscription, now=None):
+    """True if a feed with a hub should (re)subscribe now"""
+    if not subscription or not subscription.get("hub"):
+        return False
+    now = now or datetime.now()
+    state = subscription.get("state")
+    if state == "active":
+        expires_at = subscription.get("expires_at")
+        if not expires_at or _seconds_since(subscription.get("requested_at"), now) < WEBSUB_VERIFY_TIMEOUT:
+            return False
+        lease = subscription.get("lease_seconds") or WEBSUB_LEASE_SECONDS
+        renew_before = min(WEBSUB_RENEW_BEFORE, lease / 2)
+        return datetime.fromisoformat(expires_at) - now <= timedelta(seconds=renew_before)
+    if state == "pending":
+        return _seconds_since(subscription.get("requested_at"), now) >= WEBSUB_VERIFY_TIMEOUT
+    if state in ("failed", "denied"):
+        return _seconds_since(subscription.get("requested_at"), now) >= WEBSUB_RETRY_INTERVAL
+    return False
+
+
+class WebSub:
+    """Subscribes feeds to their hubs and handles the hub's callbacks
+
+    Subscriptions live on the feed documents; `lookup(feed_id)` returns a
+    feed's subscription dict (or None) and `save(feed_id, subscription)`
+    stores it. Verified pushed bodies are handed to
+    `on_content(feed_id, body, headers)`.
+    """
+
+    def __init__(self, lookup, save, on_content, secret_key, callback_base=WEBSUB_CALLBACK_URL, path=WEBSUB_PATH):
+        self.lookup = lookup
+        self.save = save
+        self.on_content = on_content
+        self.secret_key = secret_key
+        self.callback_base = callback_base.rstrip("/")
+        self.path = path.rstrip("/")
+        self.counters = {"verified": 0, "denied": 0, "pushed": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def feed_secret(self, feed_id):
+        """Per-feed HMAC secret handed to the hub"""
+        return hmac.new(self.secret_key.encode(), f"websub:{feed_id}".encode(), hashlib.sha256).hexdigest()
+
+    def callback_url(self, feed_id):
+        return f"{self.callback_base}{self.path}/{urllib.parse.quote(str(feed_id), safe='')}"
+
+    def subscribe(self, feed_id, hub, topic, mode="subscribe"):
+        """Ask the hub for a (new) lease; the feed stays polled until verified"""
+        subscription = dict(self.lookup(feed_id) or {})
+        if mode == "unsubscribe":
+            state = "unsubscribing"
+        elif is_push_active(subscription) and subscription.get("topic") == topic:
+            # Renewal: pushes keep arriving under the current lease meanwhile
+            state = "active"
+        else:
+            state = "pending"
+        subscription.update({
+            "hub": hub,
+            "topic": topic,
+            "state": state,
+            "requested_at": datetime.now().isoformat(),
+        })
+        subscription.pop("error", None)
+        self.save(feed_id, subscription)
+        try:
+            request_subscription(hub, topic, self.callback_url(feed_id), self.feed_secret(feed_id), mode)
+            logger.info(f"Requested WebSub {mode} for feed {feed_id} at {hub}")
+            return True
+        except WebSubError as e:
+            logger.warning(f"WebSub {mode} for feed {feed_id} failed: {e}")
+            subscription.update({"state": "failed", "error": str(e)})
+            self.save(feed_id, subscription)
+            return False
+
+    def unsubscribe(self, feed_id):
+        subscription = self.lookup(feed_id)
+        if subscription and subscription.get("hub"):
+            return self.subscribe(feed_id, subscription["hub"], subscription["topic"], "unsubscribe")
+        return False
+
+    def verify(self, feed_id, query):
+        """Answer a hub's intent verification (or denial); returns (status, body)"""
+        subscription = self.lookup(feed_id)
+        mode = query.get("hub.mode")
+        if not subscription or query.get("hub.topic") != subscription.get("topic"):
+            return 404, b""
+
+        if mode == "denied":
+            logger.warning(f"Hub denied WebSub subscription for feed {feed_id}: {query.get('hub.reason', '')}")
+            subscription = dict(subscription, state="denied", error=query.get("hub.reason", "denied"))
+            self.save(feed_id, subscription)
+            self.count("denied")
+            return 200, b""
+
+        # Renewals are verified while the old lease is still active; an
+        # unsubscribe only when we asked for one, or anyone knowing the
+        # topic could switch push off for good
+        expected = {"subscribe": ("pending", "active"), "unsubscribe": ("unsubscribing",)}.get(mode)
+        if expected is None or subscription.get("state") not in expected:
+            return 404, b""
+        challenge = query.get("hub.challenge")
+        if not challenge:
+            return 400, b""
+
+        if mode == "subscribe":
+            try:
+                lease = int(query.get("hub.lease_seconds") or WEBSUB_LEASE_SECONDS)
+            except ValueError:
+                return 400, b""
+            lease = min(max(lease, 1), MAX_LEASE_SECONDS)
+            subscription = dict(subscription, state="active", lease_seconds=lease,
+                                expires_at=(datetime.now() + timedelta(seconds=lease)).isoformat())
+        else:
+            subscription = dict(subscription, state="unsubscribed")
+            subscription.pop("expires_at", None)
+        self.save(feed_id, subscription)
+        self.count("verified")
+        logger.info(f"WebSub {mode} verified for feed {feed_id}")
+        return 200, challenge.encode()
+
+    def receive(self, feed_id, headers, body):
+        """Accept pushed content (`headers` with lowercase names); returns the HTTP status"""
+        subscription = self.lookup(feed_id)
+        if not subscription or subscription.get("state") not in ("active", "pending"):
+            # 410 tells the hub to drop a subscription we no longer have
+            return 410
+        if not verify_signature(self.feed_secret(feed_id), body, headers.get(SIGNATURE_HEADER.lower())):
+            # The spec asks for a 2xx even so; the content is ignored
+            logger.warning(f"Ignoring WebSub push for feed {feed_id} with a bad signature")
+            self.count("rejected")
+            return 202
+        self.count("pushed")
+        self.on_content(feed_id, body, headers)
+        return 202
+
+    def handle(self, request, method):
+        """Serve one callback request on a BaseHTTPRequestHandler"""
+        path, _, query = request.path.partition("?")
+        prefix = self.path + "/"
+        if not path.startswith(prefix) or len(path) == len(prefix):
+            return _reply(request, 404)
+        feed_id = urllib.parse.unquote(path[len(prefix):])
+
+        if method == "GET":
+            params = dict(urllib.parse.parse_qsl(query, keep_blank_values=True))
+            status, body = self.verify(feed_id, params)
+            return _reply(request, status, body)
+
+        if method != "POST":
+            return _reply(request, 405)
+        length = request.headers.get("Content-Length", "")
+        if not length.isdigit() or int(length) > MAX_PUSH_BYTES:
+            return _reply(request, 413 if length.isdigit() else 411)
+        body = request.rfile.read(int(length))
+        headers = {key.lower(): value for key, value in request.headers.items()}
+        return _reply(request, self.receive(feed_id, headers, body))
+
+
+def _reply(request, status, body=b""):
+    request.send_response(status)
+    request.send_header("Content-Type", "text/plain")
+    request.send_header("Content-Length", str(len(body)))
+    request.end_headers()
+    request.wfile.write(body)
+
+
+class _WebSubHandler(BaseHTTPRequestHandler):
+    server_version = "rss-tg-bot"
+
+    def do_GET(self):
+        self.server.websub.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.websub.handle(self, "POST")
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class WebSubServer:
+    """Stand-alone listener for hub callbacks (when updates are long-polled)"""
+
+    def __init__(self, websub, listen=WEBSUB_LISTEN, port=WEBSUB_PORT):
+        self._httpd = ThreadingHTTPServer((listen, port), _WebSubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.websub = websub
+        self.path = websub.path
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="websub", daemon=True).start()
+        logger.info(f"WebSub callbacks listening on port {self.port} at {self.path}/")
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()